@@ -0,0 +1,170 @@
+import functools
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+from astroid import nodes
+from astroid.manager import AstroidManager
+
+# Sections of a timing report
+CHECKERS = 'checkers'
+PHASES = 'phases'
+FILES = 'files'
+
+# Phase names; checker time includes the inference and module loading it triggers
+PARSE_PHASE = 'parse'
+INFERENCE_PHASE = 'inference'
+MODULE_LOADING_PHASE = 'module loading'
+
+class AnalysisTimings:
+    """Accumulated wall and CPU seconds and call counts per checker, phase and file.
+
+    Pass one to the analyze functions to collect timings; results from every analyzed file
+    are merged into it. Cached results are not re-run, so they are not timed.
+    """
+
+    def __init__(self):
+        self.sections: Dict[str, Dict[str, List[float]]] = {CHECKERS: {}, PHASES: {}, FILES: {}}
+
+    def add(self, section: str, name: str, wall: float, cpu: float, calls: int = 1) -> None:
+        entry = self.sections[section].setdefault(name, [0.0, 0.0, 0])
+        entry[0] += wall
+        entry[1] += cpu
+        entry[2] += calls
+
+    @contextmanager
+    def measure(self, section: str, name: str) -> Iterator[None]:
+        wall, cpu = time.perf_counter(), time.thread_time()
+        try:
+            yield
+        finally:
+            self.add(section, name, time.perf_counter() - wall, time.thread_time() - cpu)
+
+    def merge(self, other: 'AnalysisTimings') -> None:
+        for section, entries in other.sections.items():
+            for name, (wall, cpu, calls) in entries.items():
+                self.add(section, name, wall, cpu, calls)
+
+    def ranked(self, section: str) -> List[Tuple[str, float, float, int]]:
+        """Entries of a section as (name, wall, cpu, calls), slowest first."""
+        entries = [(name, wall, cpu, int(calls)) for name, (wall, cpu, calls) in self.sections[section].items()]
+        return sorted(entries, key=lambda entry: entry[1], reverse=True)
+
+    def to_dict(self) -> Dict[str, Dict[str, List[float]]]:
+        return {section: {name: list(entry) for name, entry in entries.items()}
+                for section, entries in self.sections.items()}
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Dict[str, List[float]]]) -> 'AnalysisTimings':
+        timings = cls()
+        for section, entries in data.items():
+            for name, (wall, cpu, calls) in entries.items():
+                timings.add(section, name, wall, cpu, int(calls))
+        return timings
+
+def _timed_callback(timings: AnalysisTimings, name: str, callback: Callable) -> Callable:
+    @functools.wraps(callback)
+    def wrapper(*args, **kwargs):
+        with timings.measure(CHECKERS, name):
+            return callback(*args, **kwargs)
+    return wrapper
+
+class _TimedChecker:
+    """Stands in for a raw or token checker in the lists pylint iterates over."""
+
+    def __init__(self, checker, timings: AnalysisTimings):
+        self.checker = checker
+        self.timings = timings
+
+    def process_module(self, node) -> None:
+        with self.timings.measure(CHECKERS, self.checker.name):
+            self.checker.process_module(node)
+
+    def process_tokens(self, tokens) -> None:
+        with self.timings.measure(CHECKERS, self.checker.name):
+            self.checker.process_tokens(tokens)
+
+def instrument_module_checker(check_astroid_module: functools.partial, timings: AnalysisTimings) -> functools.partial:
+    """Wrap the per-run callable from PyLinter._astroid_module_checker so every checker hook is timed."""
+    walker = check_astroid_module.keywords['walker']
+    # The walker is built fresh for each run, so its callback lists can be rewritten in place
+    for events in (walker.visit_events, walker.leave_events):
+        for node_type, callbacks in events.items():
+            events[node_type] = [_timed_callback(timings, callback.__self__.name, callback) for callback in callbacks]
+    return functools.partial(
+        check_astroid_module.func,
+        walker=walker,
+        rawcheckers=[_TimedChecker(checker, timings) for checker in check_astroid_module.keywords['rawcheckers']],
+        tokencheckers=[_TimedChecker(checker, timings) for checker in check_astroid_module.keywords['tokencheckers']],
+    )
+
+def _outermost_timer(timings: AnalysisTimings, phase: str) -> Tuple[Callable[[], None], Callable[[], None]]:
+    """Start/stop pair that only counts the outermost of nested calls, so recursion is not double counted."""
+    state = {'depth': 0, 'wall': 0.0, 'cpu': 0.0}
+
+    def start() -> None:
+        if state['depth'] == 0:
+            state['wall'], state['cpu'] = time.perf_counter(), time.thread_time()
+        state['depth'] += 1
+
+    def stop() -> None:
+        state['depth'] -= 1
+        if state['depth'] == 0:
+            timings.add(PHASES, phase, time.perf_counter() - state['wall'], time.thread_time() - state['cpu'])
+
+    return start, stop
+
+@contextmanager
+def timed_astroid(timings: AnalysisTimings) -> Iterator[None]:
+    """Time astroid inference and the loading of imported modules while the block runs.
+
+    Patches astroid process-wide, so callers must hold the linter lock.
+    """
+    original_infer = nodes.NodeNG.infer
+    original_load = AstroidManager.ast_from_module_name
+    start_inference, stop_inference = _outermost_timer(timings, INFERENCE_PHASE)
+    start_loading, stop_loading = _outermost_timer(timings, MODULE_LOADING_PHASE)
+
+    def infer(self, context=None, **kwargs):
+        # infer is a generator, so time every step of it rather than the call that creates it
+        results = original_infer(self, context, **kwargs)
+        while True:
+            start_inference()
+            try:
+                result = next(results)
+            except StopIteration:
+                return
+            finally:
+                stop_inference()
+            yield result
+
+    def ast_from_module_name(self, *args, **kwargs):
+        start_loading()
+        try:
+            return original_load(self, *args, **kwargs)
+        finally:
+            stop_loading()
+
+    nodes.NodeNG.infer = infer
+    AstroidManager.ast_from_module_name = ast_from_module_name
+    try:
+        yield
+    finally:
+        nodes.NodeNG.infer = original_infer
+        AstroidManager.ast_from_module_name = original_load
+
+def format_timings(timings: AnalysisTimings, limit: Optional[int] = 15) -> str:
+    """Render the ranked checker, phase and file tables printed by `analyze --timings`."""
+    lines = []
+    titles = {CHECKERS: 'Checker', PHASES: 'Phase', FILES: 'File'}
+    for section, title in titles.items():
+        entries = timings.ranked(section)
+        if not entries:
+            continue
+        width = max(len(title), *(len(name) for name, _, _, _ in entries[:limit]))
+        lines.append(f"{title:<{width}}  {'wall s':>8}  {'cpu s':>8}  {'calls':>8}")
+        for name, wall, cpu, calls in entries[:limit]:
+            lines.append(f"{name:<{width}}  {wall:>8.3f}  {cpu:>8.3f}  {calls:>8}")
+        if limit is not None and len(entries) > limit:
+            lines.append(f"... {len(entries) - limit} more")
+        lines.append('')
+    return '\n'.join(lines).rstrip('\n')
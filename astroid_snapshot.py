@@ -0,0 +1,147 @@
+import gc
+import hashlib
+import json
+import logging
+import os
+import sys
+import sysconfig
+import tempfile
+from contextlib import contextmanager
+from importlib import metadata
+from typing import Dict, Iterator, Optional
+import astroid
+import dill
+from astroid import nodes
+from pylint import __version__ as pylint_version
+from config import config
+
+SNAPSHOT_FORMAT_VERSION = 1
+# astroid trees are deeply nested and pickle recurses once per level
+_PICKLE_RECURSION_LIMIT = 100000
+# Whether load_snapshot_once() already ran in this process
+_loaded = False
+
+logger = logging.getLogger(__name__)
+
+def snapshot_path() -> str:
+    return os.path.join(config.CACHE_DIR, 'astroid_snapshot.pkl')
+
+def snapshot_key() -> str:
+    """Fingerprint the interpreter and installed packages; any change makes a snapshot stale."""
+    distributions = sorted({f"{dist.metadata['Name']}=={dist.version}" for dist in metadata.distributions()})
+    fingerprint = json.dumps([
+        SNAPSHOT_FORMAT_VERSION, sys.version, sys.prefix, astroid.__version__, pylint_version, distributions,
+    ])
+    return hashlib.sha256(fingerprint.encode('utf-8')).hexdigest()
+
+def _installed_roots() -> tuple:
+    paths = sysconfig.get_paths()
+    roots = {os.path.realpath(paths[name]) for name in ('stdlib', 'platstdlib', 'purelib', 'platlib') if name in paths}
+    return tuple(os.path.join(root, '') for root in roots)
+
+def _snapshot_modules() -> Dict[str, nodes.Module]:
+    """Pick the cached modules covered by snapshot_key: pure-python stdlib and site-packages.
+
+    Project modules can change without a version bump, and modules astroid builds from
+    live objects (builtins, sys) hold references that cannot be pickled; both are rebuilt
+    on demand instead."""
+    roots = _installed_roots()
+    return {
+        name: module for name, module in astroid.MANAGER.astroid_cache.items()
+        if module.pure_python and module.file and os.path.realpath(module.file).startswith(roots)
+    }
+
+@contextmanager
+def _deep_recursion() -> Iterator[None]:
+    limit = sys.getrecursionlimit()
+    sys.setrecursionlimit(max(limit, _PICKLE_RECURSION_LIMIT))
+    # Collections triggered by the millions of new nodes would only rescan the growing graph
+    gc_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        yield
+    finally:
+        if gc_enabled:
+            gc.enable()
+        sys.setrecursionlimit(limit)
+
+class _SnapshotPickler(dill.Pickler):
+    def __init__(self, file, modules: Dict[str, nodes.Module]):
+        super().__init__(file)
+        self.modules = modules
+
+    def persistent_id(self, obj):
+        # Store other cached modules by name so loading rebuilds them rather than embedding copies;
+        # modules astroid parsed on the side (brain stubs) cannot be looked up and are embedded
+        if isinstance(obj, nodes.Module) and obj.name not in self.modules:
+            if astroid.MANAGER.astroid_cache.get(obj.name) is obj:
+                return obj.name
+        return None
+
+class _SnapshotUnpickler(dill.Unpickler):
+    def persistent_load(self, pid):
+        return astroid.MANAGER.ast_from_module_name(pid)
+
+def save_snapshot(path: Optional[str] = None) -> int:
+    """Write astroid's warm module cache to disk, returning how many modules were stored."""
+    path = path or snapshot_path()
+    modules = _snapshot_modules()
+    directory = os.path.dirname(path) or '.'
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f, _deep_recursion():
+            dill.dump(snapshot_key(), f)
+            _SnapshotPickler(f, modules).dump(modules)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+    return len(modules)
+
+def load_snapshot(path: Optional[str] = None) -> int:
+    """Restore a snapshot into astroid's module cache, returning how many modules were added.
+
+    Missing, stale or unreadable snapshots are skipped and astroid builds modules as usual."""
+    path = path or snapshot_path()
+    try:
+        with open(path, 'rb') as f, _deep_recursion():
+            if dill.load(f) != snapshot_key():
+                logger.info("Ignoring stale astroid snapshot %s", path)
+                return 0
+            modules = _SnapshotUnpickler(f).load()
+    except FileNotFoundError:
+        return 0
+    except Exception as e:
+        logger.warning("Could not load astroid snapshot %s: %s", path, e)
+        return 0
+
+    cache = astroid.MANAGER.astroid_cache
+    added = 0
+    for name, module in modules.items():
+        if name not in cache:
+            cache[name] = module
+            added += 1
+    return added
+
+def load_snapshot_once() -> None:
+    """Load the default snapshot the first time this process asks for it.
+
+    The restored trees live as long as the process, so they are frozen to keep the cyclic
+    collector from rescanning them. Freezing takes the whole heap, which is why it happens
+    once, before analysis has allocated much else."""
+    global _loaded
+    if _loaded:
+        return
+    _loaded = True
+    if load_snapshot():
+        gc.collect()
+        gc.freeze()
+
+def forget_snapshot() -> None:
+    """Let the collector reclaim frozen snapshot trees once astroid's cache has dropped them.
+
+    The next load_snapshot_once() loads the snapshot again."""
+    global _loaded
+    _loaded = False
+    gc.unfreeze()
@@ -0,0 +1,78 @@
+import hashlib
+import json
+import os
+from collections import Counter
+from typing import Iterable, List, Optional
+from issues import NO_ISSUES, TIMEOUT, Issue, IssueBatch
+
+# Bump whenever fingerprints are computed differently; older baselines are then rejected
+BASELINE_FORMAT_VERSION = 1
+
+_UNFILTERED_TYPES = ('info', TIMEOUT)
+
+class Baseline:
+    """Fingerprints of accepted issues, so analysis reports only issues that are new.
+
+    A fingerprint combines the file's path relative to root, the issue's symbol and the text of
+    its line with whitespace collapsed. Issues keep their fingerprint when code above them moves
+    them to another line or when their line is re-indented. Fingerprints are counted, so a
+    third copy of an accepted issue on an identical line is still reported.
+    """
+
+    def __init__(self, root: str, fingerprints: Optional[Counter] = None):
+        self.root = os.path.abspath(root if os.path.isdir(root) else os.path.dirname(root) or '.')
+        self.fingerprints: Counter = fingerprints if fingerprints is not None else Counter()
+
+    def __len__(self) -> int:
+        return sum(self.fingerprints.values())
+
+    @classmethod
+    def load(cls, path: str, root: str) -> 'Baseline':
+        """Read a baseline file; raises ValueError if it was written by an incompatible version."""
+        with open(path, encoding='utf-8') as baseline_file:
+            data = json.load(baseline_file)
+        if data.get('format') != BASELINE_FORMAT_VERSION:
+            raise ValueError(f"{path} was written by another version; regenerate it with --update-baseline")
+        return cls(root, Counter(data['fingerprints']))
+
+    def save(self, path: str) -> None:
+        # Sorted so the file diffs cleanly when checked in
+        with open(path, 'w', encoding='utf-8') as baseline_file:
+            json.dump({'format': BASELINE_FORMAT_VERSION, 'fingerprints': dict(sorted(self.fingerprints.items()))},
+                      baseline_file, indent=0)
+
+    def digest(self) -> str:
+        return hashlib.sha256(json.dumps(sorted(self.fingerprints.items())).encode('utf-8')).hexdigest()
+
+    def _fingerprints(self, filepath: str, issues: Iterable[Issue], code: str) -> List[Optional[str]]:
+        relative = os.path.relpath(os.path.abspath(filepath), self.root).replace(os.sep, '/')
+        lines = code.splitlines()
+        fingerprints = []
+        for issue in issues:
+            if issue.type in _UNFILTERED_TYPES:
+                fingerprints.append(None)
+                continue
+            context = ' '.join(lines[issue.line - 1].split()) if 0 < issue.line <= len(lines) else ''
+            key = '\0'.join((relative, issue.symbol or issue.message, context))
+            fingerprints.append(hashlib.sha1(key.encode('utf-8')).hexdigest()[:16])
+        return fingerprints
+
+    def add(self, filepath: str, issues: Iterable[Issue], code: str) -> None:
+        """Accept every issue found in a file."""
+        self.fingerprints.update(fp for fp in self._fingerprints(filepath, issues, code) if fp is not None)
+
+    def filter(self, filepath: str, issues: IssueBatch, code: str) -> IssueBatch:
+        """Drop the issues the baseline accepts; a file left with none reports NO_ISSUES."""
+        if not self.fingerprints:
+            return issues
+        accepted = self.fingerprints
+        seen: Counter = Counter()
+        kept = IssueBatch()
+        for issue, fp in zip(issues, self._fingerprints(filepath, issues, code)):
+            if fp is not None and seen[fp] < accepted.get(fp, 0):
+                seen[fp] += 1
+                continue
+            kept.append(issue)
+        if len(kept) == len(issues):
+            return issues
+        return kept if any(issue.type != 'info' for issue in kept) else IssueBatch([NO_ISSUES])
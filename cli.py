@@ -3,10 +3,8 @@ import os
 import sys
 import argparse
 import asyncio
+import json
 from typing import Dict, Any
-import subprocess
-import unittest
-import test_ai_coding_assistant
 from config import config
 
 def activate_venv():
@@ -39,36 +37,284 @@ def activate_venv():
 # Activate the virtual environment
 activate_venv()
 
-from code_generator import generate_code
-from code_analyzer import analyze_code
-from code_refactor import refactor_code
-from code_optimizer import optimize_code
-from git_integration import commit_improved_code
+# pylint, rope and openai take most of a second to import, so handlers import what they need;
+# commands the daemon serves then start in milliseconds
+import daemon
 from error_handler import error_handler
 
+async def via_daemon(command: str, **params: Any) -> Any:
+    """Run a command on this project's daemon, or return None when none is running."""
+    if not config.DAEMON_AUTO_CONNECT:
+        return None
+    try:
+        return await daemon.request(command, params)
+    except daemon.DaemonUnavailable:
+        return None
+
 @error_handler
 async def handle_code_generation(args: argparse.Namespace) -> None:
+    from code_generator import generate_code, generate_code_stream
+
     api_key = args.api_key or config.OPENAI_API_KEY
     prompt = args.prompt
     
-    generated_code = await generate_code(prompt, api_key, model=config.DEFAULT_MODEL)
-    print("\nGenerated Code:")
-    print(generated_code['code'])
+    if args.stream:
+        print("\nGenerated Code:")
+        printed = ""
+        generated_code = {}
+        # Print the code as it arrives; each partial response extends the previous one
+        async for generated_code in generate_code_stream(prompt, api_key, model=config.DEFAULT_MODEL,
+                                                         temperature=args.temperature, use_cache=not args.no_cache):
+            code = generated_code.get('code', '')
+            if code.startswith(printed):
+                print(code[len(printed):], end="", flush=True)
+                printed = code
+        if not printed.endswith("\n"):
+            print()
+    else:
+        generated_code = await generate_code(prompt, api_key, model=config.DEFAULT_MODEL, temperature=args.temperature,
+                                             use_cache=not args.no_cache)
+        print("\nGenerated Code:")
+        print(generated_code['code'])
     print("\nExplanation:")
     print(generated_code['explanation'])
+    print_response_cache_stats()
+
+def print_response_cache_stats() -> None:
+    from llm_client import get_response_cache
+
+    stats = get_response_cache().stats()
+    lookups = stats['hits'] + stats['misses']
+    if lookups:
+        print(f"\nResponse cache: {stats['hits']} of {lookups} requests answered from cache ({stats['hit_rate']:.0%})")
 
 @error_handler
 async def handle_code_analysis(args: argparse.Namespace) -> None:
+    if args.timeout is not None:
+        config.ANALYSIS_FILE_TIMEOUT = args.timeout or None
+    if args.batch_timeout is not None:
+        config.ANALYSIS_BATCH_TIMEOUT = args.batch_timeout or None
+    if args.path:
+        await analyze_repository(args)
+        return
+
     code = args.code.replace('\\n', '\n')  # Replace escaped newlines with actual newlines
     
-    analysis_results = await analyze_code(code)
-    if analysis_results:
-        print("\nAnalysis Results:")
-        for issue in analysis_results:
-            print(f"{issue['type']} at line {issue['line']}: {issue['message']}")
-        print(f"\nTotal issues found: {len(analysis_results)}")
+    total_issues = 0
+
+    def print_issue(issue: Dict[str, str]) -> None:
+        nonlocal total_issues
+        if total_issues == 0:
+            print("\nAnalysis Results:")
+        total_issues += 1
+        print(f"{issue['type']} at line {issue['line']}: {issue['message']}", flush=True)
+
+    timings = None
+    issues = None
+    if args.timings:
+        from analysis_timings import AnalysisTimings
+        timings = AnalysisTimings()
+    elif args.timeout is None:
+        # The daemon applies its own time budget, so an explicit --timeout runs here
+        issues = await via_daemon('analyze', code=code, profile=args.profile, use_cache=not args.no_cache,
+                                  lite=args.lite, fast=args.fast, style=args.style)
+
+    if issues is not None:
+        for issue in issues:
+            print_issue(issue)
+    elif args.fast:
+        from tiered_analyzer import analyze_fast
+        for issue in analyze_fast(code, style=args.style):
+            print_issue(issue)
+    elif args.lite:
+        from lite_analyzer import analyze_lite
+        for issue in analyze_lite(code):
+            print_issue(issue)
+    elif timings is not None:
+        from code_analyzer import analyze_code
+        for issue in await analyze_code(code, use_cache=not args.no_cache, profile=args.profile, timings=timings):
+            print_issue(issue)
+    else:
+        from code_analyzer import analyze_code_stream
+        # Print issues as pylint finds them rather than after the whole run
+        async for issue in analyze_code_stream(code, use_cache=not args.no_cache, profile=args.profile):
+            print_issue(issue)
+
+    if total_issues:
+        print(f"\nTotal issues found: {total_issues}")
     else:
         print("No issues found.")
+    if timings is not None:
+        print_timings(timings)
+
+def print_timings(timings) -> None:
+    from analysis_timings import format_timings
+    print("\nTimings (checker times include the inference and module loading they trigger):")
+    print(format_timings(timings))
+
+def baseline_path(args: argparse.Namespace) -> str:
+    if args.baseline:
+        return args.baseline
+    root = args.path if os.path.isdir(args.path) else os.path.dirname(args.path)
+    return os.path.join(root, config.ANALYSIS_BASELINE_FILE)
+
+async def update_baseline(args: argparse.Namespace, ignore_patterns: list) -> None:
+    from baseline import Baseline
+    from repo_analyzer import analyze_path, analyze_path_lite, read_source
+
+    if args.since or args.staged:
+        print("--update-baseline records the whole tree and cannot be combined with --since or --staged")
+        return
+    baseline = Baseline(args.path)
+
+    def accept(path: str, issues) -> None:
+        try:
+            baseline.add(path, issues, read_source(path))
+        except (OSError, SyntaxError, UnicodeDecodeError):
+            pass  # An unreadable file has no lines to fingerprint its issue against
+
+    if args.lite:
+        for path, issues in analyze_path_lite(args.path, ignore_patterns, compact=True):
+            accept(path, issues)
+    else:
+        async for path, issues in analyze_path(args.path, ignore_patterns, use_cache=not args.no_cache,
+                                               profile=args.profile, compact=True):
+            accept(path, issues)
+    path = baseline_path(args)
+    baseline.save(path)
+    print(f"Accepted {len(baseline)} issues into {path}; later runs with --baseline report only new ones")
+
+async def analyze_repository(args: argparse.Namespace) -> None:
+    from analysis_timings import AnalysisTimings
+    from baseline import Baseline
+    from issues import count_problems, is_partial
+    from repo_analyzer import analyze_changed, analyze_path, analyze_path_lite, load_last_results
+
+    ignore_patterns = config.ANALYSIS_IGNORE_PATTERNS + (args.ignore or [])
+    if args.merge_base and not args.since:
+        print("--merge-base compares against the merge-base of --since and HEAD, so it needs --since")
+        return
+    if args.fast:
+        print("--fast checks a single --code snippet and cannot be combined with --path; use --lite for a fast tree scan")
+        return
+    if args.lite and (args.since or args.staged):
+        print("--lite scans the whole tree and cannot be combined with --since or --staged")
+        return
+    if args.update_baseline:
+        await update_baseline(args, ignore_patterns)
+        return
+    baseline = Baseline.load(baseline_path(args), args.path) if args.baseline is not None else None
+    use_cache = not args.no_cache
+    timings = AnalysisTimings() if args.timings else None
+    is_incremental = bool(args.since or args.staged)
+    if args.lite:
+        results = None
+    elif is_incremental:
+        results = analyze_changed(args.path, since=args.since, staged=args.staged, merge_base=args.merge_base,
+                                  ignore_patterns=ignore_patterns, use_cache=use_cache, profile=args.profile, compact=True,
+                                  timings=timings, baseline=baseline)
+    else:
+        results = analyze_path(args.path, ignore_patterns, use_cache=use_cache, profile=args.profile, compact=True,
+                               timings=timings, baseline=baseline)
+
+    analyzed_files = set()
+    total_issues = 0
+    timed_out = 0
+
+    def print_file_issues(path: str, issues) -> None:
+        nonlocal total_issues, timed_out
+        analyzed_files.add(os.path.relpath(path, args.path).replace(os.sep, '/'))
+        total_issues += count_problems(issues)
+        timed_out += is_partial(issues)
+        for issue in issues:
+            if issue.type != 'info':
+                print(f"{path}:{issue.line}:{issue.column}: {issue.type}: {issue.message}", flush=True)
+
+    if results is None:
+        # The lite engine needs no workers; it checks the whole tree in this process
+        for path, issues in analyze_path_lite(args.path, ignore_patterns, compact=True, baseline=baseline):
+            print_file_issues(path, issues)
+    else:
+        # Print each file as soon as its worker finishes instead of waiting for the whole tree
+        async for path, issues in results:
+            print_file_issues(path, issues)
+    print(f"\nAnalyzed {len(analyzed_files)} files, {total_issues} {'new ' if baseline is not None else ''}issues found")
+    if timed_out:
+        print(f"{timed_out} files ran out of time; their results are partial")
+
+    if is_incremental:
+        reused = {path: issues for path, issues in load_last_results(args.path, compact=True).items() if path not in analyzed_files}
+        reused_issues = sum(count_problems(issues) for issues in reused.values())
+        print(f"Reused results for {len(reused)} unchanged files from the last run, {reused_issues} issues")
+    if timings is not None:
+        print_timings(timings)
+
+@error_handler
+async def handle_snapshot(args: argparse.Namespace) -> None:
+    from code_analyzer import build_astroid_snapshot
+    from repo_analyzer import discover_python_files, read_source
+
+    ignore_patterns = config.ANALYSIS_IGNORE_PATTERNS + (args.ignore or [])
+
+    def sources():
+        for name in args.module or []:
+            yield 'snippet.py', f"import {name}\n"
+        if args.path:
+            for path in discover_python_files(args.path, ignore_patterns):
+                try:
+                    yield path, read_source(path)
+                except (OSError, SyntaxError, UnicodeDecodeError):
+                    continue
+
+    print("Analyzing sources to warm the astroid cache...")
+    module_count = await asyncio.to_thread(build_astroid_snapshot, sources())
+    print(f"Saved astroid snapshot with {module_count} modules")
+
+@error_handler
+async def handle_metrics(args: argparse.Namespace) -> None:
+    from metrics_analyzer import collect_metrics, hotspots
+
+    ignore_patterns = config.ANALYSIS_IGNORE_PATTERNS + (args.ignore or [])
+    report = await collect_metrics(args.path, ignore_patterns, use_cache=not args.no_cache)
+    print(f"Measured {len(report.functions)} functions in {report.files} files "
+          f"({report.recomputed} recomputed, the rest cached)")
+    for path in report.unparsable:
+        print(f"Skipped unparsable file {path}")
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump([function._asdict() for function in report.functions], f, indent=2)
+        print(f"Wrote all function metrics to {args.json}")
+
+    ranked = hotspots(report.functions, args.sort, args.top)
+    if ranked:
+        print(f"\nTop {len(ranked)} functions by {args.sort}:")
+        print(f"{'complexity':>10}  {'length':>6}  {'depth':>5}  {'fan-out':>7}  function")
+        for function in ranked:
+            print(f"{function.complexity:>10}  {function.length:>6}  {function.depth:>5}  {function.fan_out:>7}  "
+                  f"{function.path}:{function.line} {function.name}")
+
+@error_handler
+async def handle_clones(args: argparse.Namespace) -> None:
+    from clone_detector import find_clones
+
+    ignore_patterns = config.ANALYSIS_IGNORE_PATTERNS + (args.ignore or [])
+    report = await find_clones(args.path, ignore_patterns, use_cache=not args.no_cache, min_tokens=args.min_tokens)
+    print(f"Indexed {report.files} files ({report.fingerprinted} fingerprinted, the rest cached)")
+    for path in report.unparsable:
+        print(f"Skipped unparsable file {path}")
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump([{'tokens': group.tokens, 'fragments': [fragment._asdict() for fragment in group.fragments]}
+                       for group in report.groups], f, indent=2)
+        print(f"Wrote all clone groups to {args.json}")
+
+    print(f"\nFound {len(report.groups)} groups of duplicated code")
+    for group in report.groups[:args.top]:
+        print(f"\n{len(group.fragments)} copies of {group.tokens}+ tokens:")
+        for fragment in group.fragments:
+            print(f"  {fragment.path}:{fragment.start_line}-{fragment.end_line}")
 
 @error_handler
 async def handle_code_refactoring(args: argparse.Namespace) -> None:
@@ -76,7 +322,10 @@ async def handle_code_refactoring(args: argparse.Namespace) -> None:
     refactor_type = args.refactor_type
     refactor_args = {k: v for k, v in vars(args).items() if k not in ['command', 'code', 'refactor_type']}
     
-    result = await refactor_code(code, refactor_type, **refactor_args)
+    result = await via_daemon('refactor', code=code, refactor_type=refactor_type, options=refactor_args)
+    if result is None:
+        from code_refactor import refactor_code
+        result = await refactor_code(code, refactor_type, **refactor_args)
     print("\nRefactored Code:")
     print(result)
 
@@ -84,7 +333,10 @@ async def handle_code_refactoring(args: argparse.Namespace) -> None:
 async def handle_code_optimization(args: argparse.Namespace) -> None:
     code = args.code.replace('\\n', '\n')
     
-    optimization_result = await optimize_code(code)
+    optimization_result = await via_daemon('optimize', code=code)
+    if optimization_result is None:
+        from code_optimizer import optimize_code
+        optimization_result = await optimize_code(code)
     print("\nOriginal Code:")
     print(optimization_result['original_code'])
     print("\nOptimized Code:")
@@ -94,6 +346,7 @@ async def handle_code_optimization(args: argparse.Namespace) -> None:
         print(f"- {opt}")
 
     if args.commit:
+        from git_integration import commit_improved_code
         repo_path = os.getcwd()
         file_path = args.file_path
         commit_message = f"Optimized code in {file_path}"
@@ -101,22 +354,31 @@ async def handle_code_optimization(args: argparse.Namespace) -> None:
 
 @error_handler
 async def handle_continuous_improvement(args: argparse.Namespace) -> None:
+    from code_generator import generate_code
+    from code_optimizer import optimize_code
+    from code_refactor import refactor_code
+    from git_integration import commit_improved_code
+    from incremental_analyzer import IncrementalAnalyzer
+
     api_key = args.api_key
     initial_prompt = args.prompt
     iterations = args.iterations
     
     current_code = ""
+    # Successive versions usually share most functions, so only changed ones are re-checked
+    analyzer = IncrementalAnalyzer()
     for i in range(iterations):
         print(f"\nIteration {i+1}/{iterations}")
         
         # Generate code
-        generated_result = await generate_code(initial_prompt, api_key, context=current_code)
+        generated_result = await generate_code(initial_prompt, api_key, context=current_code, temperature=args.temperature,
+                                               use_cache=not args.no_cache)
         current_code = generated_result['code']
         print("\nGenerated Code:")
         print(current_code)
         
         # Analyze code
-        analysis_results = await analyze_code(current_code)
+        analysis_results = await analyzer.analyze(current_code)
         if analysis_results:
             print("\nAnalysis Results:")
             for issue in analysis_results:
@@ -139,6 +401,7 @@ async def handle_continuous_improvement(args: argparse.Namespace) -> None:
     
     print("\nFinal Improved Code:")
     print(current_code)
+    print_response_cache_stats()
 
     if args.commit:
         repo_path = os.getcwd()
@@ -146,6 +409,28 @@ async def handle_continuous_improvement(args: argparse.Namespace) -> None:
         commit_message = f"Improved code in {file_path} after {iterations} iterations"
         await commit_improved_code(repo_path, file_path, commit_message)
 
+@error_handler
+async def handle_daemon(args: argparse.Namespace) -> None:
+    if args.action == "start":
+        status = await daemon.start_daemon()
+        print(f"Daemon running (pid {status['pid']}) for {status['root']}")
+    elif args.action == "stop":
+        try:
+            await daemon.request('stop')
+            print("Daemon stopped")
+        except daemon.DaemonUnavailable:
+            print("No daemon is running for this project")
+    elif args.action == "status":
+        try:
+            status = await daemon.request('ping')
+        except daemon.DaemonUnavailable:
+            print("No daemon is running for this project")
+            return
+        print(f"Daemon running (pid {status['pid']}) for {status['root']}: "
+              f"up {status['uptime']:.0f}s, {status['requests']} requests served")
+    else:
+        await daemon.AnalysisDaemon(os.getcwd()).serve()
+
 @error_handler
 async def handle_run_tests(args: argparse.Namespace) -> None:
     import unittest
@@ -165,10 +450,67 @@ def create_parser() -> argparse.ArgumentParser:
     gen_parser = subparsers.add_parser("generate", help="Generate code")
     gen_parser.add_argument("--api-key", required=True, help="OpenAI API key")
     gen_parser.add_argument("--prompt", required=True, help="Code generation prompt")
+    gen_parser.add_argument("--temperature", type=float, help=f"Sampling temperature (default: {config.TEMPERATURE}); 0 makes responses cacheable")
+    gen_parser.add_argument("--no-cache", action="store_true", help="Always call the API instead of reusing a cached response")
+    gen_parser.add_argument("--stream", action="store_true", help="Print the code as it is generated instead of when the response is complete")
 
     # Code Analysis
     analyze_parser = subparsers.add_parser("analyze", help="Analyze code")
-    analyze_parser.add_argument("--code", required=True, help="Code to analyze")
+    analyze_source = analyze_parser.add_mutually_exclusive_group(required=True)
+    analyze_source.add_argument("--code", help="Code to analyze")
+    analyze_source.add_argument("--path", help="File or directory to analyze in parallel")
+    analyze_parser.add_argument("--ignore", action="append", metavar="PATTERN", help="Glob pattern of files or directories to skip (repeatable)")
+    analyze_parser.add_argument("--since", metavar="REF", help="With --path pointing at a git repository, only analyze files changed since REF")
+    analyze_parser.add_argument("--merge-base", action="store_true", help="Compare against the merge-base of --since and HEAD instead of --since itself")
+    analyze_parser.add_argument("--staged", action="store_true", help="With --path pointing at a git repository, only analyze staged files")
+    analyze_parser.add_argument("--no-cache", action="store_true", help="Ignore cached analysis results and re-run pylint")
+    analyze_parser.add_argument("--profile", choices=list(config.PYLINT_PROFILES) + ["custom"], default=config.ANALYSIS_PROFILE,
+                                help="Checker profile; 'custom' applies Config.PYLINT_CUSTOM_RULES")
+    analyze_parser.add_argument("--timings", action="store_true",
+                                help="Print wall and CPU time per pylint checker, analysis phase and file, slowest first")
+    analyze_parser.add_argument("--timeout", type=float, metavar="SECONDS",
+                                help="Stop analyzing a file after SECONDS and report what was found so far (0 for no limit)")
+    analyze_parser.add_argument("--batch-timeout", type=float, metavar="SECONDS",
+                                help="With --path, stop the whole run after SECONDS; unfinished files are marked as timed out")
+    analyze_parser.add_argument("--lite", action="store_true",
+                                help="Use the built-in single-pass engine instead of pylint: fewer checks, fast enough to run on every keystroke")
+    analyze_parser.add_argument("--baseline", nargs="?", const="", metavar="FILE",
+                                help=f"With --path, only report issues missing from the baseline FILE (default: {config.ANALYSIS_BASELINE_FILE} in --path)")
+    analyze_parser.add_argument("--update-baseline", action="store_true",
+                                help="With --path, accept every current issue by writing it to the baseline file instead of reporting it")
+    analyze_parser.add_argument("--fast", action="store_true", help="Only run the millisecond-scale syntax and pyflakes checks, skipping pylint")
+    analyze_parser.add_argument("--style", action="store_true", help="With --fast, also report pycodestyle issues")
+
+    # Complexity metrics
+    metrics_parser = subparsers.add_parser("metrics", help="Compute per-function complexity metrics across a tree")
+    metrics_parser.add_argument("--path", default=".", help="File or directory to measure")
+    metrics_parser.add_argument("--ignore", action="append", metavar="PATTERN", help="Glob pattern of files or directories to skip (repeatable)")
+    metrics_parser.add_argument("--sort", choices=["complexity", "length", "depth", "fan_out"], default="complexity",
+                                help="Metric to rank hotspots by")
+    metrics_parser.add_argument("--top", type=int, default=20, help="Number of hotspots to print")
+    metrics_parser.add_argument("--json", metavar="FILE", help="Also write every function's metrics to FILE as JSON")
+    metrics_parser.add_argument("--no-cache", action="store_true", help="Recompute every function instead of reusing cached metrics")
+
+    # Duplicate code
+    clones_parser = subparsers.add_parser("clones", help="Find duplicated code across a tree")
+    clones_parser.add_argument("--path", default=".", help="File or directory to search")
+    clones_parser.add_argument("--ignore", action="append", metavar="PATTERN", help="Glob pattern of files or directories to skip (repeatable)")
+    clones_parser.add_argument("--min-tokens", type=int, default=config.CLONE_MIN_TOKENS,
+                               help="Only report copies at least this many normalized tokens long")
+    clones_parser.add_argument("--top", type=int, default=20, help="Number of clone groups to print")
+    clones_parser.add_argument("--json", metavar="FILE", help="Also write every clone group to FILE as JSON")
+    clones_parser.add_argument("--no-cache", action="store_true", help="Re-tokenize every file instead of reusing cached fingerprints")
+
+    # Astroid snapshot
+    snapshot_parser = subparsers.add_parser("snapshot", help="Save the warmed astroid cache so analysis starts fast")
+    snapshot_parser.add_argument("--path", default=".", help="File or directory whose imports should be included")
+    snapshot_parser.add_argument("--module", action="append", metavar="NAME", help="Extra module to include, e.g. fastapi (repeatable)")
+    snapshot_parser.add_argument("--ignore", action="append", metavar="PATTERN", help="Glob pattern of files or directories to skip (repeatable)")
+
+    # Analysis daemon
+    daemon_parser = subparsers.add_parser("daemon", help="Keep analysis warm in a background process for this project")
+    daemon_parser.add_argument("action", choices=["start", "stop", "status", "run"],
+                               help="'run' serves in the foreground; other commands use a running daemon automatically")
 
     # Code Refactoring
     refactor_parser = subparsers.add_parser("refactor", help="Refactor code")
@@ -191,6 +533,8 @@ def create_parser() -> argparse.ArgumentParser:
     improve_parser.add_argument("--api-key", required=True, help="OpenAI API key")
     improve_parser.add_argument("--prompt", required=True, help="Initial code generation prompt")
     improve_parser.add_argument("--iterations", type=int, default=3, help="Number of improvement iterations")
+    improve_parser.add_argument("--temperature", type=float, help=f"Sampling temperature (default: {config.TEMPERATURE}); 0 makes responses cacheable")
+    improve_parser.add_argument("--no-cache", action="store_true", help="Always call the API instead of reusing cached responses")
     improve_parser.add_argument("--commit", action="store_true", help="Commit changes to Git")
     improve_parser.add_argument("--file-path", help="Path to the file being improved")
 
@@ -209,20 +553,34 @@ async def main() -> None:
     parser = create_parser()
     args = parser.parse_args()
 
-    if args.command == "generate":
-        await handle_code_generation(args)
-    elif args.command == "analyze":
-        await handle_code_analysis(args)
-    elif args.command == "refactor":
-        await handle_code_refactoring(args)
-    elif args.command == "optimize":
-        await handle_code_optimization(args)
-    elif args.command == "improve":
-        await handle_continuous_improvement(args)
-    elif args.command == "test":
-        await handle_run_tests(args)
-    else:
-        parser.print_help()
+    try:
+        if args.command == "generate":
+            await handle_code_generation(args)
+        elif args.command == "analyze":
+            await handle_code_analysis(args)
+        elif args.command == "snapshot":
+            await handle_snapshot(args)
+        elif args.command == "metrics":
+            await handle_metrics(args)
+        elif args.command == "clones":
+            await handle_clones(args)
+        elif args.command == "daemon":
+            await handle_daemon(args)
+        elif args.command == "refactor":
+            await handle_code_refactoring(args)
+        elif args.command == "optimize":
+            await handle_code_optimization(args)
+        elif args.command == "improve":
+            await handle_continuous_improvement(args)
+        elif args.command == "test":
+            await handle_run_tests(args)
+        else:
+            parser.print_help()
+    finally:
+        # Only commands that called the API imported the client module; close its pooled connections
+        llm_client = sys.modules.get('llm_client')
+        if llm_client is not None:
+            await llm_client.close_clients()
 
 if __name__ == "__main__":
     asyncio.run(main())
\ No newline at end of file
@@ -0,0 +1,278 @@
+import asyncio
+import hashlib
+import io
+import keyword
+import os
+import tokenize
+import zlib
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, FrozenSet, Iterable, List, NamedTuple, Optional, Tuple
+from config import config
+from disk_cache import DiskCache
+from repo_analyzer import discover_python_files, read_source, source_chunks
+
+# Bump whenever tokens are normalized or hashed differently
+CLONE_FORMAT_VERSION = 1
+
+_SKIPPED_TOKENS = frozenset((tokenize.COMMENT, tokenize.NL, tokenize.ENCODING, tokenize.ENDMARKER))
+_MODULUS = (1 << 61) - 1
+_BASE = 1_000_003
+
+class Fingerprint(NamedTuple):
+    hash: int
+    token: int  # Index of the k-gram's first token in the normalized stream
+    start_line: int
+    end_line: int
+
+class CloneFragment(NamedTuple):
+    path: str
+    start_line: int
+    end_line: int
+
+class CloneGroup(NamedTuple):
+    fragments: List[CloneFragment]
+    tokens: int  # Normalized tokens in the shortest copy
+
+class CloneReport(NamedTuple):
+    groups: List[CloneGroup]
+    files: int
+    fingerprinted: int  # Files whose fingerprints were not cached
+    unparsable: List[str]
+
+def _normalize(token: tokenize.TokenInfo) -> str:
+    """Identifiers and literals are abstracted so renamed copies still match."""
+    if token.type == tokenize.NAME:
+        return token.string if keyword.iskeyword(token.string) else 'N'
+    if token.type == tokenize.NUMBER:
+        return '0'
+    if token.type == tokenize.STRING:
+        return 'S'
+    if token.type in (tokenize.NEWLINE, tokenize.INDENT, tokenize.DEDENT):
+        return tokenize.tok_name[token.type]
+    return token.string
+
+def _tokens(code: str) -> Tuple[List[int], List[int], List[int]]:
+    """The stable ids of the normalized tokens and the lines each one starts and ends on."""
+    ids, starts, ends = [], [], []
+    token_ids: Dict[str, int] = {}
+    for token in tokenize.generate_tokens(io.StringIO(code).readline):
+        if token.type in _SKIPPED_TOKENS:
+            continue
+        text = _normalize(token)
+        token_id = token_ids.get(text)
+        if token_id is None:
+            # crc32 rather than hash(), which is salted per process, so fingerprints can be stored
+            token_id = token_ids[text] = zlib.crc32(text.encode('utf-8'))
+        ids.append(token_id)
+        starts.append(token.start[0])
+        ends.append(token.end[0])
+    return ids, starts, ends
+
+def fingerprint(code: str) -> List[Fingerprint]:
+    """Winnow the rolling hashes of every k-token shingle, keeping the minimum of each window.
+
+    Any two token streams sharing CLONE_KGRAM + CLONE_WINDOW - 1 consecutive tokens share a fingerprint.
+
+    Raises SyntaxError or tokenize.TokenError for code that does not tokenize.
+    """
+    ids, starts, ends = _tokens(code)
+    k = config.CLONE_KGRAM
+    if len(ids) < k:
+        return []
+    top = pow(_BASE, k - 1, _MODULUS)
+    shingle = 0
+    for token_id in ids[:k]:
+        shingle = (shingle * _BASE + token_id) % _MODULUS
+    hashes = [shingle]
+    for i in range(k, len(ids)):
+        shingle = ((shingle - ids[i - k] * top) * _BASE + ids[i]) % _MODULUS
+        hashes.append(shingle)
+
+    # Monotonic deque of candidate minima; ties go to the rightmost shingle as in the winnowing paper
+    window = config.CLONE_WINDOW
+    candidates: deque = deque()
+    selected = []
+    last = -1
+    for i, value in enumerate(hashes):
+        while candidates and hashes[candidates[-1]] >= value:
+            candidates.pop()
+        candidates.append(i)
+        if candidates[0] <= i - window:
+            candidates.popleft()
+        if i >= window - 1 and candidates[0] != last:
+            last = candidates[0]
+            selected.append(Fingerprint(hashes[last], last, starts[last], ends[last + k - 1]))
+    if not selected:
+        # Files shorter than one window still contribute their smallest shingle
+        last = min(range(len(hashes)), key=hashes.__getitem__)
+        selected.append(Fingerprint(hashes[last], last, starts[last], ends[last + k - 1]))
+    return selected
+
+class CloneIndex:
+    """Inverted index from winnowed fingerprints to the files containing them.
+
+    update() and remove() cost time proportional to the one file, so a long-lived process can
+    keep the index current as files change and call clone_groups() whenever it needs a report.
+    """
+
+    def __init__(self):
+        self._files: Dict[str, List[Fingerprint]] = {}
+        # fingerprint hash -> {path: occurrences}
+        self._postings: Dict[int, Dict[str, int]] = {}
+
+    def __len__(self) -> int:
+        return len(self._files)
+
+    def update(self, path: str, code: str) -> bool:
+        """Re-index one file; returns False and drops the file when it does not tokenize."""
+        try:
+            fingerprints = fingerprint(code)
+        except (SyntaxError, tokenize.TokenError):
+            self.remove(path)
+            return False
+        self.add(path, fingerprints)
+        return True
+
+    def add(self, path: str, fingerprints: Iterable[Fingerprint]) -> None:
+        self.remove(path)
+        fingerprints = self._files[path] = [Fingerprint(*fp) for fp in fingerprints]
+        for fp in fingerprints:
+            paths = self._postings.setdefault(fp.hash, {})
+            paths[path] = paths.get(path, 0) + 1
+
+    def remove(self, path: str) -> None:
+        for fp in self._files.pop(path, ()):
+            paths = self._postings[fp.hash]
+            paths[path] -= 1
+            if not paths[path]:
+                del paths[path]
+                if not paths:
+                    del self._postings[fp.hash]
+
+    def _signatures(self) -> Dict[int, Optional[FrozenSet[str]]]:
+        """Map each fingerprint hash to the files containing it, or None if it occurs only once.
+
+        Equal sets of files are one shared object, so runs can be told apart by identity."""
+        interned: Dict[FrozenSet[str], FrozenSet[str]] = {}
+        signatures: Dict[int, Optional[FrozenSet[str]]] = {}
+        for fp_hash, paths in self._postings.items():
+            if len(paths) < 2 and sum(paths.values()) < 2:
+                signatures[fp_hash] = None
+            else:
+                shared = frozenset(paths)
+                signatures[fp_hash] = interned.setdefault(shared, shared)
+        return signatures
+
+    def clone_groups(self, min_tokens: Optional[int] = None) -> List[CloneGroup]:
+        """Group code that appears more than once, largest duplication first.
+
+        Consecutive shared fingerprints of a file that appear in the same set of files form one
+        fragment; fragments of different files starting on the same fingerprint are copies of each
+        other. A fragment is measured from its first fingerprint to the end of its last, which
+        falls short of the copy by less than two windows. Each set of files is built once per
+        fingerprint hash and every step is a single pass over the fingerprints, so this is linear
+        in the tree even when many files share the same code.
+        """
+        if min_tokens is None:
+            min_tokens = config.CLONE_MIN_TOKENS
+        k = config.CLONE_KGRAM
+        fragments: Dict[Tuple[FrozenSet[str], int], List[Tuple[CloneFragment, int]]] = {}
+
+        def flush(path: str, signature: FrozenSet[str], run: List[Fingerprint]) -> None:
+            tokens = run[-1].token + k - run[0].token
+            if tokens >= min_tokens:
+                key = (signature, run[0].hash)
+                fragments.setdefault(key, []).append((CloneFragment(path, run[0].start_line, run[-1].end_line), tokens))
+
+        signatures = self._signatures()
+        for path, fingerprints in self._files.items():
+            run: List[Fingerprint] = []
+            signature = None
+            for fp in fingerprints:
+                shared = signatures[fp.hash]
+                if run and shared is not signature:
+                    flush(path, signature, run)
+                    run = []
+                if shared is not None:
+                    signature = shared
+                    run.append(fp)
+            if run:
+                flush(path, signature, run)
+
+        groups = []
+        for copies in fragments.values():
+            unique = sorted(set(fragment for fragment, _ in copies))
+            if len(unique) > 1:
+                groups.append(CloneGroup(unique, min(tokens for _, tokens in copies)))
+        groups.sort(key=lambda group: (group.tokens * len(group.fragments), group.fragments), reverse=True)
+        return groups
+
+def get_clone_cache() -> DiskCache:
+    return DiskCache(os.path.join(config.CACHE_DIR, 'clones.sqlite3'), config.CLONE_CACHE_MAX_BYTES)
+
+def _hash(code: str) -> str:
+    parts = [str(CLONE_FORMAT_VERSION), str(config.CLONE_KGRAM), str(config.CLONE_WINDOW), code]
+    return hashlib.sha256('\0'.join(parts).encode('utf-8')).hexdigest()
+
+def _fingerprint_chunk(files: List[Tuple[str, str]]) -> List[Tuple[str, Optional[List[Fingerprint]]]]:
+    results = []
+    for key, code in files:
+        try:
+            results.append((key, fingerprint(code)))
+        except (SyntaxError, tokenize.TokenError):
+            results.append((key, None))
+    return results
+
+async def build_clone_index(root: str, ignore_patterns: Optional[List[str]] = None,
+                            use_cache: bool = True) -> Tuple[CloneIndex, int, List[str]]:
+    """Index every file under root, returning the index, the files fingerprinted afresh and unparsable paths.
+
+    Fingerprints are cached by content, so after the first run only changed files are tokenized;
+    those are spread over a pool of worker processes.
+    """
+    use_cache = use_cache and config.CLONE_CACHE_ENABLED
+    cache = get_clone_cache() if use_cache else None
+    sources: Dict[str, str] = {}
+    paths_by_key: Dict[str, List[str]] = {}
+    unparsable = []
+    for path in discover_python_files(root, ignore_patterns):
+        try:
+            code = read_source(path)
+        except (OSError, SyntaxError, UnicodeDecodeError):
+            unparsable.append(path)
+            continue
+        key = _hash(code)
+        if key not in paths_by_key:
+            sources[key] = code
+        paths_by_key.setdefault(key, []).append(path)
+
+    fingerprints = cache.get_many(sources) if cache is not None else {}
+    stale = [(key, code) for key, code in sources.items() if key not in fingerprints]
+    if stale:
+        loop = asyncio.get_running_loop()
+        with ProcessPoolExecutor(max_workers=config.ANALYSIS_WORKERS) as pool:
+            results = await asyncio.gather(*(loop.run_in_executor(pool, _fingerprint_chunk, chunk)
+                                             for chunk in source_chunks(stale)))
+        fresh = {key: file_fingerprints for chunk in results for key, file_fingerprints in chunk}
+        fingerprints.update(fresh)
+        if cache is not None:
+            cache.set_many({key: file_fingerprints for key, file_fingerprints in fresh.items()
+                            if file_fingerprints is not None})
+    if cache is not None:
+        cache.close()
+
+    index = CloneIndex()
+    for key, paths in paths_by_key.items():
+        for path in paths:
+            if fingerprints[key] is None:
+                unparsable.append(path)
+            else:
+                index.add(path, fingerprints[key])
+    return index, sum(len(paths_by_key[key]) for key, _ in stale), sorted(unparsable)
+
+async def find_clones(root: str, ignore_patterns: Optional[List[str]] = None, use_cache: bool = True,
+                      min_tokens: Optional[int] = None) -> CloneReport:
+    """Report groups of duplicated code under root in time roughly linear in the size of the tree."""
+    index, fingerprinted, unparsable = await build_clone_index(root, ignore_patterns, use_cache)
+    return CloneReport(index.clone_groups(min_tokens), len(index), fingerprinted, unparsable)
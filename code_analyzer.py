@@ -1,59 +1,657 @@
+import ast
 import asyncio
-import tempfile
+import ctypes
+import functools
+import hashlib
+import json
 import os
-from typing import List, Dict
-from pylint.lint import Run
-from pylint.reporters import CollectingReporter
+import re
+import signal
+import sys
+import time
+import weakref
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+import threading
+from contextlib import ExitStack, contextmanager
+from typing import Any, AsyncIterator, Callable, Iterable, Iterator, List, Dict, Optional, Sequence, Tuple, Union
+import astroid
+from pylint import __version__ as pylint_version
+from pylint.config import find_default_config_files
+from pylint.config.config_initialization import _config_initialization
+from pylint.lint import PyLinter
+from pylint.lint.expand_modules import discover_package_path
+from pylint.lint.utils import augmented_sys_path
+from pylint.reporters import BaseReporter, CollectingReporter
+from pylint.typing import FileItem
 import logging
+import astroid_snapshot
+from analysis_timings import FILES, PARSE_PHASE, PHASES, AnalysisTimings, instrument_module_checker, timed_astroid
+from config import config
+from baseline import Baseline
+from disk_cache import DiskCache
+from issues import NO_ISSUES, Issue, IssueBatch, is_partial, syntax_error_issue, timeout_issue
 
 # Suppress Pylint output in tests
 logging.getLogger('pylint').setLevel(logging.CRITICAL)
 
-async def analyze_code(code: str) -> list:
-    issues = []
+# Name reported for snippets that do not come from a file
+SNIPPET_FILENAME = 'snippet.py'
+_IMPORT_PATTERN = re.compile(r'^[ \t]*(?:import|from)[ \t]', re.MULTILINE)
+# Bump whenever the shape or wording of cached issues changes
+CACHE_FORMAT_VERSION = 2
+
+# A profile name from Config.PYLINT_PROFILES, 'custom', or a dict of custom rules
+Profile = Union[str, Dict[str, Any]]
+
+# Warm linters, one per set of pylint arguments, built once per process (the parent or a pool worker) on first use
+_linters: Dict[Tuple[str, ...], PyLinter] = {}
+_worker_pool: Optional[ProcessPoolExecutor] = None
+_JOB_POLL_INTERVAL = 0.05  # Seconds between checks for a queued job reaching a worker
+_analysis_cache: Optional[DiskCache] = None
+_linter_lock = threading.Lock()
+_analysis_semaphores: 'weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, asyncio.Semaphore]' = weakref.WeakKeyDictionary()
+
+class _SourceLinter(PyLinter):
+    """PyLinter that builds the module from in-memory source instead of reading the file,
+    optionally timing the parse and every checker hook."""
+
+    source: Optional[str] = None
+    timings: Optional[AnalysisTimings] = None
+
+    def get_ast(self, filepath, modname, data=None):
+        data = self.source if data is None else data
+        if self.timings is None:
+            return super().get_ast(filepath, modname, data)
+        with self.timings.measure(PHASES, PARSE_PHASE):
+            return super().get_ast(filepath, modname, data)
+
+    @contextmanager
+    def _astroid_module_checker(self):
+        with super()._astroid_module_checker() as check_astroid_module:
+            if self.timings is not None:
+                check_astroid_module = instrument_module_checker(check_astroid_module, self.timings)
+            yield check_astroid_module
 
-    with tempfile.NamedTemporaryFile(mode='w', suffix='.py', delete=False) as tmp_file:
-        tmp_file.write(code)
-        tmp_file_path = tmp_file.name
+def rules_to_args(rules: Dict[str, Any]) -> List[str]:
+    """Turn {'max-line-length': 100, 'disable': ['C0103']} style rules into pylint arguments."""
+    args = []
+    for option, value in rules.items():
+        if isinstance(value, (list, tuple)):
+            value = ','.join(str(item) for item in value)
+        args.append(f"--{option}={value}")
+    return args
 
+def profile_args(profile: Optional[Profile] = None) -> Tuple[str, ...]:
+    """Resolve a checker profile to the full pylint argument list, Config.PYLINT_ARGS first."""
+    if profile is None:
+        profile = config.ANALYSIS_PROFILE
+    if isinstance(profile, dict):
+        # Custom rules refine the full profile rather than starting from every checker
+        args = config.PYLINT_PROFILES['full'] + rules_to_args(profile)
+    elif profile == 'custom':
+        args = config.PYLINT_PROFILES['full'] + rules_to_args(config.PYLINT_CUSTOM_RULES)
+    elif profile in config.PYLINT_PROFILES:
+        args = config.PYLINT_PROFILES[profile]
+    else:
+        raise ValueError(f"Unknown analysis profile: {profile}")
+    return tuple(config.PYLINT_ARGS + args)
+
+@functools.lru_cache(maxsize=16)
+def _config_file_digest(path: str, mtime_ns: int, size: int) -> str:
+    with open(path, 'rb') as config_file:
+        return hashlib.sha256(config_file.read()).hexdigest()
+
+def pylint_config_fingerprint() -> str:
+    """Identify the pylintrc (or pyproject.toml, setup.cfg) pylint loads from here, and its contents.
+
+    Empty when there is none. Contents are only re-read after the file's mtime or size changes.
+    """
+    path = next(find_default_config_files(), None)
+    if path is None:
+        return ''
     try:
-        reporter = CollectingReporter()
-        Run([tmp_file_path], reporter=reporter, exit=False)
-
-        for msg in reporter.messages:
-            # Adjust message for syntax errors
-            if msg.symbol == 'syntax-error' or msg.msg_id == 'E0001':
-                message = f"Syntax Error: {msg.msg}"
-                issues.append({
-                    'type': 'error',
-                    'line': str(msg.line),
-                    'column': str(msg.column),
-                    'message': message
-                })
-            elif msg.category in ['error', 'warning']:
-                issues.append({
-                    'type': msg.category,
-                    'line': str(msg.line),
-                    'column': str(msg.column),
-                    'message': msg.msg or msg.symbol
-                })
-            # Ignore convention and refactor messages
-
-        if not issues:
-            issues = [{'type': 'info', 'line': '1', 'column': '1', 'message': 'No issues found'}]
-    except Exception as e:
-        # If Pylint raises an exception, capture it as a syntax error
-        issues.append({
-            'type': 'error',
-            'line': '1',
-            'column': '1',
-            'message': f"Syntax Error: {str(e)}"
-        })
+        stat = os.stat(path)
+        return f"{os.path.abspath(path)}:{_config_file_digest(str(path), stat.st_mtime_ns, stat.st_size)}"
+    except OSError:
+        return ''
+
+def _get_linter(args: Sequence[str] = ()) -> PyLinter:
+    # Called with _linter_lock held. A linter is configured from the pylintrc once, so an edited pylintrc needs a new one
+    key = tuple(args) + (pylint_config_fingerprint(),)
+    linter = _linters.get(key)
+    if linter is None:
+        if config.ASTROID_SNAPSHOT_ENABLED:
+            astroid_snapshot.load_snapshot_once()
+        linter = _SourceLinter()
+        linter.load_default_plugins()
+        # pylint only runs checkers that still have an enabled message, so a narrow profile skips the rest
+        _config_initialization(linter, list(args), CollectingReporter(), config_file=next(find_default_config_files(), None))
+        _linters[key] = linter
+    return linter
+
+def _file_item(filepath: str) -> FileItem:
+    try:
+        # Search from the file's package root, as pylint does, so relative imports resolve outside sys.path too
+        modname = '.'.join(astroid.modutils.modpath_from_file(filepath, [discover_package_path(filepath, [])]))
+    except ImportError:
+        modname = os.path.splitext(os.path.basename(filepath))[0]
+    return FileItem(modname, filepath, filepath)
+
+def _message_to_issue(msg) -> Optional[Issue]:
+    # Adjust message for syntax errors
+    if msg.symbol == 'syntax-error' or msg.msg_id == 'E0001':
+        return Issue.make('error', msg.line, msg.column, f"Syntax Error: {msg.msg}", msg.symbol)
+    if msg.category in ['error', 'warning']:
+        return Issue.make(msg.category, msg.line, msg.column, msg.msg or msg.symbol, msg.symbol)
+    # Ignore convention and refactor messages
+    return None
+
+def _collect_issues(messages: list) -> IssueBatch:
+    return IssueBatch(issue for issue in map(_message_to_issue, messages) if issue is not None)
+
+class _StreamingReporter(BaseReporter):
+    """Reporter that hands every issue to a callback the moment a checker emits it."""
+
+    name = 'streaming'
+
+    def __init__(self, on_issue: Callable[[Issue], None]):
+        super().__init__()
+        self.on_issue = on_issue
+
+    def handle_message(self, msg) -> None:
+        issue = _message_to_issue(msg)
+        if issue is not None:
+            self.on_issue(issue)
+
+    def _display(self, layout) -> None:
+        pass
+
+class _StreamClosed(Exception):
+    """Raised into a streaming pylint run once its consumer has gone away."""
+
+def _syntax_error_issue(code: str, modname: str) -> Optional[Issue]:
+    try:
+        ast.parse(code, filename=modname)
+    except SyntaxError as e:
+        return syntax_error_issue(e)
+    return None
+
+def syntax_error_issues(code: str, modname: str = 'snippet') -> Optional[List[Dict[str, str]]]:
+    """Return the issue pylint would report for unparsable code, or None if the code parses."""
+    issue = _syntax_error_issue(code, modname)
+    return None if issue is None else [issue.to_dict()]
+
+def _crash_issue(e: Exception) -> Issue:
+    # If Pylint raises an exception, capture it as a syntax error
+    return Issue.make('error', 1, 1, f"Syntax Error: {str(e)}", 'astroid-error')
+
+class _AnalysisTimeout(BaseException):
+    """Raised by SIGALRM inside a run that used up its time budget.
+
+    Not an Exception, so the broad handlers in pylint and astroid cannot swallow it."""
+
+def _raise_timeout(signum, frame) -> None:
+    raise _AnalysisTimeout()
+
+def _interrupt_thread(thread_id: int) -> None:
+    ctypes.pythonapi.PyThreadState_SetAsyncExc(ctypes.c_ulong(thread_id), ctypes.py_object(_AnalysisTimeout))
+
+@contextmanager
+def _thread_time_budget(seconds: float) -> Iterator[None]:
+    """Interrupt a block running off the main thread, which signals cannot reach, from a timer thread.
+
+    The exception is raised between bytecodes, so a thread blocked inside a C call is interrupted
+    once that call returns."""
+    thread_id = threading.get_ident()
+    lock = threading.Lock()
+    running = True
+
+    def interrupt() -> None:
+        with lock:
+            if running:
+                _interrupt_thread(thread_id)
+
+    timer = threading.Timer(seconds, interrupt)
+    timer.daemon = True
+    timer.start()
+    try:
+        yield
+    finally:
+        timer.cancel()
+        with lock:
+            running = False
+
+@contextmanager
+def _time_budget(seconds: Optional[float]) -> Iterator[None]:
+    """Interrupt the block with _AnalysisTimeout after seconds.
+
+    Pool workers run their jobs on the main thread and are interrupted by SIGALRM; streaming
+    runs on other threads and are interrupted from a timer thread."""
+    if not seconds:
+        yield
+        return
+    if not hasattr(signal, 'setitimer') or threading.current_thread() is not threading.main_thread():
+        with _thread_time_budget(seconds):
+            yield
+        return
+    previous = signal.signal(signal.SIGALRM, _raise_timeout)
+    signal.setitimer(signal.ITIMER_REAL, seconds)
+    try:
+        yield
     finally:
-        os.unlink(tmp_file_path)
+        signal.setitimer(signal.ITIMER_REAL, 0)
+        signal.signal(signal.SIGALRM, previous)
 
+def _discard_analysis_state() -> None:
+    """Drop this process's linters and astroid caches after a run was interrupted part-way.
+
+    The run may have left half-built modules and checker state behind, so the next one starts
+    from fresh linters, reloading the snapshot if there is one."""
+    with _linter_lock:
+        _linters.clear()
+        astroid.MANAGER.clear_cache()
+        astroid_snapshot.forget_snapshot()
+
+def _lint(code: str, file_item: FileItem, reporter: BaseReporter, args: Sequence[str],
+          timings: Optional[AnalysisTimings] = None, time_budget: Optional[float] = None) -> None:
+    """Run this process's warm linter for args over in-memory source, sending messages to reporter.
+
+    With a time_budget in seconds, raises _AnalysisTimeout once it runs out; messages reported
+    until then stay with the reporter."""
+    # The linters, the snapshot and astroid's manager are process-wide state, one run at a time
+    with _linter_lock, ExitStack() as timing:
+        linter = _get_linter(args)
+        # Budget only the run itself, not building the linter or waiting for the lock
+        timing.enter_context(_time_budget(time_budget))
+        if timings is not None:
+            timing.enter_context(timings.measure(FILES, file_item.filepath))
+            timing.enter_context(timed_astroid(timings))
+        try:
+            linter.set_reporter(reporter)
+            linter.source = code
+            linter.timings = timings
+            linter.initialize()
+            linter.open()
+            with augmented_sys_path([discover_package_path(file_item.filepath, linter.config.source_roots)]):
+                linter.check_single_file_item(file_item)
+        finally:
+            linter.source = None
+            linter.timings = None
+            # Drop the analyzed module so a long-lived linter does not keep every snippet alive
+            cached = astroid.MANAGER.astroid_cache.get(file_item.name)
+            if cached is not None and cached.file == file_item.filepath:
+                del astroid.MANAGER.astroid_cache[file_item.name]
+
+def _run_pylint(code: str, filepath: str = SNIPPET_FILENAME, args: Optional[Sequence[str]] = None,
+                timings: Optional[AnalysisTimings] = None, time_budget: Optional[float] = None) -> IssueBatch:
+    """Lint source held in memory; filepath only names the module and anchors import resolution.
+
+    A run that outlasts time_budget seconds returns the issues found so far plus a timeout marker.
+    """
+    if args is None:
+        args = profile_args()
+    file_item = _file_item(filepath)
+    # Unparsable code can only ever produce a syntax error, so skip loading it into pylint
+    issue = _syntax_error_issue(code, file_item.name)
+    if issue is not None:
+        return IssueBatch([issue])
+
+    reporter = CollectingReporter()
+    try:
+        _lint(code, file_item, reporter, args, timings, time_budget)
+    except _AnalysisTimeout:
+        _discard_analysis_state()
+        issues = _collect_issues(reporter.messages)
+        issues.append(timeout_issue(f"Analysis stopped after {time_budget:g}s; only issues found before then are reported"))
+        return issues
+    except Exception as e:
+        return IssueBatch([_crash_issue(e)])
+
+    issues = _collect_issues(reporter.messages)
+    if not issues:
+        issues.append(NO_ISSUES)
     return issues
 
+def _deadline_issue() -> Issue:
+    return timeout_issue("Analysis did not finish before the batch deadline")
+
+def _stuck_issue() -> Issue:
+    return timeout_issue("Analysis did not stop at its time limit; its worker was restarted")
+
+def _pool_job(code: str, filepath: str, args: Sequence[str], timed: bool, file_timeout: Optional[float],
+              deadline: Optional[float]) -> Tuple[IssueBatch, Optional[dict]]:
+    """Worker entry point: lint within the per-file budget, shortened to what is left before the batch deadline."""
+    time_budget = file_timeout
+    if deadline is not None:
+        remaining = deadline - time.time()
+        if remaining <= 0:
+            return IssueBatch([_deadline_issue()]), None
+        time_budget = remaining if time_budget is None else min(time_budget, remaining)
+    timings = AnalysisTimings() if timed else None
+    issues = _run_pylint(code, filepath, args, timings, time_budget)
+    return issues, None if timings is None else timings.to_dict()
+
+def _stream_pylint(code: str, filepath: str, on_issue: Callable[[Issue], None], args: Sequence[str],
+                   time_budget: Optional[float] = None) -> None:
+    file_item = _file_item(filepath)
+    issue = _syntax_error_issue(code, file_item.name)
+    if issue is not None:
+        on_issue(issue)
+        return
+
+    try:
+        _lint(code, file_item, _StreamingReporter(on_issue), args, time_budget=time_budget)
+    except _AnalysisTimeout:
+        _discard_analysis_state()
+        on_issue(timeout_issue(f"Analysis stopped after {time_budget:g}s; only issues found before then are reported"))
+    except Exception as e:
+        # pylint wraps errors raised inside checkers, so look at the cause as well
+        if isinstance(e, _StreamClosed) or isinstance(e.__cause__, _StreamClosed):
+            return
+        on_issue(_crash_issue(e))
+
+def _init_worker() -> None:
+    # Load checkers, astroid brains and the builtins module before the first real snippet arrives
+    _run_pylint('')
+
+def build_astroid_snapshot(sources: Iterable[Tuple[str, str]], path: Optional[str] = None) -> int:
+    """Lint (filepath, code) pairs in this process so astroid loads everything they import,
+    then snapshot the warmed module cache for later processes to start from."""
+    for filepath, code in sources:
+        _run_pylint(code, filepath)
+    return astroid_snapshot.save_snapshot(path)
+
+def get_worker_pool() -> ProcessPoolExecutor:
+    global _worker_pool
+    if _worker_pool is None:
+        _worker_pool = ProcessPoolExecutor(max_workers=config.ANALYSIS_WORKERS, initializer=_init_worker)
+    return _worker_pool
+
+def shutdown_worker_pool() -> None:
+    global _worker_pool
+    if _worker_pool is not None:
+        _worker_pool.shutdown(wait=True)
+        _worker_pool = None
+
+def recycle_worker_pool(pool: Optional[ProcessPoolExecutor] = None) -> None:
+    """Kill the pool's workers without waiting; the next analysis starts a fresh pool.
+
+    Jobs still running on the old pool fail with BrokenProcessPool."""
+    global _worker_pool
+    pool = pool or _worker_pool
+    if pool is None:
+        return
+    if pool is _worker_pool:
+        _worker_pool = None
+    # shutdown() would wait on a stuck worker, so stop the processes first
+    for process in list((pool._processes or {}).values()):
+        process.terminate()
+    pool.shutdown(wait=False, cancel_futures=True)
+
+def get_analysis_cache() -> DiskCache:
+    global _analysis_cache
+    path = os.path.join(config.CACHE_DIR, 'analysis.sqlite3')
+    if _analysis_cache is None or _analysis_cache.path != path:
+        _analysis_cache = DiskCache(path, config.ANALYSIS_CACHE_MAX_BYTES)
+    return _analysis_cache
+
+def analysis_environment() -> list:
+    """Everything besides the source and arguments that can change pylint's verdict: the pylint and
+    astroid versions, the Python running them, and the pylintrc."""
+    return [CACHE_FORMAT_VERSION, pylint_version, astroid.__version__, sys.version, pylint_config_fingerprint()]
+
+def analysis_cache_key(code: str, args: Optional[Sequence[str]] = None, environment: Optional[list] = None,
+                       filepath: str = SNIPPET_FILENAME) -> str:
+    """Hash the source together with everything that can change pylint's verdict on it.
+
+    Imports resolve relative to the file's directory (its package, or the working directory for
+    snippets), so code that imports is keyed on that directory too; copies of it elsewhere can
+    be judged differently. Batches pass analysis_environment() computed once, rather than
+    looking up the pylintrc per file.
+    """
+    if args is None:
+        args = profile_args()
+    if environment is None:
+        environment = analysis_environment()
+    location = os.path.dirname(os.path.abspath(filepath)) if _IMPORT_PATTERN.search(code) else None
+    fingerprint = json.dumps([environment, list(args), location, code])
+    return hashlib.sha256(fingerprint.encode('utf-8')).hexdigest()
+
+def _get_analysis_semaphore() -> asyncio.Semaphore:
+    # Semaphores belong to one event loop, so keep one per loop rather than a single global
+    loop = asyncio.get_running_loop()
+    semaphore = _analysis_semaphores.get(loop)
+    if semaphore is None:
+        semaphore = _analysis_semaphores[loop] = asyncio.Semaphore(config.ANALYSIS_CONCURRENCY)
+    return semaphore
+
+async def _await_job(job: Future, deadline: Optional[float]) -> Any:
+    """Wait for a pool job, raising asyncio.TimeoutError once it overruns every limit its worker honours.
+
+    A worker starts its per-file clock when it takes the job, which can be a while after
+    submission on a busy pool, so that clock starts here once the pool hands the job over.
+    """
+    future = asyncio.wrap_future(job)
+    limit = None if deadline is None else deadline + config.ANALYSIS_TIMEOUT_GRACE
+    if config.ANALYSIS_FILE_TIMEOUT:
+        while not job.running() and not job.done():
+            if limit is not None and time.time() >= limit:
+                raise asyncio.TimeoutError()
+            await asyncio.wait({future}, timeout=_JOB_POLL_INTERVAL)
+        file_limit = time.time() + config.ANALYSIS_FILE_TIMEOUT + config.ANALYSIS_TIMEOUT_GRACE
+        limit = file_limit if limit is None else min(limit, file_limit)
+    if limit is None:
+        return await future
+    return await asyncio.wait_for(future, max(0.0, limit - time.time()))
+
+async def _analyze_in_pool(code: str, filepath: str = SNIPPET_FILENAME, args: Optional[Sequence[str]] = None,
+                           timings: Optional[AnalysisTimings] = None, deadline: Optional[float] = None) -> IssueBatch:
+    """Run pylint on the worker pool without blocking the event loop.
+
+    The worker stops after Config.ANALYSIS_FILE_TIMEOUT seconds, or at deadline (a time.time()
+    value), and returns partial results. A worker that misses either by more than
+    Config.ANALYSIS_TIMEOUT_GRACE is stuck where its alarm cannot reach, so the pool is recycled.
+    So is a pool whose worker died (OOM kill, segfault); the job is then retried once.
+
+    Cancelling the awaiting task withdraws a job that has not started yet; a job already
+    running in a worker finishes there and its result is dropped.
+    """
+    async with _get_analysis_semaphore():
+        # A recycled pool fails the jobs it was running; give those one more go on the new pool
+        for attempt in range(2):
+            if deadline is not None and time.time() >= deadline:
+                return IssueBatch([_deadline_issue()])
+            pool = get_worker_pool()
+            try:
+                job = pool.submit(_pool_job, code, filepath, args, timings is not None, config.ANALYSIS_FILE_TIMEOUT, deadline)
+                issues, worker_timings = await _await_job(job, deadline)
+                break
+            except asyncio.TimeoutError:
+                if not job.cancel():
+                    recycle_worker_pool(pool)
+                past_deadline = deadline is not None and time.time() >= deadline
+                return IssueBatch([_deadline_issue() if past_deadline else _stuck_issue()])
+            except BrokenProcessPool:
+                # Either a worker died or another job recycled the pool; later jobs need a fresh one
+                recycle_worker_pool(pool)
+                if attempt:
+                    raise
+    if timings is not None and worker_timings is not None:
+        timings.merge(AnalysisTimings.from_dict(worker_timings))
+    return issues
+
+def _cached_batch(cache: DiskCache, key: str) -> Optional[IssueBatch]:
+    data = cache.get(key)
+    return None if data is None else IssueBatch.from_json(data)
+
+def _batch_deadline() -> Optional[float]:
+    return None if not config.ANALYSIS_BATCH_TIMEOUT else time.time() + config.ANALYSIS_BATCH_TIMEOUT
+
+async def _analyze(code: str, args: Sequence[str], use_cache: bool, timings: Optional[AnalysisTimings],
+                   deadline: Optional[float] = None) -> IssueBatch:
+    if not (use_cache and config.ANALYSIS_CACHE_ENABLED):
+        return await _analyze_in_pool(code, args=args, timings=timings, deadline=deadline)
+    cache = get_analysis_cache()
+    key = analysis_cache_key(code, args)
+    issues = _cached_batch(cache, key) if timings is None else None
+    if issues is None:
+        issues = await _analyze_in_pool(code, args=args, timings=timings, deadline=deadline)
+        # Partial results would hide the issues a later run with more time finds
+        if not is_partial(issues):
+            cache.set(key, issues.to_json())
+    return issues
+
+async def analyze_code(code: str, use_cache: bool = True, profile: Optional[Profile] = None, compact: bool = False,
+                       timings: Optional[AnalysisTimings] = None):
+    """Return the code's issues as a list of dicts, or as an IssueBatch when compact=True.
+
+    Pass an AnalysisTimings to collect per-checker, per-phase and per-file timings into it;
+    a cached result would have nothing to time, so the run always goes to pylint then.
+    Analysis past Config.ANALYSIS_FILE_TIMEOUT is cut short; see issues.is_partial.
+    """
+    issues = await _analyze(code, profile_args(profile), use_cache, timings)
+    return issues if compact else issues.to_dicts()
+
+async def analyze_many(codes: List[str], use_cache: bool = True, profile: Optional[Profile] = None,
+                       compact: bool = False, timings: Optional[AnalysisTimings] = None) -> list:
+    """Analyze several snippets on the warm worker pool, returning results in input order.
+
+    Identical snippets are analyzed once. The whole batch is bounded by
+    Config.ANALYSIS_BATCH_TIMEOUT as well as the per-file budget.
+    """
+    args = profile_args(profile)
+    deadline = _batch_deadline()
+    distinct = list(dict.fromkeys(codes))
+    results = dict(zip(distinct, await asyncio.gather(*(_analyze(code, args, use_cache, timings, deadline)
+                                                         for code in distinct))))
+    return [results[code] if compact else results[code].to_dicts() for code in codes]
+
+async def analyze_code_stream(code: str, use_cache: bool = True,
+                              profile: Optional[Profile] = None) -> AsyncIterator[Dict[str, str]]:
+    """Yield issues one by one while pylint is still checking the code.
+
+    pylint runs on a thread of this process and blocks on a bounded queue when the consumer falls
+    behind, so memory stays flat however many issues there are. The result is cached only when it
+    is small enough to keep; a cached result is replayed directly.
+
+    A run that outlasts Config.ANALYSIS_FILE_TIMEOUT ends with a timeout marker and is not cached.
+    """
+    args = profile_args(profile)
+    use_cache = use_cache and config.ANALYSIS_CACHE_ENABLED
+    key = analysis_cache_key(code, args) if use_cache else None
+    cached_issues = _cached_batch(get_analysis_cache(), key) if use_cache else None
+    if cached_issues is not None:
+        for issue in cached_issues:
+            yield issue.to_dict()
+        return
+
+    loop = asyncio.get_running_loop()
+    queue: asyncio.Queue = asyncio.Queue(maxsize=config.ANALYSIS_STREAM_BUFFER)
+    closed = threading.Event()
+    finished = object()
+
+    def emit(issue: Issue) -> None:
+        if closed.is_set():
+            raise _StreamClosed()
+        asyncio.run_coroutine_threadsafe(queue.put(issue), loop).result()
+
+    def run() -> None:
+        try:
+            _stream_pylint(code, SNIPPET_FILENAME, emit, args, config.ANALYSIS_FILE_TIMEOUT)
+        finally:
+            if not closed.is_set():
+                asyncio.run_coroutine_threadsafe(queue.put(finished), loop).result()
+
+    producer = loop.run_in_executor(None, run)
+    # Keep a copy for the cache only while it stays small
+    kept: Optional[IssueBatch] = IssueBatch() if use_cache else None
+    has_issues = False
+    try:
+        while True:
+            issue = await queue.get()
+            if issue is finished:
+                break
+            has_issues = True
+            if kept is not None:
+                kept.append(issue)
+                if len(kept) > config.ANALYSIS_STREAM_CACHE_MAX_ISSUES:
+                    kept = None
+            yield issue.to_dict()
+
+        if not has_issues:
+            if kept is not None:
+                kept.append(NO_ISSUES)
+            yield NO_ISSUES.to_dict()
+        if kept is not None and not is_partial(kept):
+            get_analysis_cache().set(key, kept.to_json())
+    finally:
+        closed.set()
+        # Unblock a producer waiting on a full queue so it can notice the stream was closed
+        while not queue.empty():
+            queue.get_nowait()
+        await producer
+
+async def analyze_sources(sources: Iterable[Tuple[str, str]], use_cache: bool = True,
+                          profile: Optional[Profile] = None, compact: bool = False,
+                          timings: Optional[AnalysisTimings] = None,
+                          baseline: Optional[Baseline] = None) -> AsyncIterator[Tuple[str, Any]]:
+    """Analyze (filepath, code) pairs on the worker pool, yielding each file's issues as soon as it finishes.
+
+    Issues come as lists of dicts, or as IssueBatches when compact=True, which is much lighter
+    for whole-repository scans. As with analyze_code, timings bypasses cached results.
+
+    Each file gets Config.ANALYSIS_FILE_TIMEOUT seconds and the batch Config.ANALYSIS_BATCH_TIMEOUT;
+    files cut short yield what was found so far plus a timeout marker, and are not cached.
+
+    Files with identical contents (generated stubs, copies) are analyzed once and every path
+    yields that result, unless they import: imports resolve per directory, so those are shared
+    only within one directory. The cache key makes the same distinction.
+
+    With a baseline, issues it accepts are dropped before anything is serialized; the cache
+    always keeps the full results.
+    """
+    args = profile_args(profile)
+    use_cache = use_cache and config.ANALYSIS_CACHE_ENABLED
+    cache = get_analysis_cache() if use_cache else None
+    deadline = _batch_deadline()
+
+    async def analyze_one(filepath: str, code: str, key: str) -> Tuple[str, str, IssueBatch]:
+        issues = await _analyze_in_pool(code, filepath, args, timings, deadline)
+        if use_cache and not is_partial(issues):
+            cache.set(key, issues.to_json())
+        return key, code, issues
+
+    def report(filepath: str, code: str, issues: IssueBatch) -> Any:
+        if baseline is not None:
+            issues = baseline.filter(filepath, issues, code)
+        return issues if compact else issues.to_dicts()
+
+    # Paths waiting on each distinct content that is being analyzed
+    paths_by_key: Dict[str, List[str]] = {}
+    pending = []
+    environment = analysis_environment()
+    try:
+        for filepath, code in sources:
+            key = analysis_cache_key(code, args, environment, filepath)
+            if key in paths_by_key:
+                paths_by_key[key].append(filepath)
+                continue
+            issues = _cached_batch(cache, key) if use_cache and timings is None else None
+            if issues is not None:
+                yield filepath, report(filepath, code, issues)
+                continue
+            paths_by_key[key] = [filepath]
+            pending.append(asyncio.ensure_future(analyze_one(filepath, code, key)))
+
+        for next_done in asyncio.as_completed(pending):
+            key, code, issues = await next_done
+            for filepath in paths_by_key.pop(key):
+                yield filepath, report(filepath, code, issues)
+    finally:
+        for task in pending:
+            task.cancel()
+
 def parse_pylint_output(output: str) -> List[Dict[str, str]]:
     issues = []
     for line in output.split('\n'):
@@ -82,7 +680,7 @@ async def main():
         }
     
     try:
-        analysis_results = await analyze_code(code)
+        analysis_results = await analyze_code(code, profile=custom_rules)
         if analysis_results:
             print("\nAnalysis Results:")
             for issue in analysis_results:
@@ -1,60 +1,183 @@
-import openai
-from typing import Dict, Any, List
+from typing import AsyncIterator, Dict, Any, Iterable, List, Optional, Tuple
+import asyncio
 import json
+import jiter
+from config import config
+from llm_client import close_clients, complete, get_response_cache, is_cacheable, response_cache_key
 
-async def generate_code(prompt: str, api_key: str, context: str = "", language: str = "python", model: str = "gpt-3.5-turbo") -> Dict[str, Any]:
-    openai.api_key = api_key
-    
+# Forcing this tool makes the model answer with JSON arguments instead of free text
+CODE_RESPONSE_TOOL = {
+    "type": "function",
+    "function": {
+        "name": "generate_code_response",
+        "description": "Generate code based on the given prompt and context",
+        "parameters": {
+            "type": "object",
+            "properties": {
+                "code": {
+                    "type": "string",
+                    "description": "The generated code"
+                },
+                "explanation": {
+                    "type": "string",
+                    "description": "A brief explanation of the generated code"
+                },
+                "suggestions": {
+                    "type": "array",
+                    "items": {
+                        "type": "string"
+                    },
+                    "description": "A list of suggestions for improvement or alternative approaches"
+                }
+            },
+            "required": ["code", "explanation"]
+        }
+    }
+}
+
+def _build_request(prompt: str, context: str, language: str, model: str, temperature: Optional[float]) -> Dict[str, Any]:
     if not prompt:
         raise ValueError("Prompt cannot be empty")
     
     system_message = f"You are an expert {language} programmer. Generate code based on the given prompt and context."
+    return {
+        "model": model,
+        "messages": [
+            {"role": "system", "content": system_message},
+            {"role": "user", "content": f"Context: {context}\n\nPrompt: {prompt}"}
+        ],
+        "temperature": config.TEMPERATURE if temperature is None else temperature,
+        "max_tokens": config.MAX_TOKENS,
+        "n": 1,
+        "tools": [CODE_RESPONSE_TOOL],
+        "tool_choice": {"type": "function", "function": {"name": "generate_code_response"}}
+    }
+
+async def generate_code(prompt: str, api_key: str, context: str = "", language: str = "python", model: str = "gpt-3.5-turbo",
+                        temperature: Optional[float] = None, use_cache: bool = True) -> Dict[str, Any]:
+    """Generate code for a prompt, returning the model's code, explanation and suggestions.
+
+    Identical requests are answered from the response cache when they are deterministic
+    (temperature 0) or Config.LLM_CACHE_SAMPLED is set; see llm_client.is_cacheable. Transient
+    API errors are retried and slow requests may be hedged; see llm_client.complete.
+    """
+    request = _build_request(prompt, context, language, model, temperature)
+    cache = get_response_cache() if is_cacheable(request, use_cache) else None
+    key = response_cache_key(request) if cache is not None else None
+    if cache is not None:
+        cached = cache.get(key)
+        if cached is not None:
+            return cached
     
     try:
-        response = await openai.ChatCompletion.create(
-            model=model,
-            messages=[
-                {"role": "system", "content": system_message},
-                {"role": "user", "content": f"Context: {context}\n\nPrompt: {prompt}"}
-            ],
-            temperature=0.7,
-            max_tokens=1000,
-            n=1,
-            stop=None,
-            functions=[
-                {
-                    "name": "generate_code_response",
-                    "description": "Generate code based on the given prompt and context",
-                    "parameters": {
-                        "type": "object",
-                        "properties": {
-                            "code": {
-                                "type": "string",
-                                "description": "The generated code"
-                            },
-                            "explanation": {
-                                "type": "string",
-                                "description": "A brief explanation of the generated code"
-                            },
-                            "suggestions": {
-                                "type": "array",
-                                "items": {
-                                    "type": "string"
-                                },
-                                "description": "A list of suggestions for improvement or alternative approaches"
-                            }
-                        },
-                        "required": ["code", "explanation"]
-                    }
-                }
-            ],
-            function_call={"name": "generate_code_response"}
-        )
-        
-        function_response = json.loads(response.choices[0].function_call.arguments)
-        return function_response
+        # The client is shared per API key, so repeated calls reuse its open connections
+        response = await complete(api_key, request)
+        function_response = json.loads(response.choices[0].message.tool_calls[0].function.arguments)
     except Exception as e:
-        raise Exception(f"Error generating code: {str(e)}")
+        raise Exception(f"Error generating code: {str(e)}") from e
+    if cache is not None:
+        cache.set(key, function_response)
+    return function_response
+
+async def generate_code_stream(prompt: str, api_key: str, context: str = "", language: str = "python",
+                               model: str = "gpt-3.5-turbo", temperature: Optional[float] = None,
+                               use_cache: bool = True) -> AsyncIterator[Dict[str, Any]]:
+    """Like generate_code, but yield the response parsed so far each time more of it arrives.
+
+    Every item is a dict with the fields received until then; the string being received is
+    included up to its last complete character, so each item's values extend the previous
+    one's. The last item is the complete response, which is cached like generate_code's.
+    """
+    request = _build_request(prompt, context, language, model, temperature)
+    cache = get_response_cache() if is_cacheable(request, use_cache) else None
+    key = response_cache_key(request) if cache is not None else None
+    if cache is not None:
+        cached = cache.get(key)
+        if cached is not None:
+            yield cached
+            return
+
+    arguments = bytearray()
+    try:
+        # Retried until the response starts; after that a retry would repeat what was yielded
+        stream = await complete(api_key, dict(request, stream=True), hedge=False)
+        # Closing returns the connection to the pool even when the caller stops early or parsing fails
+        async with stream:
+            async for chunk in stream:
+                # Chunks carry a fragment of the tool call's JSON arguments; some carry nothing
+                if not chunk.choices or not chunk.choices[0].delta.tool_calls:
+                    continue
+                fragment = chunk.choices[0].delta.tool_calls[0].function.arguments
+                if not fragment:
+                    continue
+                arguments += fragment.encode('utf-8')
+                try:
+                    # Re-parsing the whole buffer is simpler than resuming, and jiter does a few KB in microseconds
+                    partial = jiter.from_json(bytes(arguments), partial_mode='trailing-strings')
+                except ValueError:
+                    continue
+                if isinstance(partial, dict):
+                    yield partial
+        function_response = json.loads(arguments)
+    except Exception as e:
+        raise Exception(f"Error generating code: {str(e)}") from e
+    if cache is not None:
+        cache.set(key, function_response)
+    yield function_response
+
+async def generate_as_completed(prompts: Iterable[str], api_key: str, context: str = "", language: str = "python",
+                                model: str = "gpt-3.5-turbo", temperature: Optional[float] = None, use_cache: bool = True,
+                                concurrency: Optional[int] = None,
+                                return_exceptions: bool = False) -> AsyncIterator[Tuple[int, Any]]:
+    """Generate code for many prompts, yielding (index, response) pairs as each one finishes.
+
+    At most concurrency requests (default Config.LLM_BATCH_CONCURRENCY) are in flight, and each
+    waits for the API key's rate limiter, so a large batch runs at the account's limits instead
+    of at the sum of its latencies. Prompts are read lazily from the iterable; an error raised
+    while reading them always ends the batch. With return_exceptions, a failed prompt yields its
+    exception instead of ending the batch.
+    """
+    numbered = enumerate(prompts)
+    finished: asyncio.Queue = asyncio.Queue()
+
+    async def worker() -> None:
+        try:
+            # Workers share one iterator, so each prompt is taken exactly once
+            for index, prompt in numbered:
+                try:
+                    result = await generate_code(prompt, api_key, context, language, model, temperature, use_cache)
+                except Exception as e:
+                    result = e
+                finished.put_nowait((index, result))
+        except Exception as e:
+            # Reading the prompts failed, not a prompt
+            finished.put_nowait(e)
+        finally:
+            finished.put_nowait(None)
+
+    workers = [asyncio.ensure_future(worker()) for _ in range(max(1, concurrency or config.LLM_BATCH_CONCURRENCY))]
+    try:
+        running = len(workers)
+        while running:
+            item = await finished.get()
+            if item is None:
+                running -= 1
+                continue
+            if isinstance(item, Exception):
+                raise item
+            if isinstance(item[1], Exception) and not return_exceptions:
+                raise item[1]
+            yield item
+    finally:
+        for task in workers:
+            task.cancel()
+
+async def generate_many(prompts: Iterable[str], api_key: str, **kwargs: Any) -> List[Any]:
+    """Like generate_as_completed, but return the responses in the order of the prompts."""
+    results = {}
+    async for index, result in generate_as_completed(prompts, api_key, **kwargs):
+        results[index] = result
+    return [results[index] for index in range(len(results))]
 
 async def main():
     api_key = input("Enter your OpenAI API key: ")
@@ -73,7 +196,8 @@ async def main():
                 print(f"- {suggestion}")
     except Exception as e:
         print(f"An error occurred: {str(e)}")
+    finally:
+        await close_clients()
 
 if __name__ == "__main__":
-    import asyncio
     asyncio.run(main())
\ No newline at end of file
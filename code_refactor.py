@@ -6,10 +6,21 @@ from rope.refactor.inline import create_inline
 from rope.refactor.restructure import Restructure
 from rope.refactor.introduce_parameter import IntroduceParameter
 import ast
+import os
 from typing import Dict, Any
 
-async def refactor_code(code: str, refactor_type: str, **kwargs: Any) -> str:
-    project = Project(".")
+# Rope projects by root; building one scans the tree, so long-lived processes reuse them
+_projects: Dict[str, Project] = {}
+
+def get_project(root: str = ".") -> Project:
+    root = os.path.realpath(root)
+    project = _projects.get(root)
+    if project is None:
+        project = _projects[root] = Project(root)
+    return project
+
+async def refactor_code(code: str, refactor_type: str, root: str = ".", **kwargs: Any) -> str:
+    project = get_project(root)
     module = project.root.create_file("temp.py")
     module.write(code)
     
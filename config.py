@@ -5,12 +5,76 @@ class Config:
     DEFAULT_MODEL = "gpt-3.5-turbo"
     MAX_TOKENS = 1000
     TEMPERATURE = 0.7
+    LLM_BASE_URL = os.getenv('OPENAI_BASE_URL')  # None for the OpenAI API
+    LLM_MAX_CONNECTIONS = 20  # Per API key; requests beyond this wait for a free connection
+    LLM_MAX_KEEPALIVE_CONNECTIONS = 10  # Idle connections kept open for the next request
+    LLM_KEEPALIVE_EXPIRY = 60.0  # Seconds an idle connection stays open
+    LLM_TIMEOUT = 120.0  # Seconds a request may take; completions of MAX_TOKENS can be slow
+    LLM_CONNECT_TIMEOUT = 10.0
+    LLM_CACHE_ENABLED = True
+    LLM_CACHE_TTL = 7 * 24 * 3600  # Seconds a cached response is reused; models and prompts drift
+    LLM_CACHE_MAX_BYTES = 64 * 1024 * 1024
+    LLM_CACHE_SAMPLED = False  # Also cache responses sampled at temperature > 0, replaying one sample
+    LLM_REQUESTS_PER_MINUTE = None  # The account's limits per API key; None for no limit
+    LLM_TOKENS_PER_MINUTE = None
+    LLM_BATCH_CONCURRENCY = 16  # Requests generate_many keeps in flight
+    LLM_MAX_RETRIES = 4  # Retries of rate-limited, timed out or failed requests
+    LLM_RETRY_BASE_DELAY = 0.5  # Seconds; the backoff bound doubles with each retry
+    LLM_RETRY_MAX_DELAY = 30.0  # Longest wait between attempts, including a server's Retry-After
+    LLM_HEDGE_ENABLED = False  # Duplicate requests slower than LLM_HEDGE_PERCENTILE of recent ones; costs extra tokens
+    LLM_HEDGE_PERCENTILE = 0.95
+    LLM_HEDGE_MIN_SAMPLES = 20  # Requests timed before hedging starts
     
     # Pylint configuration
     PYLINT_ARGS = [
         '--disable=C0111',  # Missing docstring
         '--max-line-length=100',
     ]
+    STYLE_MAX_LINE_LENGTH = 100  # pycodestyle limit used by the fast analysis tier
+    # Checker profiles, applied after PYLINT_ARGS. Convention and refactor messages are never
+    # reported, so every profile disables them and pylint skips checkers left with nothing to emit.
+    PYLINT_PROFILES = {
+        'full': ['--disable=C,R'],
+        'fast': ['--disable=C,R', '--disable=typecheck,imports'],  # Skip the inference-heavy checkers
+        'errors-only': ['--disable=all', '--enable=E,F'],
+    }
+    # Rules for the 'custom' profile, layered on 'full', e.g. {'disable': ['W0511'], 'max-line-length': 120}
+    PYLINT_CUSTOM_RULES = {}
+    ANALYSIS_PROFILE = 'full'  # Profile used when none is given
+    
+    # Analysis settings
+    ANALYSIS_WORKERS = os.cpu_count() or 1  # Long-lived pylint worker processes
+    ANALYSIS_CONCURRENCY = ANALYSIS_WORKERS * 2  # Analyses in flight at once; extras wait without queuing in the pool
+    ANALYSIS_IGNORE_PATTERNS = [
+        'ai_coding_assistant_env',  # Vendored virtual environment
+        '.git',
+        '__pycache__',
+        '.venv',
+        'venv',
+        '*.egg-info',
+        'build',
+        'dist',
+    ]
+    ANALYSIS_STREAM_BUFFER = 256  # Issues a streaming analysis may run ahead of its consumer
+    ANALYSIS_STREAM_CACHE_MAX_ISSUES = 1000  # Larger streamed results are not cached
+    ANALYSIS_RESULTS_FILE = 'ai_assistant_results.json'  # Last incremental run, stored inside .git
+    ANALYSIS_BASELINE_FILE = '.ai-assistant-baseline.json'  # Accepted issues, kept at the root of the analyzed tree
+    ANALYSIS_FILE_TIMEOUT = 60.0  # Seconds one file may take on the worker pool before partial results are returned; None for no limit
+    ANALYSIS_BATCH_TIMEOUT = None  # Seconds a whole batch may take; unfinished files get a timeout marker
+    ANALYSIS_TIMEOUT_GRACE = 5.0  # Extra seconds a worker gets to honour a batch deadline before the pool is recycled
+    CACHE_DIR = os.getenv('AI_ASSISTANT_CACHE_DIR', os.path.join(os.path.expanduser('~'), '.cache', 'ai_coding_assistant'))
+    ANALYSIS_CACHE_ENABLED = True
+    ANALYSIS_CACHE_MAX_BYTES = 64 * 1024 * 1024
+    METRICS_CACHE_ENABLED = True
+    METRICS_CACHE_MAX_BYTES = 256 * 1024 * 1024  # Per-file and per-function metrics for the metrics command
+    CLONE_MIN_TOKENS = 80  # Report copies spanning at least this many normalized tokens
+    CLONE_KGRAM = 20  # Tokens hashed per fingerprint
+    CLONE_WINDOW = 12  # Winnowing window; smaller keeps more fingerprints and measures copies more exactly
+    CLONE_CACHE_ENABLED = True
+    CLONE_CACHE_MAX_BYTES = 256 * 1024 * 1024  # Per-file fingerprints for the clones command
+    ASTROID_SNAPSHOT_ENABLED = True  # Restore prebuilt stdlib/site-packages ASTs when pylint starts
+    DAEMON_AUTO_CONNECT = True  # CLI commands use the project's daemon when one is running
+    DAEMON_START_TIMEOUT = 60  # Seconds `daemon start` waits for the daemon to warm up
     
     # Optimization settings
     OPTIMIZATION_LEVEL = 2  # 1: Basic, 2: Intermediate, 3: Advanced
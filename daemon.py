@@ -0,0 +1,200 @@
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import subprocess
+import sys
+import time
+from typing import Any, Dict, Optional
+from config import config
+
+# Bump whenever requests or results change shape; clients fall back to local work on a mismatch
+DAEMON_PROTOCOL_VERSION = 1
+# Requests and responses are single JSON lines, and whole source files must fit in one
+_STREAM_LIMIT = 64 * 1024 * 1024
+
+logger = logging.getLogger(__name__)
+
+class DaemonUnavailable(Exception):
+    """No compatible daemon is serving the project."""
+
+class DaemonError(Exception):
+    """The daemon ran the request and it failed."""
+
+def socket_path(root: Optional[str] = None) -> str:
+    """Where the daemon for a project root listens; each project gets its own, like dmypy."""
+    root = os.path.realpath(root or os.getcwd())
+    digest = hashlib.sha256(root.encode('utf-8')).hexdigest()[:16]
+    return os.path.join(config.CACHE_DIR, 'daemons', f"{digest}.sock")
+
+def log_path(root: Optional[str] = None) -> str:
+    return os.path.splitext(socket_path(root))[0] + '.log'
+
+async def request(command: str, params: Optional[Dict[str, Any]] = None, root: Optional[str] = None) -> Any:
+    """Send one request to the project's daemon and return its result.
+
+    Raises DaemonUnavailable when no compatible daemon is running and DaemonError when the
+    request itself failed.
+    """
+    path = socket_path(root)
+    if not hasattr(asyncio, 'open_unix_connection') or not os.path.exists(path):
+        raise DaemonUnavailable(f"No daemon is listening on {path}")
+    try:
+        reader, writer = await asyncio.open_unix_connection(path, limit=_STREAM_LIMIT)
+    except OSError as e:
+        raise DaemonUnavailable(f"Could not connect to the daemon on {path}: {e}") from e
+    try:
+        message = {'version': DAEMON_PROTOCOL_VERSION, 'command': command, 'params': params or {}}
+        writer.write(json.dumps(message).encode('utf-8') + b'\n')
+        await writer.drain()
+        line = await reader.readline()
+    finally:
+        writer.close()
+    if not line:
+        raise DaemonUnavailable("The daemon closed the connection without answering")
+    response = json.loads(line)
+    if response.get('unavailable'):
+        raise DaemonUnavailable(response['error'])
+    if 'error' in response:
+        raise DaemonError(response['error'])
+    return response['result']
+
+class AnalysisDaemon:
+    """Serves analyze, optimize and refactor requests for one project root over a Unix socket.
+
+    The daemon keeps pylint's worker pool, rope projects and the analysis caches warm, so a
+    request costs little more than the work itself. Everything beyond the standard library is
+    imported only once the daemon starts, which keeps clients of this module fast.
+    """
+
+    def __init__(self, root: str):
+        self.root = os.path.realpath(root)
+        self.path = socket_path(self.root)
+        self.started = time.time()
+        self.requests = 0
+        self._stopping: Optional[asyncio.Event] = None
+        self._handlers = {
+            'ping': self.ping,
+            'analyze': self.analyze,
+            'optimize': self.optimize,
+            'refactor': self.refactor,
+            'stop': self.stop,
+        }
+
+    async def ping(self) -> Dict[str, Any]:
+        return {'pid': os.getpid(), 'root': self.root, 'uptime': time.time() - self.started, 'requests': self.requests}
+
+    async def analyze(self, code: str, profile: Optional[str] = None, use_cache: bool = True, lite: bool = False,
+                      fast: bool = False, style: bool = False) -> list:
+        if lite:
+            from lite_analyzer import analyze_lite
+            return analyze_lite(code)
+        if fast:
+            from tiered_analyzer import analyze_fast
+            return analyze_fast(code, style=style)
+        from code_analyzer import analyze_code
+        return await analyze_code(code, use_cache=use_cache, profile=profile)
+
+    async def optimize(self, code: str) -> Dict[str, Any]:
+        from code_optimizer import optimize_code
+        return await optimize_code(code)
+
+    async def refactor(self, code: str, refactor_type: str, options: Dict[str, Any]) -> str:
+        from code_refactor import refactor_code
+        return await refactor_code(code, refactor_type, root=self.root, **options)
+
+    async def stop(self) -> bool:
+        # Set the event only after this request's response has been written
+        asyncio.get_running_loop().call_soon(self._stopping.set)
+        return True
+
+    async def _warm_up(self) -> None:
+        # Import everything and start pylint's workers before accepting the first request
+        from code_analyzer import analyze_code
+        from code_refactor import get_project
+        import code_optimizer, lite_analyzer, tiered_analyzer  # noqa: F401
+        await analyze_code('', use_cache=False)
+        get_project(self.root)
+
+    async def _handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            message = json.loads(await reader.readline())
+            handler = self._handlers.get(message.get('command'))
+            if message.get('version') != DAEMON_PROTOCOL_VERSION:
+                response = {'error': f"Daemon speaks protocol {DAEMON_PROTOCOL_VERSION}", 'unavailable': True}
+            elif handler is None:
+                response = {'error': f"Unknown daemon command: {message.get('command')}"}
+            else:
+                self.requests += 1
+                response = {'result': await handler(**message.get('params', {}))}
+        except Exception as e:
+            logger.exception("Daemon request failed")
+            response = {'error': str(e)}
+        try:
+            writer.write(json.dumps(response).encode('utf-8') + b'\n')
+            await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def serve(self) -> None:
+        from code_analyzer import shutdown_worker_pool
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        # A socket file left behind by a daemon that died would make binding fail
+        if os.path.exists(self.path):
+            try:
+                await request('ping', root=self.root)
+            except DaemonUnavailable:
+                os.unlink(self.path)
+            else:
+                raise RuntimeError(f"A daemon is already serving {self.root}")
+
+        self._stopping = asyncio.Event()
+        await self._warm_up()
+        server = await asyncio.start_unix_server(self._handle_connection, self.path, limit=_STREAM_LIMIT)
+        logger.info("Daemon for %s listening on %s", self.root, self.path)
+        try:
+            async with server:
+                await self._stopping.wait()
+        finally:
+            if os.path.exists(self.path):
+                os.unlink(self.path)
+            shutdown_worker_pool()
+
+def run_daemon(root: str) -> None:
+    """Serve in the foreground until a stop request arrives."""
+    os.chdir(root)
+    asyncio.run(AnalysisDaemon(root).serve())
+
+async def start_daemon(root: Optional[str] = None) -> Dict[str, Any]:
+    """Start a background daemon for root and wait until it is warm, returning its ping details."""
+    root = os.path.realpath(root or os.getcwd())
+    try:
+        return await request('ping', root=root)
+    except DaemonUnavailable:
+        pass
+
+    os.makedirs(os.path.dirname(socket_path(root)), exist_ok=True)
+    with open(log_path(root), 'ab') as log:
+        process = subprocess.Popen([sys.executable, os.path.abspath(__file__), 'run', root], cwd=root,
+                                   stdin=subprocess.DEVNULL, stdout=log, stderr=log, start_new_session=True)
+    deadline = time.monotonic() + config.DAEMON_START_TIMEOUT
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"The daemon exited during start-up; see {log_path(root)}")
+        try:
+            return await request('ping', root=root)
+        except DaemonUnavailable:
+            await asyncio.sleep(0.1)
+    process.kill()
+    raise RuntimeError(f"The daemon did not start within {config.DAEMON_START_TIMEOUT}s; see {log_path(root)}")
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    if len(sys.argv) == 3 and sys.argv[1] == 'run':
+        run_daemon(sys.argv[2])
+    else:
+        print(f"Usage: {sys.argv[0]} run ROOT", file=sys.stderr)
+        sys.exit(2)
@@ -0,0 +1,174 @@
+import json
+import os
+import sqlite3
+import time
+from typing import Any, Dict, Iterable, Optional
+
+class DiskCache:
+    """Persistent key/value store backed by SQLite, evicting least recently used entries
+    once the stored values exceed max_bytes. With a ttl, entries older than ttl seconds are
+    treated as missing and dropped when next read."""
+
+    def __init__(self, path: str, max_bytes: int, ttl: Optional[float] = None):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.path = path
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._conn = sqlite3.connect(path, isolation_level=None, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS entries ("
+            "key TEXT PRIMARY KEY, value TEXT NOT NULL, size INTEGER NOT NULL, accessed REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS entries_accessed ON entries (accessed)")
+        # Rows INSERT OR REPLACE overwrites fire the delete trigger only with recursive triggers on
+        self._conn.execute("PRAGMA recursive_triggers=ON")
+        if 'created' not in self._columns() or not self._has_size_total():
+            self._migrate()
+
+    def _migrate(self) -> None:
+        """Bring a cache written by an older version up to date.
+
+        Another process may be migrating the same file, so each step is checked again under
+        the write lock."""
+        self._conn.execute("BEGIN IMMEDIATE")
+        try:
+            if 'created' not in self._columns():
+                # Caches written before entries could expire count as created long ago
+                self._conn.execute("ALTER TABLE entries ADD COLUMN created REAL NOT NULL DEFAULT 0")
+            if not self._has_size_total():
+                # Triggers keep the stored bytes in one row, so writes need not sum the whole table
+                self._conn.execute("CREATE TABLE totals (name TEXT PRIMARY KEY, value INTEGER NOT NULL)")
+                self._conn.execute("INSERT INTO totals SELECT 'bytes', COALESCE(SUM(size), 0) FROM entries")
+                self._conn.execute(
+                    "CREATE TRIGGER entries_added AFTER INSERT ON entries BEGIN "
+                    "UPDATE totals SET value = value + NEW.size WHERE name = 'bytes'; END"
+                )
+                self._conn.execute(
+                    "CREATE TRIGGER entries_removed AFTER DELETE ON entries BEGIN "
+                    "UPDATE totals SET value = value - OLD.size WHERE name = 'bytes'; END"
+                )
+                self._conn.execute(
+                    "CREATE TRIGGER entries_resized AFTER UPDATE OF size ON entries BEGIN "
+                    "UPDATE totals SET value = value + NEW.size - OLD.size WHERE name = 'bytes'; END"
+                )
+            self._conn.execute("COMMIT")
+        except BaseException:
+            self._conn.execute("ROLLBACK")
+            raise
+
+    def _has_size_total(self) -> bool:
+        row = self._conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'trigger' AND name = 'entries_resized'").fetchone()
+        return row is not None
+
+    def _stored_bytes(self) -> int:
+        return self._conn.execute("SELECT value FROM totals WHERE name = 'bytes'").fetchone()[0]
+
+    def _columns(self) -> set:
+        return {row[1] for row in self._conn.execute("PRAGMA table_info(entries)")}
+
+    def _expired(self, created: float, now: float) -> bool:
+        return self.ttl is not None and created < now - self.ttl
+
+    def get(self, key: str) -> Optional[Any]:
+        row = self._conn.execute("SELECT value, created FROM entries WHERE key = ?", (key,)).fetchone()
+        now = time.time()
+        if row is not None and self._expired(row[1], now):
+            self._conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+            row = None
+        if row is None:
+            self.misses += 1
+            return None
+        self._conn.execute("UPDATE entries SET accessed = ? WHERE key = ?", (now, key))
+        self.hits += 1
+        return json.loads(row[0])
+
+    def set(self, key: str, value: Any) -> None:
+        data = json.dumps(value)
+        now = time.time()
+        self._conn.execute(
+            "INSERT OR REPLACE INTO entries (key, value, size, accessed, created) VALUES (?, ?, ?, ?, ?)",
+            (key, data, len(data), now, now)
+        )
+        self._evict()
+
+    def get_many(self, keys: Iterable[str]) -> Dict[str, Any]:
+        """Look up many keys at once, returning the ones found."""
+        keys = list(keys)
+        found = {}
+        expired = []
+        now = time.time()
+        # Stay under SQLite's limit on bound parameters
+        for start in range(0, len(keys), 500):
+            batch = keys[start:start + 500]
+            rows = self._conn.execute(
+                f"SELECT key, value, created FROM entries WHERE key IN ({','.join('?' * len(batch))})", batch
+            ).fetchall()
+            for key, value, created in rows:
+                if self._expired(created, now):
+                    expired.append((key,))
+                else:
+                    found[key] = json.loads(value)
+        if expired:
+            self._write_many("DELETE FROM entries WHERE key = ?", expired)
+        if found:
+            self._write_many("UPDATE entries SET accessed = ? WHERE key = ?", [(now, key) for key in found])
+        self.hits += len(found)
+        self.misses += len(keys) - len(found)
+        return found
+
+    def set_many(self, items: Dict[str, Any]) -> None:
+        """Store many entries in one transaction, evicting once at the end."""
+        now = time.time()
+        rows = []
+        for key, value in items.items():
+            data = json.dumps(value)
+            rows.append((key, data, len(data), now, now))
+        self._write_many("INSERT OR REPLACE INTO entries (key, value, size, accessed, created) VALUES (?, ?, ?, ?, ?)", rows)
+        self._evict()
+
+    def _write_many(self, statement: str, rows: list) -> None:
+        self._conn.execute("BEGIN")
+        try:
+            self._conn.executemany(statement, rows)
+        except BaseException:
+            self._conn.execute("ROLLBACK")
+            raise
+        self._conn.execute("COMMIT")
+
+    def _evict(self) -> None:
+        total = self._stored_bytes()
+        if total <= self.max_bytes:
+            return
+        expired = []
+        for key, size in self._conn.execute("SELECT key, size FROM entries ORDER BY accessed"):
+            if total <= self.max_bytes:
+                break
+            expired.append((key,))
+            total -= size
+        self._conn.executemany("DELETE FROM entries WHERE key = ?", expired)
+
+    def clear(self) -> None:
+        self._conn.execute("DELETE FROM entries")
+        self.hits = 0
+        self.misses = 0
+
+    def stats(self) -> Dict[str, Any]:
+        entries = self._conn.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+        size = self._stored_bytes()
+        lookups = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+            'entries': entries,
+            'bytes': size
+        }
+
+    def close(self) -> None:
+        self._conn.close()
@@ -1,6 +1,6 @@
 import git
 import os
-from typing import List
+from typing import List, Optional
 
 class GitIntegration:
     def __init__(self, repo_path: str):
@@ -27,6 +27,33 @@ class GitIntegration:
             branch_name = self.repo.active_branch.name
         self.repo.git.pull(remote_name, branch_name)
 
+    def head_commit(self) -> Optional[str]:
+        try:
+            return self.repo.head.commit.hexsha
+        except ValueError:
+            # Repository without any commits yet
+            return None
+
+    def changed_files(self, since: Optional[str] = None, staged: bool = False, merge_base: bool = False) -> List[str]:
+        """Return paths, relative to the repository root, of files that still exist and differ
+        from `since` (HEAD by default). With staged=True only staged changes are considered;
+        otherwise the working tree is compared and untracked files are included.
+        """
+        ref = since or 'HEAD'
+        if merge_base:
+            ref = self.repo.git.merge_base(ref, 'HEAD')
+
+        if staged:
+            output = self.repo.git.diff('--cached', '--name-only', '--diff-filter=d', ref)
+            return [path for path in output.splitlines() if path]
+
+        output = self.repo.git.diff('--name-only', '--diff-filter=d', ref)
+        changed = [path for path in output.splitlines() if path]
+        return changed + [path for path in self.repo.untracked_files if path not in changed]
+
+    def staged_content(self, path: str) -> str:
+        return self.repo.git.show(f':{path}', strip_newline_in_stdout=False)
+
 async def commit_improved_code(repo_path: str, file_path: str, commit_message: str) -> None:
     git_integration = GitIntegration(repo_path)
     git_integration.commit_changes([file_path], commit_message)
@@ -0,0 +1,241 @@
+import ast
+import hashlib
+from typing import Dict, FrozenSet, List, NamedTuple, Optional, Set, Tuple
+from code_analyzer import Profile, analyze_code
+from issues import NO_ISSUES, Issue, IssueBatch, is_partial
+
+_DEFINITION_TYPES = (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)
+_FUNCTION_TYPES = (ast.FunctionDef, ast.AsyncFunctionDef)
+
+class _Definition(NamedTuple):
+    key: str
+    node: ast.AST
+    start: int  # First line, decorators included
+    end: int
+    provides: FrozenSet[str]  # Names other code can reach it by
+    uses: FrozenSet[str]  # Names and attributes it refers to
+
+class _CachedDefinition(NamedTuple):
+    provides: FrozenSet[str]
+    issues: Tuple[Issue, ...]  # Lines relative to the definition's first line
+
+def _definition_start(node: ast.AST) -> int:
+    return min([node.lineno] + [decorator.lineno for decorator in node.decorator_list])
+
+def _provided_names(node: ast.AST) -> FrozenSet[str]:
+    names = {node.name}
+    if isinstance(node, ast.ClassDef):
+        # Methods and class attributes are reached through instances, so count them too
+        for statement in node.body:
+            if isinstance(statement, _DEFINITION_TYPES):
+                names.add(statement.name)
+            elif isinstance(statement, (ast.Assign, ast.AnnAssign)):
+                targets = statement.targets if isinstance(statement, ast.Assign) else [statement.target]
+                names.update(target.id for target in targets if isinstance(target, ast.Name))
+    return frozenset(names)
+
+def _used_names(node: ast.AST) -> FrozenSet[str]:
+    names = set()
+    for child in ast.walk(node):
+        if isinstance(child, ast.Name):
+            names.add(child.id)
+        elif isinstance(child, ast.Attribute):
+            names.add(child.attr)
+    return frozenset(names)
+
+def _definitions(tree: ast.Module) -> List[_Definition]:
+    definitions = []
+    seen: Dict[str, int] = {}
+    for node in tree.body:
+        if not isinstance(node, _DEFINITION_TYPES):
+            continue
+        # Positions are left out of the dump, so moving a definition keeps its fingerprint
+        fingerprint = hashlib.sha256(ast.dump(node).encode('utf-8')).hexdigest()
+        occurrence = seen[fingerprint] = seen.get(fingerprint, 0) + 1
+        definitions.append(_Definition(f"{fingerprint}:{occurrence}", node, _definition_start(node), node.end_lineno,
+                                       _provided_names(node), _used_names(node)))
+    return definitions
+
+def _module_fingerprint(tree: ast.Module) -> str:
+    """Hash the module-level statements; any change there can affect every definition."""
+    statements = [ast.dump(node) for node in tree.body if not isinstance(node, _DEFINITION_TYPES)]
+    return hashlib.sha256('\n'.join(statements).encode('utf-8')).hexdigest()
+
+def _module_names(tree: ast.Module) -> Set[str]:
+    names = set()
+    for node in tree.body:
+        if isinstance(node, _DEFINITION_TYPES):
+            names.add(node.name)
+        elif isinstance(node, (ast.Import, ast.ImportFrom)):
+            names.update((alias.asname or alias.name).split('.')[0] for alias in node.names)
+        else:
+            for child in ast.walk(node):
+                if isinstance(child, ast.Name) and isinstance(child.ctx, ast.Store):
+                    names.add(child.id)
+    return names
+
+def _stored_names(node: ast.AST) -> FrozenSet[str]:
+    return frozenset(child.id for child in ast.walk(node) if isinstance(child, ast.Name) and isinstance(child.ctx, ast.Store))
+
+def _stubbable(tree: ast.Module, definitions: List[_Definition], candidates: Set[str]) -> Set[str]:
+    """Narrow candidates to the definitions no re-checked definition can infer through.
+
+    A stub's calls infer as unknown and its instances lose attributes, so a stub standing in
+    for a callee would hide or invent issues in its callers. Names are followed through other
+    definitions and module-level statements, e.g. from `x = helper()` to helper.
+    """
+    statements = [(_stored_names(node), _used_names(node)) for node in tree.body
+                  if not isinstance(node, _DEFINITION_TYPES)]
+    remaining = [definition for definition in definitions if definition.key in candidates]
+    names = set().union(*(definition.uses for definition in definitions if definition.key not in candidates))
+    grown = True
+    while grown:
+        grown = False
+        for definition in [definition for definition in remaining if definition.provides & names]:
+            remaining.remove(definition)
+            names |= definition.uses
+            grown = True
+        for statement in [statement for statement in statements if statement[0] & names]:
+            statements.remove(statement)
+            names |= statement[1]
+            grown = True
+    return {definition.key for definition in remaining}
+
+def _assigns_attribute_of(statement: ast.stmt, owner: str) -> bool:
+    # Anywhere in the statement, so assignments inside if/else or try blocks count too
+    for child in ast.walk(statement):
+        targets = child.targets if isinstance(child, ast.Assign) else \
+            [child.target] if isinstance(child, (ast.AnnAssign, ast.AugAssign)) else []
+        if any(isinstance(target, ast.Attribute) and isinstance(target.value, ast.Name) and target.value.id == owner
+               for target in targets):
+            return True
+    return False
+
+def _stub_function(lines: List[str], original: List[str], node: ast.AST, module_names: Set[str],
+                   is_method: bool) -> None:
+    """Replace a function body with one raise, keeping its signature and every line number.
+
+    The raise makes calls infer as unknown instead of returning None, and its arguments keep
+    module-level names the body used counted as used. Methods keep every statement that assigns
+    a self.attribute, nested ones included, so instances still have those attributes.
+    """
+    body = node.body
+    first = body[0]
+    if first.lineno == node.lineno:
+        # Body shares the header line; nothing worth stubbing
+        return
+    owner = node.args.args[0].arg if is_method and node.args.args else None
+    kept = [statement for statement in body if owner is not None and _assigns_attribute_of(statement, owner)]
+    if kept and kept[0] is first and (hasattr(first, 'body') or hasattr(first, 'cases')):
+        # A compound statement cannot follow the raise on its line, so keep the whole body
+        return
+    used = sorted(name for name in _used_names(ast.Module(body=body, type_ignores=[])) if name in module_names)
+
+    for line_number in range(first.lineno, node.end_lineno + 1):
+        lines[line_number - 1] = ''
+    for statement in kept:
+        for line_number in range(statement.lineno, statement.end_lineno + 1):
+            lines[line_number - 1] = original[line_number - 1]
+
+    first_line = original[first.lineno - 1]
+    stub = f"{first_line[:first.col_offset]}raise NotImplementedError({', '.join(used)})"
+    if kept and kept[0] is first:
+        stub += '; ' + first_line[first.col_offset:]
+    lines[first.lineno - 1] = stub
+
+def _stub_definition(lines: List[str], original: List[str], node: ast.AST, module_names: Set[str]) -> None:
+    if isinstance(node, ast.ClassDef):
+        for statement in node.body:
+            if isinstance(statement, _FUNCTION_TYPES):
+                _stub_function(lines, original, statement, module_names, is_method=True)
+    else:
+        _stub_function(lines, original, node, module_names, is_method=False)
+
+class IncrementalAnalyzer:
+    """Analyzes successive versions of one module, re-checking only what changed.
+
+    Top-level functions and classes are fingerprinted by AST. A definition that is unchanged,
+    does not use a name whose definition changed, and is not used by anything re-checked, is
+    replaced by a stub with the same signature and line numbers. Its issues from the previous run are re-based to where it now
+    starts. Any change to module-level statements triggers a full analysis.
+
+    Results are sorted by position. Keep one instance per module being edited.
+    """
+
+    def __init__(self, profile: Optional[Profile] = None, use_cache: bool = True):
+        self.profile = profile
+        self.use_cache = use_cache
+        self._module_fingerprint: Optional[str] = None
+        self._definitions: Dict[str, _CachedDefinition] = {}
+        self.last_rechecked = 0  # Definitions pylint actually checked on the last run
+
+    def reset(self) -> None:
+        self._module_fingerprint = None
+        self._definitions = {}
+
+    async def analyze(self, code: str, compact: bool = False):
+        """Return the code's issues as a list of dicts, or as an IssueBatch when compact=True."""
+        try:
+            tree = ast.parse(code)
+        except SyntaxError:
+            self.reset()
+            return await analyze_code(code, self.use_cache, self.profile, compact)
+
+        definitions = _definitions(tree)
+        module_fingerprint = _module_fingerprint(tree)
+        previous = self._definitions if module_fingerprint == self._module_fingerprint else {}
+
+        current_keys = {definition.key for definition in definitions}
+        changed_names = set()
+        for definition in definitions:
+            if definition.key not in previous:
+                changed_names.update(definition.provides)
+        for key, cached in previous.items():
+            if key not in current_keys:
+                changed_names.update(cached.provides)
+
+        candidates = {definition.key for definition in definitions
+                      if definition.key in previous and not definition.uses & changed_names}
+        stubbable = _stubbable(tree, definitions, candidates)
+        stubbed = [definition for definition in definitions if definition.key in stubbable]
+        original = code.split('\n')
+        lines = list(original)
+        module_names = _module_names(tree)
+        for definition in stubbed:
+            _stub_definition(lines, original, definition.node, module_names)
+
+        stub_code = '\n'.join(lines)
+        try:
+            ast.parse(stub_code)
+        except SyntaxError:
+            # Never report a problem the stubbing introduced; check the real code instead
+            stubbed, stub_code = [], code
+        results = await analyze_code(stub_code, self.use_cache, self.profile, compact=True)
+        if is_partial(results):
+            # Nothing can be reused from a run that did not finish
+            self.reset()
+            return results if compact else results.to_dicts()
+
+        stubbed_keys = {definition.key for definition in stubbed}
+        fresh = [issue for issue in results if issue.type != 'info']
+        issues = []
+        cache = {}
+        for definition in definitions:
+            if definition.key in stubbed_keys:
+                relative = previous[definition.key].issues
+            else:
+                relative = tuple(issue._replace(line=issue.line - definition.start) for issue in fresh
+                                 if definition.start <= issue.line <= definition.end)
+            cache[definition.key] = _CachedDefinition(definition.provides, relative)
+            issues.extend(issue._replace(line=issue.line + definition.start) for issue in relative)
+        # Module-level issues always come from this run
+        regions = [(definition.start, definition.end) for definition in definitions]
+        issues.extend(issue for issue in fresh if not any(start <= issue.line <= end for start, end in regions))
+
+        self._module_fingerprint = module_fingerprint
+        self._definitions = cache
+        self.last_rechecked = len(definitions) - len(stubbed)
+
+        issues.sort(key=lambda issue: (issue.line, issue.column))
+        batch = IssueBatch(issues or [NO_ISSUES])
+        return batch if compact else batch.to_dicts()
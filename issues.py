@@ -0,0 +1,144 @@
+import sys
+from array import array
+from typing import Any, Dict, Iterable, Iterator, List, NamedTuple
+
+class Issue(NamedTuple):
+    """A single finding with integer positions; type and symbol are interned so equal values share one string."""
+
+    type: str
+    line: int
+    column: int
+    message: str
+    symbol: str = ''
+
+    @classmethod
+    def make(cls, type: str, line: Any, column: Any, message: str, symbol: str = '') -> 'Issue':
+        return cls(sys.intern(type), int(line), int(column), message, sys.intern(symbol))
+
+    @classmethod
+    def from_dict(cls, issue: Dict[str, str]) -> 'Issue':
+        return cls.make(issue['type'], issue['line'], issue['column'], issue['message'], issue.get('symbol', ''))
+
+    def to_dict(self) -> Dict[str, str]:
+        """The dict-of-strings form the analyze functions have always returned."""
+        return {'type': self.type, 'line': str(self.line), 'column': str(self.column), 'message': self.message}
+
+NO_ISSUES = Issue('info', 1, 1, 'No issues found')
+
+# Type of the marker attached to results cut short by a time budget
+TIMEOUT = 'timeout'
+
+def timeout_issue(message: str) -> Issue:
+    return Issue.make(TIMEOUT, 1, 0, message, 'analysis-timeout')
+
+def syntax_error_issue(error: SyntaxError) -> Issue:
+    """The issue reported for code that does not parse, worded like pylint's."""
+    return Issue.make('error', error.lineno or 1, error.offset or 0, f"Syntax Error: Parsing failed: '{error}'", 'syntax-error')
+
+class IssueBatch:
+    """Columnar list of issues for bulk results.
+
+    Positions live in typed arrays and every distinct type, symbol and message string is stored
+    once, so an issue costs a few machine words and pickling a batch copies a handful of buffers
+    instead of walking one object per field.
+    """
+
+    __slots__ = ('lines', 'columns', '_types', '_symbols', '_messages', '_strings', '_string_ids')
+
+    def __init__(self, issues: Iterable[Issue] = ()):
+        self.lines = array('i')
+        self.columns = array('i')
+        self._types = array('I')
+        self._symbols = array('I')
+        self._messages = array('I')
+        self._strings: List[str] = []
+        self._string_ids: Dict[str, int] = {}
+        self.extend(issues)
+
+    def _string_id(self, value: str) -> int:
+        string_id = self._string_ids.get(value)
+        if string_id is None:
+            string_id = self._string_ids[value] = len(self._strings)
+            self._strings.append(value)
+        return string_id
+
+    def append(self, issue: Issue) -> None:
+        self.lines.append(issue.line)
+        self.columns.append(issue.column)
+        self._types.append(self._string_id(issue.type))
+        self._symbols.append(self._string_id(issue.symbol))
+        self._messages.append(self._string_id(issue.message))
+
+    def extend(self, issues: Iterable[Issue]) -> None:
+        for issue in issues:
+            self.append(issue)
+
+    def __len__(self) -> int:
+        return len(self.lines)
+
+    def __getitem__(self, index: int) -> Issue:
+        strings = self._strings
+        return Issue(strings[self._types[index]], self.lines[index], self.columns[index],
+                     strings[self._messages[index]], strings[self._symbols[index]])
+
+    def __iter__(self) -> Iterator[Issue]:
+        strings = self._strings
+        for type_id, line, column, message_id, symbol_id in zip(self._types, self.lines, self.columns,
+                                                                 self._messages, self._symbols):
+            yield Issue(strings[type_id], line, column, strings[message_id], strings[symbol_id])
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, IssueBatch):
+            return NotImplemented
+        return list(self) == list(other)
+
+    def __repr__(self) -> str:
+        return f"IssueBatch({list(self)!r})"
+
+    def to_dicts(self) -> List[Dict[str, str]]:
+        return [issue.to_dict() for issue in self]
+
+    @classmethod
+    def from_dicts(cls, issues: Iterable[Dict[str, str]]) -> 'IssueBatch':
+        return cls(Issue.from_dict(issue) for issue in issues)
+
+    def to_json(self) -> Dict[str, list]:
+        """Column-wise form for JSON storage, far smaller than one object per issue."""
+        return {
+            'strings': self._strings,
+            'lines': self.lines.tolist(),
+            'columns': self.columns.tolist(),
+            'types': self._types.tolist(),
+            'symbols': self._symbols.tolist(),
+            'messages': self._messages.tolist(),
+        }
+
+    @classmethod
+    def from_json(cls, data: Dict[str, list]) -> 'IssueBatch':
+        batch = cls()
+        batch._set_columns(data['strings'], data['lines'], data['columns'], data['types'], data['symbols'], data['messages'])
+        return batch
+
+    def _set_columns(self, strings, lines, columns, types, symbols, messages) -> None:
+        self._strings = [sys.intern(value) for value in strings]
+        self._string_ids = {value: string_id for string_id, value in enumerate(self._strings)}
+        self.lines = array('i', lines)
+        self.columns = array('i', columns)
+        self._types = array('I', types)
+        self._symbols = array('I', symbols)
+        self._messages = array('I', messages)
+
+    def __getstate__(self) -> tuple:
+        # The reverse string index is rebuilt on load rather than pickled
+        return (self._strings, self.lines, self.columns, self._types, self._symbols, self._messages)
+
+    def __setstate__(self, state: tuple) -> None:
+        self._set_columns(*state)
+
+def count_problems(issues: Iterable[Issue]) -> int:
+    """Count real findings, leaving out the 'No issues found' and timeout markers."""
+    return sum(1 for issue in issues if issue.type not in ('info', TIMEOUT))
+
+def is_partial(issues: Iterable[Issue]) -> bool:
+    """True when the analysis ran out of time, so the issues are only those found before it stopped."""
+    return any(issue.type == TIMEOUT for issue in issues)
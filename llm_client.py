@@ -0,0 +1,270 @@
+import asyncio
+import datetime
+import email.utils
+import hashlib
+import json
+import os
+import random
+import time
+import weakref
+from collections import deque
+from typing import Any, Deque, Dict, Optional
+import httpx
+import openai
+from openai import AsyncOpenAI, DefaultAsyncHttpxClient
+from config import config
+from disk_cache import DiskCache
+
+# Bump whenever what is stored for a response changes shape
+RESPONSE_CACHE_FORMAT_VERSION = 1
+
+_response_cache: Optional[DiskCache] = None
+
+# One client per API key and event loop: httpx connections belong to the loop that opened them,
+# and a client per key keeps concurrent callers with different keys from sharing credentials
+_clients: 'weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[str, AsyncOpenAI]]' = weakref.WeakKeyDictionary()
+# Provider rate limits apply per key, so every caller using a key on this loop shares one limiter
+_rate_limiters: 'weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[str, RateLimiter]]' = weakref.WeakKeyDictionary()
+_latencies: Dict[str, 'LatencyTracker'] = {}
+
+# Statuses worth another attempt, as the SDK's own retries treat them: request and lock timeouts,
+# rate limits and server errors
+_RETRYABLE_STATUSES = {408, 409, 429}
+
+class RateLimiter:
+    """Token buckets for requests per minute and tokens per minute; None leaves a limit off.
+
+    Both buckets start full and refill continuously at their per-minute rate. Callers are served
+    in arrival order, so a large request is not starved by a stream of small ones.
+    """
+
+    def __init__(self, requests_per_minute: Optional[float] = None, tokens_per_minute: Optional[float] = None):
+        self.limits = (requests_per_minute, tokens_per_minute)
+        self.available = [limit or 0.0 for limit in self.limits]
+        self.updated = time.monotonic()
+        self.lock = asyncio.Lock()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        elapsed, self.updated = now - self.updated, now
+        for i, limit in enumerate(self.limits):
+            if limit:
+                self.available[i] = min(limit, self.available[i] + elapsed * limit / 60)
+
+    def _take(self, tokens: int) -> float:
+        # Takes the request and returns 0 if it fits, else the seconds until it will
+        # A request larger than a whole minute's allowance takes the full bucket instead of waiting forever
+        costs = [min(cost, limit) if limit else 0 for cost, limit in zip((1, tokens), self.limits)]
+        self._refill()
+        wait = max((60 * (cost - available) / limit for cost, available, limit
+                    in zip(costs, self.available, self.limits) if limit), default=0)
+        if wait <= 0:
+            for i, cost in enumerate(costs):
+                self.available[i] -= cost
+        return max(wait, 0)
+
+    async def acquire(self, tokens: int) -> None:
+        """Wait until one more request of this many tokens fits in both limits, then take it."""
+        async with self.lock:
+            while (wait := self._take(tokens)) > 0:
+                await asyncio.sleep(wait)
+
+    def try_acquire(self, tokens: int) -> bool:
+        """Take the request only if it fits now and nobody is waiting."""
+        return not self.lock.locked() and self._take(tokens) == 0
+
+class LatencyTracker:
+    """Durations of the most recent successful requests, for estimating percentiles."""
+
+    def __init__(self, size: int = 200):
+        self.samples: Deque[float] = deque(maxlen=size)
+
+    def record(self, seconds: float) -> None:
+        self.samples.append(seconds)
+
+    def percentile(self, fraction: float) -> Optional[float]:
+        """None until Config.LLM_HEDGE_MIN_SAMPLES requests have been timed."""
+        if len(self.samples) < max(1, config.LLM_HEDGE_MIN_SAMPLES):
+            return None
+        ordered = sorted(self.samples)
+        return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+def _http_client() -> httpx.AsyncClient:
+    # DefaultAsyncHttpxClient keeps the SDK's own defaults (redirects, timeouts) for anything not set here
+    return DefaultAsyncHttpxClient(
+        limits=httpx.Limits(max_connections=config.LLM_MAX_CONNECTIONS,
+                            max_keepalive_connections=config.LLM_MAX_KEEPALIVE_CONNECTIONS,
+                            keepalive_expiry=config.LLM_KEEPALIVE_EXPIRY),
+        timeout=httpx.Timeout(config.LLM_TIMEOUT, connect=config.LLM_CONNECT_TIMEOUT),
+    )
+
+def get_client(api_key: str) -> AsyncOpenAI:
+    """Return the long-lived client for api_key on the running loop, creating it on first use.
+
+    Every request made through it reuses the pooled keep-alive connections, so only the first
+    request to the API pays for connection and TLS setup.
+    """
+    loop = asyncio.get_running_loop()
+    clients = _clients.setdefault(loop, {})
+    client = clients.get(api_key)
+    if client is None:
+        # Retries are ours (see complete), so the SDK's would only multiply them
+        client = clients[api_key] = AsyncOpenAI(api_key=api_key, base_url=config.LLM_BASE_URL,
+                                                http_client=_http_client(), max_retries=0)
+    return client
+
+def get_rate_limiter(api_key: str) -> RateLimiter:
+    """Return the limiter for api_key on the running loop, enforcing Config.LLM_REQUESTS_PER_MINUTE
+    and Config.LLM_TOKENS_PER_MINUTE."""
+    limiters = _rate_limiters.setdefault(asyncio.get_running_loop(), {})
+    limiter = limiters.get(api_key)
+    if limiter is None:
+        limiter = limiters[api_key] = RateLimiter(config.LLM_REQUESTS_PER_MINUTE, config.LLM_TOKENS_PER_MINUTE)
+    return limiter
+
+def estimate_tokens(request: Dict[str, Any]) -> int:
+    """Tokens a request counts against the per-minute limit: its prompt, at about four
+    characters a token, plus every completion it may return, as the provider reserves them."""
+    prompt = json.dumps([request.get('messages'), request.get('tools')])
+    return len(prompt) // 4 + request.get('max_tokens', 0) * request.get('n', 1)
+
+def get_latency_tracker(model: str) -> LatencyTracker:
+    tracker = _latencies.get(model)
+    if tracker is None:
+        tracker = _latencies[model] = LatencyTracker()
+    return tracker
+
+def is_retryable(error: BaseException) -> bool:
+    """Whether another attempt may succeed: timeouts, dropped connections, rate limits and server errors.
+
+    Exhausted quotas also answer 429 but will not recover by waiting, so they are not retried.
+    """
+    if isinstance(error, openai.APIConnectionError):  # Includes APITimeoutError
+        return True
+    if not isinstance(error, openai.APIStatusError):
+        return False
+    should_retry = error.response.headers.get('x-should-retry')
+    if should_retry in ('true', 'false'):
+        return should_retry == 'true'
+    if error.code == 'insufficient_quota':
+        return False
+    return error.status_code in _RETRYABLE_STATUSES or error.status_code >= 500
+
+def _retry_after(headers: Any) -> Optional[float]:
+    """Seconds the server asked to wait, or None if it did not say or said something unreadable."""
+    try:
+        if 'retry-after-ms' in headers:
+            return float(headers['retry-after-ms']) / 1000
+    except ValueError:
+        pass
+    value = headers.get('retry-after')
+    if value is None:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    try:
+        date = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if date.tzinfo is None:
+        # HTTP dates are always in GMT
+        date = date.replace(tzinfo=datetime.timezone.utc)
+    return date.timestamp() - time.time()
+
+def retry_delay(error: BaseException, attempt: int) -> float:
+    """Seconds to wait before retry number attempt + 1.
+
+    A Retry-After header from the server is honoured; otherwise the wait is drawn uniformly up to
+    an exponentially growing bound ("full jitter"), so clients failing together retry apart.
+    Both are capped at Config.LLM_RETRY_MAX_DELAY.
+    """
+    retry_after = _retry_after(error.response.headers) if isinstance(error, openai.APIStatusError) else None
+    if retry_after is not None and retry_after >= 0:
+        return min(retry_after, config.LLM_RETRY_MAX_DELAY)
+    return random.uniform(0, min(config.LLM_RETRY_MAX_DELAY, config.LLM_RETRY_BASE_DELAY * 2 ** attempt))
+
+async def _attempt(api_key: str, request: Dict[str, Any], tokens: int, limited: bool = True) -> Any:
+    if limited:
+        await get_rate_limiter(api_key).acquire(tokens)
+    start = time.monotonic()
+    response = await get_client(api_key).chat.completions.create(**request)
+    # A stream returns once its first bytes arrive, which says nothing about whole responses
+    if not request.get('stream'):
+        get_latency_tracker(request['model']).record(time.monotonic() - start)
+    return response
+
+async def _hedged(api_key: str, request: Dict[str, Any], tokens: int) -> Any:
+    # Once the first attempt outlives Config.LLM_HEDGE_PERCENTILE of recent requests, send a
+    # duplicate and keep whichever answers first; an attempt that fails leaves the other running
+    hedge_after = get_latency_tracker(request['model']).percentile(config.LLM_HEDGE_PERCENTILE)
+    tasks = {asyncio.ensure_future(_attempt(api_key, request, tokens))}
+    try:
+        if hedge_after is not None:
+            done, _ = await asyncio.wait(tasks, timeout=hedge_after)
+            # A hedge is extra load, so it is only sent when the rate limits have room for it now
+            if not done and get_rate_limiter(api_key).try_acquire(tokens):
+                tasks.add(asyncio.ensure_future(_attempt(api_key, request, tokens, limited=False)))
+        while True:
+            done, tasks = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+            succeeded = [task for task in done if task.exception() is None]
+            if succeeded:
+                return succeeded[0].result()
+            if not tasks:
+                raise done.pop().exception()
+    finally:
+        for task in tasks:
+            task.cancel()
+
+async def complete(api_key: str, request: Dict[str, Any], hedge: Optional[bool] = None) -> Any:
+    """Send a chat completion request through the key's client and rate limiter.
+
+    Retryable failures (see is_retryable) are retried up to Config.LLM_MAX_RETRIES times after
+    retry_delay; anything else is raised at once. With hedging (default Config.LLM_HEDGE_ENABLED),
+    a request slower than most recent ones is duplicated to cut tail latency. Streamed requests
+    are retried only until the response starts, and should not be hedged.
+    """
+    tokens = estimate_tokens(request)
+    hedge = config.LLM_HEDGE_ENABLED if hedge is None else hedge
+    attempt = 0
+    while True:
+        try:
+            if hedge:
+                return await _hedged(api_key, request, tokens)
+            return await _attempt(api_key, request, tokens)
+        except Exception as e:
+            if attempt >= config.LLM_MAX_RETRIES or not is_retryable(e):
+                raise
+            await asyncio.sleep(retry_delay(e, attempt))
+            attempt += 1
+
+async def close_clients() -> None:
+    """Close every client created on the running loop and their connections; call before the loop ends."""
+    clients = _clients.pop(asyncio.get_running_loop(), {})
+    _rate_limiters.pop(asyncio.get_running_loop(), None)
+    await asyncio.gather(*(client.close() for client in clients.values()))
+
+def get_response_cache() -> DiskCache:
+    """The shared prompt/response cache; its stats() report the hit rate of this process."""
+    global _response_cache
+    path = os.path.join(config.CACHE_DIR, 'responses.sqlite3')
+    if _response_cache is None or _response_cache.path != path:
+        _response_cache = DiskCache(path, config.LLM_CACHE_MAX_BYTES, ttl=config.LLM_CACHE_TTL)
+    return _response_cache
+
+def response_cache_key(request: Dict[str, Any]) -> str:
+    """Hash everything that shapes a response: model, messages, sampling settings and tool schemas.
+
+    The API key is left out so teammates replaying the same prompt share entries.
+    """
+    fingerprint = json.dumps([RESPONSE_CACHE_FORMAT_VERSION, request], sort_keys=True)
+    return hashlib.sha256(fingerprint.encode('utf-8')).hexdigest()
+
+def is_cacheable(request: Dict[str, Any], use_cache: bool = True) -> bool:
+    """Responses sampled with temperature > 0 vary between calls, so they are cached only when
+    Config.LLM_CACHE_SAMPLED allows it."""
+    if not (use_cache and config.LLM_CACHE_ENABLED):
+        return False
+    # The API samples at temperature 1 when none is given
+    return request.get('temperature', 1) == 0 or config.LLM_CACHE_SAMPLED
@@ -0,0 +1,199 @@
+import ast
+import asyncio
+import hashlib
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Iterator, List, NamedTuple, Optional, Tuple
+from mccabe import PathGraphingAstVisitor
+from config import config
+from disk_cache import DiskCache
+from repo_analyzer import discover_python_files, read_source, source_chunks
+
+# Bump whenever how a metric is computed changes
+METRICS_FORMAT_VERSION = 1
+
+_FUNCTION_TYPES = (ast.FunctionDef, ast.AsyncFunctionDef)
+# Match (3.10) and TryStar (3.11) are missing from older Pythons
+_BLOCK_TYPES = tuple(node_type for node_type in (
+    getattr(ast, name, None) for name in ('If', 'For', 'AsyncFor', 'While', 'With', 'AsyncWith', 'Try', 'TryStar', 'Match')
+) if node_type is not None)
+
+# Each worker opens its own connection; SQLite connections must not cross a fork
+_worker_cache: Optional[DiskCache] = None
+
+class FunctionMetrics(NamedTuple):
+    path: str
+    name: str  # Qualified with its classes, e.g. Config.load; nested functions count towards their parent
+    line: int
+    complexity: int  # McCabe cyclomatic complexity
+    length: int  # Lines from the def line to the last line of the body
+    depth: int  # Deepest nesting of control-flow blocks
+    fan_out: int  # Distinct functions and methods called
+
+class MetricsReport(NamedTuple):
+    functions: List[FunctionMetrics]
+    files: int
+    recomputed: int  # Functions whose metrics were not cached
+    unparsable: List[str]
+
+def get_metrics_cache() -> DiskCache:
+    return DiskCache(os.path.join(config.CACHE_DIR, 'metrics.sqlite3'), config.METRICS_CACHE_MAX_BYTES)
+
+def _hash(*parts: str) -> str:
+    return hashlib.sha256('\0'.join([str(METRICS_FORMAT_VERSION), *parts]).encode('utf-8')).hexdigest()
+
+def _functions(node: ast.AST, prefix: str = '') -> Iterator[Tuple[str, ast.AST]]:
+    """Yield the functions mccabe graphs separately: module-level ones and methods, with their qualified names."""
+    for child in ast.iter_child_nodes(node):
+        if isinstance(child, _FUNCTION_TYPES):
+            yield prefix + child.name, child
+        elif isinstance(child, ast.ClassDef):
+            yield from _functions(child, f"{prefix}{child.name}.")
+        elif isinstance(child, ast.stmt):
+            yield from _functions(child, prefix)
+
+def _complexity(node: ast.AST) -> int:
+    visitor = PathGraphingAstVisitor()
+    visitor.preorder(node, visitor)
+    return next(iter(visitor.graphs.values())).complexity()
+
+def _depth(statements: List[ast.stmt], level: int = 0) -> int:
+    deepest = level
+    for statement in statements:
+        if isinstance(statement, _BLOCK_TYPES):
+            inner = level + 1
+        else:
+            inner = level
+        if isinstance(statement, ast.If) and len(statement.orelse) == 1 and isinstance(statement.orelse[0], ast.If):
+            # An elif chain is one level, not one more per branch
+            deepest = max(deepest, _depth(statement.body, inner), _depth(statement.orelse, level))
+            continue
+        for field in ('body', 'orelse', 'finalbody'):
+            deepest = max(deepest, _depth(getattr(statement, field, []), inner))
+        for child in getattr(statement, 'handlers', []) + getattr(statement, 'cases', []):
+            deepest = max(deepest, _depth(child.body, inner))
+    return deepest
+
+def _callee(func: ast.AST) -> Optional[str]:
+    parts = []
+    while isinstance(func, ast.Attribute):
+        parts.append(func.attr)
+        func = func.value
+    if isinstance(func, ast.Name):
+        parts.append(func.id)
+    elif not parts:
+        return None
+    return '.'.join(reversed(parts))
+
+def _fan_out(node: ast.AST) -> int:
+    # A plain stack walk; ast.walk's generator per node costs more than the rest of the metrics
+    callees = set()
+    stack = [node]
+    while stack:
+        node = stack.pop()
+        if node.__class__ is ast.Call:
+            callees.add(_callee(node.func))
+        for field in node._fields:
+            value = getattr(node, field, None)
+            if value.__class__ is list:
+                stack.extend(item for item in value if isinstance(item, ast.AST))
+            elif isinstance(value, ast.AST):
+                stack.append(value)
+    callees.discard(None)
+    return len(callees)
+
+def _measure(node: ast.AST) -> List[int]:
+    return [_complexity(node), node.end_lineno - node.lineno + 1, _depth(node.body), _fan_out(node)]
+
+def _measure_file(code: str, cache: Optional[DiskCache]) -> Tuple[Optional[list], Dict[str, list]]:
+    """Return the file's [name, line, *metrics] records and the function entries computed afresh.
+
+    Functions are keyed by the hash of their own source lines, so editing one function leaves
+    every other function's metrics cached even though the file changed.
+    """
+    try:
+        tree = ast.parse(code)
+    except (SyntaxError, ValueError):
+        return None, {}
+    lines = code.splitlines()
+    functions = [(name, node, _hash('function', '\n'.join(lines[node.lineno - 1:node.end_lineno])))
+                 for name, node in _functions(tree)]
+    cached = cache.get_many(key for _, _, key in functions) if cache is not None else {}
+    computed = {}
+    records = []
+    for name, node, key in functions:
+        metrics = cached.get(key) or computed.get(key)
+        if metrics is None:
+            metrics = computed[key] = _measure(node)
+        records.append([name, node.lineno, *metrics])
+    return records, computed
+
+def _init_worker(use_cache: bool) -> None:
+    global _worker_cache
+    _worker_cache = get_metrics_cache() if use_cache else None
+
+def _measure_chunk(files: List[Tuple[str, str, str]]) -> List[Tuple[str, str, Optional[list], Dict[str, list]]]:
+    return [(path, file_key, *_measure_file(code, _worker_cache)) for path, file_key, code in files]
+
+async def collect_metrics(root: str, ignore_patterns: Optional[List[str]] = None,
+                          use_cache: bool = True) -> MetricsReport:
+    """Compute per-function complexity, length, nesting depth and fan-out for every file under root.
+
+    Unchanged files are answered from the cache without parsing. Changed files are parsed on a
+    pool of worker processes, which recompute only the functions whose source changed.
+    """
+    use_cache = use_cache and config.METRICS_CACHE_ENABLED
+    cache = get_metrics_cache() if use_cache else None
+    records: Dict[str, list] = {}
+    stale = []
+    unparsable = []
+    for path in discover_python_files(root, ignore_patterns):
+        try:
+            code = read_source(path)
+        except (OSError, SyntaxError, UnicodeDecodeError):
+            unparsable.append(path)
+            continue
+        stale.append((path, _hash('file', code), code))
+
+    if cache is not None:
+        cached_files = cache.get_many(file_key for _, file_key, _ in stale)
+        for path, file_key, _ in stale:
+            if file_key in cached_files:
+                records[path] = cached_files[file_key]
+        stale = [file for file in stale if file[1] not in cached_files]
+
+    # Identical files are measured once and their metrics copied to every path
+    paths_by_key: Dict[str, List[str]] = {}
+    for path, file_key, _ in stale:
+        paths_by_key.setdefault(file_key, []).append(path)
+    stale = [file for file in stale if paths_by_key[file[1]][0] == file[0]]
+
+    recomputed = 0
+    if stale:
+        loop = asyncio.get_running_loop()
+        with ProcessPoolExecutor(max_workers=config.ANALYSIS_WORKERS, initializer=_init_worker,
+                                 initargs=(use_cache,)) as pool:
+            results = await asyncio.gather(*(loop.run_in_executor(pool, _measure_chunk, chunk) for chunk in source_chunks(stale)))
+        new_entries = {}
+        for _, file_key, file_records, computed in (result for chunk in results for result in chunk):
+            if file_records is None:
+                unparsable.extend(paths_by_key[file_key])
+                continue
+            for path in paths_by_key[file_key]:
+                records[path] = file_records
+            new_entries[file_key] = file_records
+            new_entries.update(computed)
+            recomputed += len(computed)
+        if cache is not None and new_entries:
+            cache.set_many(new_entries)
+
+    if cache is not None:
+        cache.close()
+    functions = [FunctionMetrics(path, *record) for path, file_records in records.items() for record in file_records]
+    functions.sort(key=lambda function: (function.path, function.line))
+    return MetricsReport(functions, len(records), recomputed, sorted(unparsable))
+
+def hotspots(functions: List[FunctionMetrics], sort_by: str = 'complexity', limit: Optional[int] = 20) -> List[FunctionMetrics]:
+    """The functions with the highest value of one metric, ties broken by complexity."""
+    ranked = sorted(functions, key=lambda function: (getattr(function, sort_by), function.complexity), reverse=True)
+    return ranked if limit is None else ranked[:limit]
@@ -0,0 +1,212 @@
+import fnmatch
+import json
+import os
+import tokenize
+from typing import Any, AsyncIterator, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+from git import GitCommandError
+from analysis_timings import AnalysisTimings
+from baseline import Baseline
+from code_analyzer import Profile, analysis_environment, analyze_sources, profile_args
+from config import config
+from git_integration import GitIntegration
+from lite_analyzer import analyze_lite
+from issues import Issue, IssueBatch, is_partial
+
+# Bump whenever the layout of the stored incremental state changes
+STATE_FORMAT_VERSION = 2
+# Source bytes sent to a worker per job; small enough to spread over the pool, big enough to amortise pickling
+_CHUNK_BYTES = 512 * 1024
+
+def is_ignored(relative_path: str, ignore_patterns: List[str]) -> bool:
+    """Match a pattern against every component of a root-relative path and against the path itself."""
+    normalized = os.path.normpath(relative_path).replace(os.sep, '/')
+    parts = normalized.split('/')
+    return any(
+        fnmatch.fnmatch(normalized, pattern) or any(fnmatch.fnmatch(part, pattern) for part in parts)
+        for pattern in ignore_patterns
+    )
+
+def discover_python_files(root: str, ignore_patterns: Optional[List[str]] = None) -> Iterator[str]:
+    if ignore_patterns is None:
+        ignore_patterns = config.ANALYSIS_IGNORE_PATTERNS
+
+    if os.path.isfile(root):
+        yield root
+        return
+
+    for dirpath, dirnames, filenames in os.walk(root):
+        # Prune ignored directories in place so os.walk never descends into them
+        dirnames[:] = sorted(
+            d for d in dirnames if not is_ignored(os.path.relpath(os.path.join(dirpath, d), root), ignore_patterns)
+        )
+        for filename in sorted(filenames):
+            path = os.path.join(dirpath, filename)
+            if filename.endswith('.py') and not is_ignored(os.path.relpath(path, root), ignore_patterns):
+                yield path
+
+def read_source(path: str) -> str:
+    # tokenize.open honours PEP 263 encoding declarations
+    with tokenize.open(path) as source_file:
+        return source_file.read()
+
+def source_chunks(files: Iterable[tuple]) -> Iterator[List[tuple]]:
+    """Batch tuples whose last item is source code into jobs of about the same number of bytes."""
+    chunk, size = [], 0
+    for file in files:
+        chunk.append(file)
+        size += len(file[-1])
+        if size >= _CHUNK_BYTES:
+            yield chunk
+            chunk, size = [], 0
+    if chunk:
+        yield chunk
+
+_READ_ERRORS = (OSError, SyntaxError, UnicodeDecodeError, GitCommandError)
+
+def _unreadable_issues(error: Exception) -> IssueBatch:
+    return IssueBatch([Issue.make('error', 1, 1, f"Could not read file: {str(error)}")])
+
+async def analyze_files(paths: Iterable[str], use_cache: bool = True, read: Callable[[str], str] = read_source,
+                        profile: Optional[Profile] = None, compact: bool = False,
+                        timings: Optional[AnalysisTimings] = None,
+                        baseline: Optional[Baseline] = None) -> AsyncIterator[Tuple[str, Any]]:
+    """Analyze files in parallel, yielding (path, issues) in completion order.
+
+    Issues are lists of dicts, or IssueBatches when compact=True. Issues accepted by baseline are left out.
+    """
+    unreadable = []
+
+    def readable_sources() -> Iterator[Tuple[str, str]]:
+        for path in paths:
+            try:
+                yield path, read(path)
+            except _READ_ERRORS as e:
+                unreadable.append((path, _unreadable_issues(e)))
+
+    async for result in analyze_sources(readable_sources(), use_cache=use_cache, profile=profile, compact=compact,
+                                        timings=timings, baseline=baseline):
+        yield result
+    for path, issues in unreadable:
+        yield path, issues if compact else issues.to_dicts()
+
+async def analyze_path(root: str, ignore_patterns: Optional[List[str]] = None, use_cache: bool = True,
+                       profile: Optional[Profile] = None, compact: bool = False,
+                       timings: Optional[AnalysisTimings] = None,
+                       baseline: Optional[Baseline] = None) -> AsyncIterator[Tuple[str, Any]]:
+    async for result in analyze_files(discover_python_files(root, ignore_patterns), use_cache=use_cache,
+                                      profile=profile, compact=compact, timings=timings, baseline=baseline):
+        yield result
+
+def analyze_path_lite(root: str, ignore_patterns: Optional[List[str]] = None, compact: bool = False,
+                      baseline: Optional[Baseline] = None) -> Iterator[Tuple[str, Any]]:
+    """Check every file with the single-pass lite engine in this process, yielding (path, issues) in path order."""
+    for path in discover_python_files(root, ignore_patterns):
+        try:
+            code = read_source(path)
+        except _READ_ERRORS as e:
+            issues = _unreadable_issues(e)
+        else:
+            issues = analyze_lite(code, path, compact=True)
+            if baseline is not None:
+                issues = baseline.filter(path, issues, code)
+        yield path, issues if compact else issues.to_dicts()
+
+def _results_path(git_integration: GitIntegration) -> str:
+    # Kept inside .git so the stored results never show up as a change themselves
+    return os.path.join(git_integration.repo.git_dir, config.ANALYSIS_RESULTS_FILE)
+
+def load_last_results(repo_path: str, compact: bool = False) -> Dict[str, Any]:
+    """Return the per-file issues recorded by the last incremental run, keyed by repository-relative path."""
+    results = _load_state(GitIntegration(repo_path)).get('results', {})
+    return {path: issues if compact else issues.to_dicts() for path, issues in results.items()}
+
+def _load_state(git_integration: GitIntegration) -> dict:
+    try:
+        with open(_results_path(git_integration), encoding='utf-8') as state_file:
+            state = json.load(state_file)
+    except (OSError, ValueError):
+        return {}
+    # State written by an older version is treated like a first run
+    if state.get('format') != STATE_FORMAT_VERSION:
+        return {}
+    state['results'] = {path: IssueBatch.from_json(issues) for path, issues in state.get('results', {}).items()}
+    return state
+
+def _save_state(git_integration: GitIntegration, state: dict) -> None:
+    state = dict(state, format=STATE_FORMAT_VERSION,
+                 results={path: issues.to_json() for path, issues in state['results'].items()})
+    with open(_results_path(git_integration), 'w', encoding='utf-8') as state_file:
+        json.dump(state, state_file)
+
+async def analyze_changed(repo_path: str, since: Optional[str] = None, staged: bool = False, merge_base: bool = False,
+                          ignore_patterns: Optional[List[str]] = None, use_cache: bool = True,
+                          profile: Optional[Profile] = None, compact: bool = False,
+                          timings: Optional[AnalysisTimings] = None,
+                          baseline: Optional[Baseline] = None) -> AsyncIterator[Tuple[str, Any]]:
+    """Analyze only the Python files git reports as changed, yielding (path, issues) as they finish.
+
+    Results for every other file are carried over from the previous run and can be read back
+    with load_last_results. The first run in a repository has nothing to reuse and analyzes
+    the whole tree, and so does a run with a different checker profile or baseline than the last one.
+    """
+    if ignore_patterns is None:
+        ignore_patterns = config.ANALYSIS_IGNORE_PATTERNS
+
+    git_integration = GitIntegration(repo_path)
+    root = git_integration.repo.working_tree_dir
+    state = _load_state(git_integration)
+    head = git_integration.head_commit()
+    args = list(profile_args(profile))
+    # Upgrading pylint or editing the pylintrc changes every verdict
+    environment = analysis_environment()
+    # Stored results are filtered, so they only hold for the baseline they were filtered with
+    baseline_digest = baseline.digest() if baseline is not None else None
+
+    if (state.get('commit') is None or state.get('args') != args or state.get('environment') != environment
+            or state.get('baseline') != baseline_digest):
+        results = {}
+        targets = {os.path.relpath(path, root).replace(os.sep, '/') for path in discover_python_files(root, ignore_patterns)}
+    else:
+        results = state.get('results', {})
+        targets = set(git_integration.changed_files(since, staged=staged, merge_base=merge_base))
+        # Anything touched since the stored results were produced would otherwise be reused stale
+        targets.update(state.get('dirty', []))
+        try:
+            targets.update(git_integration.changed_files(state['commit'], staged=staged))
+        except GitCommandError:
+            results = {}
+            targets.update(os.path.relpath(path, root).replace(os.sep, '/') for path in discover_python_files(root, ignore_patterns))
+
+    # Forget files deleted since the last run
+    results = {path: issues for path, issues in results.items() if os.path.exists(os.path.join(root, path))}
+    remaining = {path for path in targets if path.endswith('.py') and not is_ignored(path, ignore_patterns)
+                 and os.path.exists(os.path.join(root, path))}
+
+    staged_paths = set(git_integration.changed_files(staged=True)) if staged else set()
+
+    def read(full_path: str) -> str:
+        path = os.path.relpath(full_path, root).replace(os.sep, '/')
+        if path in staged_paths:
+            return git_integration.staged_content(path)
+        return read_source(full_path)
+
+    try:
+        paths = [os.path.join(root, path) for path in sorted(remaining)]
+        async for full_path, issues in analyze_files(paths, use_cache, read, profile, compact=True, timings=timings,
+                                                     baseline=baseline):
+            path = os.path.relpath(full_path, root).replace(os.sep, '/')
+            results[path] = issues
+            # Results cut short by a time budget are kept but the file is checked again next run
+            if not is_partial(issues):
+                remaining.discard(path)
+            yield os.path.join(repo_path, path), issues if compact else issues.to_dicts()
+    finally:
+        # Files left unanalyzed or timed out are marked dirty so the next run picks them up
+        _save_state(git_integration, {
+            'commit': head,
+            'args': args,
+            'environment': environment,
+            'baseline': baseline_digest,
+            'dirty': sorted({path for path in (git_integration.changed_files() if head else []) if path.endswith('.py')} | remaining),
+            'results': results
+        })
@@ -0,0 +1,63 @@
+import asyncio
+import tempfile
+import unittest
+from unittest.mock import patch
+
+from analysis_timings import CHECKERS, FILES, INFERENCE_PHASE, PARSE_PHASE, PHASES, AnalysisTimings, format_timings
+from code_analyzer import analyze_code, get_analysis_cache, shutdown_worker_pool
+from config import config
+
+def async_test(f):
+    def wrapper(*args, **kwargs):
+        return asyncio.run(f(*args, **kwargs))
+    return wrapper
+
+class TestAnalysisTimings(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.cache_patch = patch.object(config, 'CACHE_DIR', self.tmp_dir.name)
+        self.cache_patch.start()
+
+    def tearDown(self):
+        get_analysis_cache().close()
+        self.cache_patch.stop()
+        self.tmp_dir.cleanup()
+
+    @classmethod
+    def tearDownClass(cls):
+        shutdown_worker_pool()
+
+    @async_test
+    async def test_collects_checker_phase_and_file_timings(self):
+        code = "import os\nvalue = os.path.join('a', 'b')\n"
+        timings = AnalysisTimings()
+        issues = await analyze_code(code, timings=timings)
+        self.assertEqual(issues, await analyze_code(code, use_cache=False))
+        self.assertIn('variables', timings.sections[CHECKERS])
+        self.assertIn(PARSE_PHASE, timings.sections[PHASES])
+        self.assertIn(INFERENCE_PHASE, timings.sections[PHASES])
+        self.assertEqual(list(timings.sections[FILES]), ['snippet.py'])
+
+    @async_test
+    async def test_timed_runs_skip_cached_results(self):
+        code = "x = 1\n"
+        await analyze_code(code)
+        timings = AnalysisTimings()
+        await analyze_code(code, timings=timings)
+        self.assertEqual(timings.sections[FILES]['snippet.py'][2], 1)
+
+    def test_merge_and_ranking(self):
+        timings = AnalysisTimings()
+        timings.add(CHECKERS, 'fast', 0.1, 0.1)
+        other = AnalysisTimings()
+        other.add(CHECKERS, 'slow', 2.0, 1.5)
+        other.add(CHECKERS, 'fast', 0.1, 0.1)
+        timings.merge(AnalysisTimings.from_dict(other.to_dict()))
+        self.assertEqual([entry[0] for entry in timings.ranked(CHECKERS)], ['slow', 'fast'])
+        self.assertEqual(timings.ranked(CHECKERS)[1][3], 2)
+        table = format_timings(timings).splitlines()
+        self.assertTrue(table[0].startswith('Checker'))
+        self.assertTrue(table[1].startswith('slow'))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,59 @@
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+
+import astroid
+
+import astroid_snapshot
+
+class TestAstroidSnapshot(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp_dir.name, 'snapshot.pkl')
+        # Work on an empty cache so the snapshot only holds what the test builds
+        self.cache_patch = patch.dict(astroid.MANAGER.astroid_cache, clear=True)
+        self.cache_patch.start()
+
+    def tearDown(self):
+        self.cache_patch.stop()
+        self.tmp_dir.cleanup()
+
+    def test_round_trip_restores_installed_modules(self):
+        astroid.MANAGER.ast_from_module_name('json')
+        astroid.MANAGER.ast_from_file(os.path.abspath('config.py'), 'config')
+        self.assertGreater(astroid_snapshot.save_snapshot(self.path), 0)
+
+        astroid.MANAGER.astroid_cache.clear()
+        self.assertGreater(astroid_snapshot.load_snapshot(self.path), 0)
+        module = astroid.MANAGER.astroid_cache['json']
+        self.assertEqual(module.name, 'json')
+        self.assertIn('dumps', module.globals)
+        # Project modules can change without a version bump, so they are never stored
+        self.assertNotIn('config', astroid.MANAGER.astroid_cache)
+
+    def test_stale_snapshot_is_ignored(self):
+        astroid.MANAGER.ast_from_module_name('json')
+        astroid_snapshot.save_snapshot(self.path)
+        astroid.MANAGER.astroid_cache.clear()
+        with patch('astroid_snapshot.snapshot_key', return_value='other'):
+            self.assertEqual(astroid_snapshot.load_snapshot(self.path), 0)
+        self.assertNotIn('json', astroid.MANAGER.astroid_cache)
+
+    def test_missing_snapshot_is_ignored(self):
+        self.assertEqual(astroid_snapshot.load_snapshot(self.path), 0)
+
+    def test_snapshot_is_loaded_and_frozen_once_per_process(self):
+        with patch.object(astroid_snapshot, '_loaded', False), \
+                patch('astroid_snapshot.load_snapshot', return_value=1) as load, \
+                patch('gc.freeze') as freeze, patch('gc.unfreeze') as unfreeze:
+            astroid_snapshot.load_snapshot_once()
+            astroid_snapshot.load_snapshot_once()
+            self.assertEqual((load.call_count, freeze.call_count), (1, 1))
+            # After astroid's cache is dropped the snapshot is loaded again
+            astroid_snapshot.forget_snapshot()
+            astroid_snapshot.load_snapshot_once()
+            self.assertEqual((load.call_count, freeze.call_count, unfreeze.call_count), (2, 2, 1))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,61 @@
+import json
+import os
+import tempfile
+import unittest
+
+from baseline import Baseline
+from issues import NO_ISSUES, Issue, IssueBatch, timeout_issue
+
+CODE = "import os\nimport sys\n\ndef f():\n    value = 1\n"
+ISSUES = IssueBatch([
+    Issue.make('warning', 1, 0, 'Unused import os', 'unused-import'),
+    Issue.make('warning', 2, 0, 'Unused import sys', 'unused-import'),
+    Issue.make('warning', 5, 4, "Unused variable 'value'", 'unused-variable'),
+])
+
+class TestBaseline(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.root = self.tmp_dir.name
+        self.path = os.path.join(self.root, 'pkg', 'module.py')
+        self.baseline = Baseline(self.root)
+        self.baseline.add(self.path, ISSUES, CODE)
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_accepted_issues_survive_moves_and_reindentation(self):
+        moved = "import json\n" + CODE.replace("    value", "        value")
+        issues = IssueBatch([
+            Issue.make('warning', 1, 0, 'Unused import json', 'unused-import'),
+            Issue.make('warning', 2, 0, 'Unused import os', 'unused-import'),
+            Issue.make('warning', 6, 8, "Unused variable 'value'", 'unused-variable'),
+            timeout_issue("Analysis stopped"),
+        ])
+        self.assertEqual([issue.message for issue in self.baseline.filter(self.path, issues, moved)],
+                         ['Unused import json', 'Analysis stopped'])
+        self.assertEqual(self.baseline.filter(self.path, ISSUES, CODE), IssueBatch([NO_ISSUES]))
+        # The same issue in another file is new
+        self.assertEqual(len(self.baseline.filter(os.path.join(self.root, 'other.py'), ISSUES, CODE)), 3)
+
+    def test_repeated_issues_are_counted(self):
+        code = "import os\nimport os\n"
+        twice = IssueBatch([Issue.make('warning', 1, 0, 'Unused import os', 'unused-import'),
+                            Issue.make('warning', 2, 0, 'Unused import os', 'unused-import')])
+        baseline = Baseline(self.root)
+        baseline.add(self.path, [twice[0]], code)
+        self.assertEqual([issue.line for issue in baseline.filter(self.path, twice, code)], [2])
+
+    def test_round_trip_and_version_check(self):
+        path = os.path.join(self.root, 'baseline.json')
+        self.baseline.save(path)
+        loaded = Baseline.load(path, self.root)
+        self.assertEqual((len(loaded), loaded.digest()), (3, self.baseline.digest()))
+
+        with open(path, 'w') as f:
+            json.dump({'format': 0, 'fingerprints': {}}, f)
+        with self.assertRaises(ValueError):
+            Baseline.load(path, self.root)
+
+if __name__ == '__main__':
+    unittest.main()
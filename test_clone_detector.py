@@ -0,0 +1,131 @@
+import asyncio
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+
+from clone_detector import CloneIndex, find_clones, fingerprint
+from config import config
+
+ORIGINAL = '''def merge(left, right):
+    result = []
+    i = j = 0
+    while i < len(left) and j < len(right):
+        if left[i] <= right[j]:
+            result.append(left[i])
+            i += 1
+        else:
+            result.append(right[j])
+            j += 1
+    result.extend(left[i:])
+    result.extend(right[j:])
+    return result
+'''
+
+# The same function with every name changed and a comment added, below unrelated code
+RENAMED = '''import os
+
+def describe(path):
+    return os.path.basename(path).upper()
+
+def combine(first, second):
+    # Classic two-way merge
+    out = []
+    a = b = 0
+    while a < len(first) and b < len(second):
+        if first[a] <= second[b]:
+            out.append(first[a])
+            a += 1
+        else:
+            out.append(second[b])
+            b += 1
+    out.extend(first[a:])
+    out.extend(second[b:])
+    return out
+'''
+
+UNRELATED = '''class Config:
+    def __init__(self, values):
+        self.values = dict(values)
+
+    def get(self, key, default=None):
+        return self.values.get(key, default)
+'''
+
+def async_test(f):
+    def wrapper(*args, **kwargs):
+        return asyncio.run(f(*args, **kwargs))
+    return wrapper
+
+class TestCloneDetector(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.root = os.path.join(self.tmp_dir.name, 'project')
+        os.makedirs(self.root)
+        self.cache_patch = patch.object(config, 'CACHE_DIR', os.path.join(self.tmp_dir.name, 'cache'))
+        self.cache_patch.start()
+
+    def tearDown(self):
+        self.cache_patch.stop()
+        self.tmp_dir.cleanup()
+
+    def write(self, name, code):
+        with open(os.path.join(self.root, name), 'w') as f:
+            f.write(code)
+
+    def test_renamed_copies_are_grouped(self):
+        index = CloneIndex()
+        index.update('a.py', ORIGINAL)
+        index.update('b.py', RENAMED)
+        index.update('c.py', UNRELATED)
+        groups = index.clone_groups()
+        self.assertEqual(len(groups), 1)
+        self.assertEqual([(f.path, f.start_line, f.end_line) for f in groups[0].fragments],
+                         [('a.py', 1, 13), ('b.py', 6, 19)])
+
+    def test_index_follows_updates(self):
+        index = CloneIndex()
+        index.update('a.py', ORIGINAL)
+        index.update('b.py', ORIGINAL)
+        self.assertEqual(len(index.clone_groups()), 1)
+        index.update('b.py', UNRELATED)
+        self.assertEqual(index.clone_groups(), [])
+        index.update('c.py', ORIGINAL)
+        self.assertEqual(len(index.clone_groups()), 1)
+        index.remove('c.py')
+        self.assertEqual(index.clone_groups(), [])
+        self.assertFalse(index.update('d.py', 'def broken(:\n    """\n'))
+        self.assertEqual(len(index), 2)
+
+    def test_grouping_is_linear_in_the_copies(self):
+        # Every copy of a file shared by n files used to build its own n-path set per fingerprint
+        for copies in (20, 40):
+            index = CloneIndex()
+            for i in range(copies):
+                index.update(f'{i}.py', ORIGINAL)
+            built = []
+            def counting_frozenset(paths):
+                built.append(len(paths))
+                return frozenset(paths)
+            with patch('clone_detector.frozenset', counting_frozenset, create=True):
+                groups = index.clone_groups()
+            self.assertEqual(len(groups[0].fragments), copies)
+            self.assertLessEqual(sum(built), len(fingerprint(ORIGINAL)) * copies)
+
+    def test_fingerprints_ignore_names_and_layout(self):
+        self.assertEqual([fp.hash for fp in fingerprint(ORIGINAL)], [fp.hash for fp in fingerprint(RENAMED.split('\n\n', 2)[2])])
+
+    @async_test
+    async def test_reruns_only_fingerprint_changed_files(self):
+        self.write('a.py', ORIGINAL)
+        self.write('b.py', RENAMED)
+        report = await find_clones(self.root)
+        self.assertEqual((report.files, report.fingerprinted, len(report.groups)), (2, 2, 1))
+        self.assertEqual((await find_clones(self.root)).fingerprinted, 0)
+
+        self.write('b.py', UNRELATED)
+        report = await find_clones(self.root)
+        self.assertEqual((report.fingerprinted, report.groups), (1, []))
+
+if __name__ == '__main__':
+    unittest.main()
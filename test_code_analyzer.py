@@ -0,0 +1,275 @@
+import unittest
+from unittest.mock import patch
+import asyncio
+import os
+import signal
+import tempfile
+
+import time
+
+import code_analyzer
+from code_analyzer import (_run_pylint, analyze_code, analyze_code_stream, analyze_many, analyze_sources,
+                           analysis_cache_key, profile_args, shutdown_worker_pool)
+from config import config
+from issues import is_partial
+
+# Long enough that pylint takes several hundred milliseconds on it
+SLOW_CODE = "import os\n" + "".join(f"def f{i}(x):\n    unused_{i} = x\n    return f{i - 1}(x) if {i} else x\n"
+                                    for i in range(1, 600))
+
+def _stuck_job(*args):
+    # Stands in for a worker stuck in C code, where its alarm never arrives
+    signal.pthread_sigmask(signal.SIG_BLOCK, {signal.SIGALRM})
+    time.sleep(60)
+
+def async_test(f):
+    def wrapper(*args, **kwargs):
+        return asyncio.run(f(*args, **kwargs))
+    return wrapper
+
+class TestCodeAnalyzer(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.cache_patch = patch.object(config, 'CACHE_DIR', self.tmp_dir.name)
+        self.cache_patch.start()
+
+    def tearDown(self):
+        code_analyzer.get_analysis_cache().close()
+        self.cache_patch.stop()
+        self.tmp_dir.cleanup()
+
+    @classmethod
+    def tearDownClass(cls):
+        shutdown_worker_pool()
+
+    @async_test
+    async def test_analyze_many_matches_analyze_code(self):
+        codes = ["def test(): pass", "def test():\n    unused_var = 5\n", "x = undefined_name\n"]
+        results = await analyze_many(codes)
+        self.assertEqual(len(results), len(codes))
+        for code, result in zip(codes, results):
+            self.assertEqual(result, await analyze_code(code))
+
+    @async_test
+    async def test_analyze_many_reuses_workers(self):
+        # A warm worker must not carry issues over from the previous snippet
+        results = await analyze_many(["import os\n", "def test(): pass"] * 4)
+        for result in results[1::2]:
+            self.assertEqual(result, [{'type': 'info', 'line': '1', 'column': '1', 'message': 'No issues found'}])
+
+    @async_test
+    async def test_identical_files_are_analyzed_once(self):
+        code = "def f():\n    unused = 1\n"
+        sources = [("a.py", code), ("vendor/a.py", code), ("b.py", "x = 1\n")]
+        with patch('code_analyzer._analyze_in_pool', wraps=code_analyzer._analyze_in_pool) as analyze_in_pool:
+            results = {path: issues async for path, issues in analyze_sources(sources, use_cache=False)}
+            self.assertEqual(analyze_in_pool.call_count, 2)
+            self.assertEqual(await analyze_many([code] * 3, use_cache=False), [results["a.py"]] * 3)
+            self.assertEqual(analyze_in_pool.call_count, 3)
+        self.assertEqual(results["vendor/a.py"], results["a.py"])
+        self.assertEqual(results["a.py"][0]['message'], "Unused variable 'unused'")
+
+    @async_test
+    async def test_identical_files_that_import_are_judged_per_directory(self):
+        with tempfile.TemporaryDirectory() as root:
+            for directory in ('pkg', 'vendor'):
+                os.makedirs(os.path.join(root, directory))
+                open(os.path.join(root, directory, '__init__.py'), 'w').close()
+            with open(os.path.join(root, 'pkg', 'helper.py'), 'w') as f:
+                f.write("def run():\n    return 1\n")
+            # Only pkg has the sibling module
+            code = "from . import helper\n\nhelper.run()\n"
+            sources = [(os.path.join(root, directory, 'a.py'), code) for directory in ('pkg', 'vendor')]
+            for use_cache in (False, True, True):
+                results = {os.path.basename(os.path.dirname(path)): issues
+                           async for path, issues in analyze_sources(sources, use_cache=use_cache)}
+                self.assertEqual(results['pkg'][0]['message'], 'No issues found')
+                self.assertTrue(results['vendor'][0]['message'].startswith("No name 'helper' in module"))
+
+    def test_cache_key_tracks_pylint_args(self):
+        key = analysis_cache_key("x = 1\n")
+        original_args = config.PYLINT_ARGS
+        config.PYLINT_ARGS = original_args + ['--disable=W0611']
+        try:
+            self.assertNotEqual(analysis_cache_key("x = 1\n"), key)
+        finally:
+            config.PYLINT_ARGS = original_args
+
+    def test_cache_key_tracks_pylintrc_and_versions(self):
+        key = analysis_cache_key("x = 1\n")
+        for module, attribute in ((code_analyzer.astroid, '__version__'), (code_analyzer.sys, 'version')):
+            with patch.object(module, attribute, 'other'):
+                self.assertNotEqual(analysis_cache_key("x = 1\n"), key)
+
+        cwd = os.getcwd()
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            os.chdir(tmp_dir)
+            try:
+                keys = {analysis_cache_key("x = 1\n")}
+                for limit in (80, 120):
+                    with open('.pylintrc', 'w') as f:
+                        f.write(f"[MAIN]\nmax-line-length={limit}\n")
+                    keys.add(analysis_cache_key("x = 1\n"))
+            finally:
+                os.chdir(cwd)
+        self.assertEqual(len(keys), 3)
+
+    def test_cache_key_tracks_profile(self):
+        self.assertNotEqual(analysis_cache_key("x = 1\n", profile_args('errors-only')),
+                            analysis_cache_key("x = 1\n", profile_args('full')))
+
+    def test_profile_args(self):
+        self.assertEqual(profile_args('errors-only')[:len(config.PYLINT_ARGS)], tuple(config.PYLINT_ARGS))
+        self.assertIn('--disable=W0511,W0612', profile_args({'disable': ['W0511', 'W0612']}))
+        with self.assertRaises(ValueError):
+            profile_args('nonexistent')
+
+    @async_test
+    async def test_errors_only_profile(self):
+        code = "import os\nx = undefined_name\n"
+        full = await analyze_code(code, use_cache=False)
+        errors = await analyze_code(code, use_cache=False, profile='errors-only')
+        self.assertIn('warning', [issue['type'] for issue in full])
+        self.assertEqual(errors, [{'type': 'error', 'line': '2', 'column': '4', 'message': "Undefined variable 'undefined_name'"}])
+
+    @async_test
+    async def test_custom_rules_profile(self):
+        code = "import os\n"
+        result = await analyze_code(code, use_cache=False, profile={'disable': ['unused-import']})
+        self.assertEqual(result, [{'type': 'info', 'line': '1', 'column': '1', 'message': 'No issues found'}])
+
+    @async_test
+    async def test_cached_result_matches_fresh_run(self):
+        code = "def test():\n    unused_var = 5\n"
+        fresh = await analyze_code(code, use_cache=False)
+        await analyze_code(code)
+        self.assertEqual(await analyze_code(code), fresh)
+
+    @async_test
+    @patch('tempfile.NamedTemporaryFile', side_effect=OSError("read-only file system"))
+    async def test_analysis_does_not_touch_disk(self, mock_tempfile):
+        result = _run_pylint("def test():\n    value = 5\n").to_dicts()
+        self.assertEqual(result, [{'type': 'warning', 'line': '2', 'column': '4', 'message': "Unused variable 'value'"}])
+        mock_tempfile.assert_not_called()
+
+    @async_test
+    async def test_analyze_code_does_not_block_event_loop(self):
+        ticks = 0
+
+        async def ticker():
+            nonlocal ticks
+            while True:
+                ticks += 1
+                await asyncio.sleep(0.001)
+
+        ticker_task = asyncio.ensure_future(ticker())
+        codes = [f"def test_{i}():\n    value = {i}\n" for i in range(4)]
+        results = await asyncio.gather(*(analyze_code(code, use_cache=False) for code in codes))
+        ticker_task.cancel()
+        self.assertGreater(ticks, 1)
+        self.assertEqual([result[0]['message'] for result in results], ["Unused variable 'value'"] * 4)
+
+    @async_test
+    async def test_analyze_code_can_be_cancelled(self):
+        task = asyncio.ensure_future(analyze_code("import os\n", use_cache=False))
+        await asyncio.sleep(0)
+        task.cancel()
+        with self.assertRaises(asyncio.CancelledError):
+            await task
+        self.assertEqual((await analyze_code("import os\n", use_cache=False))[0]['message'], 'Unused import os')
+
+    @async_test
+    async def test_stream_yields_same_issues_as_analyze_code(self):
+        code = "import os\ndef test():\n    value = missing\n"
+        streamed = [issue async for issue in analyze_code_stream(code, use_cache=False)]
+        self.assertEqual(streamed, await analyze_code(code, use_cache=False))
+        self.assertEqual([issue async for issue in analyze_code_stream("def test(): pass", use_cache=False)],
+                         [{'type': 'info', 'line': '1', 'column': '1', 'message': 'No issues found'}])
+
+    @async_test
+    async def test_stream_can_stop_early(self):
+        code = "".join(f"value_{i} = missing_{i}\n" for i in range(600))
+        stream = analyze_code_stream(code, use_cache=False)
+        first = await stream.__anext__()
+        await stream.aclose()
+        self.assertEqual(first['type'], 'error')
+
+    @async_test
+    async def test_linters_are_built_under_the_lock(self):
+        real_get_linter = code_analyzer._get_linter
+        locked = []
+
+        def get_linter(args=()):
+            locked.append(code_analyzer._linter_lock.locked())
+            return real_get_linter(args)
+
+        async def collect(code):
+            return [issue async for issue in analyze_code_stream(code, use_cache=False)]
+
+        with patch('code_analyzer._get_linter', get_linter):
+            await asyncio.gather(*(collect(f"import os\nx = {i}\n") for i in range(2)))
+        self.assertEqual(locked, [True, True])
+
+    def test_time_budget_returns_partial_results(self):
+        issues = _run_pylint(SLOW_CODE, time_budget=0.1)
+        self.assertTrue(is_partial(issues))
+        self.assertEqual(issues[len(issues) - 1].type, 'timeout')
+        self.assertLess(len(issues), len(_run_pylint(SLOW_CODE)))
+        # The interrupted run must not leave state behind for the next one
+        self.assertEqual(_run_pylint("import os\n").to_dicts()[0]['message'], 'Unused import os')
+
+    @async_test
+    @patch.object(config, 'ANALYSIS_BATCH_TIMEOUT', 0.5)
+    async def test_batch_timeout_bounds_the_batch(self):
+        started = time.monotonic()
+        # Distinct contents, since identical files would be analyzed only once
+        results = [issues async for _, issues in analyze_sources([(f"slow_{i}.py", SLOW_CODE + f"# {i}\n") for i in range(6)],
+                                                                 use_cache=False, compact=True)]
+        self.assertEqual(len(results), 6)
+        self.assertTrue(any(is_partial(issues) for issues in results))
+        self.assertLess(time.monotonic() - started, 0.5 + config.ANALYSIS_TIMEOUT_GRACE)
+
+    @async_test
+    @patch.object(config, 'ANALYSIS_FILE_TIMEOUT', 0.1)
+    async def test_timed_out_results_are_not_cached(self):
+        # Fresh source each run, so a complete result cached by an earlier run cannot answer
+        code = SLOW_CODE + f"# {time.time()}\n"
+        self.assertTrue(is_partial(await analyze_code(code, compact=True)))
+        with patch.object(config, 'ANALYSIS_FILE_TIMEOUT', None):
+            self.assertFalse(is_partial(await analyze_code(code, compact=True)))
+
+    @async_test
+    @patch.object(config, 'ANALYSIS_FILE_TIMEOUT', 0.1)
+    async def test_streams_keep_to_the_time_budget(self):
+        code = SLOW_CODE + f"# {time.time()}\n"
+        start = time.monotonic()
+        issues = [issue async for issue in analyze_code_stream(code)]
+        self.assertLess(time.monotonic() - start, 5)
+        self.assertEqual(issues[-1]['type'], 'timeout')
+        with patch.object(config, 'ANALYSIS_FILE_TIMEOUT', None):
+            issues = [issue async for issue in analyze_code_stream(code)]
+        self.assertNotEqual(issues[-1]['type'], 'timeout')
+
+    @async_test
+    async def test_dead_workers_are_replaced(self):
+        await analyze_code("import os\n", use_cache=False)
+        for process in list(code_analyzer.get_worker_pool()._processes.values()):
+            os.kill(process.pid, signal.SIGKILL)
+        for _ in range(2):
+            result = await analyze_code("import os\n", use_cache=False)
+            self.assertEqual(result[0]['message'], 'Unused import os')
+
+    @async_test
+    @patch.object(config, 'ANALYSIS_FILE_TIMEOUT', 0.2)
+    @patch.object(config, 'ANALYSIS_TIMEOUT_GRACE', 0.3)
+    async def test_stuck_workers_are_recycled_without_a_batch_deadline(self):
+        started = time.monotonic()
+        with patch.object(code_analyzer, '_pool_job', _stuck_job):
+            issues = await analyze_code("import os\n", use_cache=False, compact=True)
+        self.assertTrue(is_partial(issues))
+        self.assertLess(time.monotonic() - started, 5)
+        result = await analyze_code("import os\n", use_cache=False)
+        self.assertEqual(result[0]['message'], 'Unused import os')
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,62 @@
+import asyncio
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+
+import daemon
+from config import config
+
+def async_test(f):
+    def wrapper(*args, **kwargs):
+        return asyncio.run(f(*args, **kwargs))
+    return wrapper
+
+class TestAnalysisDaemon(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.root = os.path.realpath(self.tmp_dir.name)
+        self.cache_patch = patch.object(config, 'CACHE_DIR', os.path.join(self.root, 'cache'))
+        self.cache_patch.start()
+
+    def tearDown(self):
+        self.cache_patch.stop()
+        self.tmp_dir.cleanup()
+
+    async def start(self):
+        server = daemon.AnalysisDaemon(self.root)
+        task = asyncio.create_task(server.serve())
+        while not os.path.exists(server.path):
+            self.assertFalse(task.done())
+            await asyncio.sleep(0.05)
+        return task
+
+    @async_test
+    async def test_unavailable_without_daemon(self):
+        with self.assertRaises(daemon.DaemonUnavailable):
+            await daemon.request('ping', root=self.root)
+
+    @async_test
+    async def test_serves_requests_until_stopped(self):
+        task = await self.start()
+        self.assertEqual((await daemon.request('ping', root=self.root))['pid'], os.getpid())
+
+        issues = await daemon.request('analyze', {'code': "import os\n", 'use_cache': False}, root=self.root)
+        self.assertIn('Unused import os', [issue['message'] for issue in issues])
+        issues = await daemon.request('analyze', {'code': "import os\n", 'lite': True}, root=self.root)
+        self.assertEqual(issues[0]['message'], 'Unused import os')
+
+        renamed = await daemon.request('refactor', {'code': "def old():\n    pass\n", 'refactor_type': 'rename',
+                                                    'options': {'old_name': 'old', 'new_name': 'new'}}, root=self.root)
+        self.assertIn('def new', renamed)
+        with self.assertRaises(daemon.DaemonError):
+            await daemon.request('missing', root=self.root)
+
+        self.assertEqual((await daemon.request('ping', root=self.root))['requests'], 5)
+        await daemon.request('stop', root=self.root)
+        await asyncio.wait_for(task, 30)
+        with self.assertRaises(daemon.DaemonUnavailable):
+            await daemon.request('ping', root=self.root)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,99 @@
+import os
+import sqlite3
+import tempfile
+import time
+import unittest
+from unittest.mock import patch
+
+from disk_cache import DiskCache
+
+class TestDiskCache(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.cache = DiskCache(os.path.join(self.tmp_dir.name, 'cache.sqlite3'), max_bytes=100)
+
+    def tearDown(self):
+        self.cache.close()
+        self.tmp_dir.cleanup()
+
+    def test_hit_and_miss_counters(self):
+        self.assertIsNone(self.cache.get('missing'))
+        self.cache.set('key', [{'type': 'info'}])
+        self.assertEqual(self.cache.get('key'), [{'type': 'info'}])
+        stats = self.cache.stats()
+        self.assertEqual((stats['hits'], stats['misses'], stats['entries']), (1, 1, 1))
+
+    def test_evicts_least_recently_used(self):
+        self.cache.set('a', 'x' * 40)
+        self.cache.set('b', 'x' * 40)
+        self.cache.get('a')
+        self.cache.set('c', 'x' * 40)
+        self.assertIsNone(self.cache.get('b'))
+        self.assertIsNotNone(self.cache.get('a'))
+        self.assertIsNotNone(self.cache.get('c'))
+        self.assertLessEqual(self.cache.stats()['bytes'], 100)
+
+    def test_persists_across_instances(self):
+        self.cache.set('key', {'value': 1})
+        reopened = DiskCache(self.cache.path, max_bytes=100)
+        self.assertEqual(reopened.get('key'), {'value': 1})
+        reopened.close()
+
+    def test_batch_operations(self):
+        self.cache.set_many({'a': 1, 'b': [2]})
+        self.assertEqual(self.cache.get_many(['a', 'b', 'missing']), {'a': 1, 'b': [2]})
+        stats = self.cache.stats()
+        self.assertEqual((stats['hits'], stats['misses'], stats['entries']), (2, 1, 2))
+
+    def test_entries_expire_after_ttl(self):
+        cache = DiskCache(self.cache.path, max_bytes=100, ttl=60)
+        cache.set_many({'key': 1, 'other': 2})
+        self.assertEqual(cache.get_many(['key']), {'key': 1})
+        with patch('time.time', return_value=time.time() + 61):
+            self.assertIsNone(cache.get('key'))
+            self.assertEqual(cache.get_many(['other']), {})
+        self.assertEqual(cache.stats()['entries'], 0)
+        cache.close()
+
+    def test_writes_keep_a_running_total_of_stored_bytes(self):
+        statements = []
+        self.cache._conn.set_trace_callback(statements.append)
+        self.cache.set('a', 'x' * 40)
+        self.cache.set('a', 'x' * 20)
+        self.cache.set_many({'b': 'x' * 40, 'c': 'x' * 40})
+        self.cache._conn.set_trace_callback(None)
+        # Writes read the total instead of summing every entry
+        self.assertFalse([statement for statement in statements if 'SUM(' in statement])
+        stored = self.cache._conn.execute("SELECT SUM(size) FROM entries").fetchone()[0]
+        self.assertEqual(self.cache.stats()['bytes'], stored)
+        self.assertLessEqual(stored, 100)
+        self.cache.clear()
+        self.assertEqual(self.cache.stats()['bytes'], 0)
+
+    def test_concurrent_migrations_add_the_column_once(self):
+        path = os.path.join(self.tmp_dir.name, 'old.sqlite3')
+        conn = sqlite3.connect(path)
+        conn.execute(
+            "CREATE TABLE entries (key TEXT PRIMARY KEY, value TEXT NOT NULL, size INTEGER NOT NULL, accessed REAL NOT NULL)"
+        )
+        conn.execute("INSERT INTO entries VALUES ('key', '1', 1, 0)")
+        conn.commit()
+        conn.close()
+        # The second cache sees the old schema before the first one migrates it
+        stale = {'key', 'value', 'size', 'accessed'}
+        real_columns = DiskCache._columns
+        first = DiskCache(path, max_bytes=100)
+        calls = []
+        def columns(cache):
+            calls.append(cache)
+            return stale if len(calls) == 1 else real_columns(cache)
+        with patch.object(DiskCache, '_columns', columns):
+            second = DiskCache(path, max_bytes=100)
+        self.assertEqual(second.get('key'), 1)
+        # Entries written before the running total existed are counted in it
+        self.assertEqual(second.stats()['bytes'], 1)
+        first.close()
+        second.close()
+
+if __name__ == '__main__':
+    unittest.main()
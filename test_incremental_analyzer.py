@@ -0,0 +1,120 @@
+import asyncio
+import unittest
+
+from code_analyzer import analyze_code, shutdown_worker_pool
+from incremental_analyzer import IncrementalAnalyzer
+
+def async_test(f):
+    def wrapper(*args, **kwargs):
+        return asyncio.run(f(*args, **kwargs))
+    return wrapper
+
+MODULE = '''import os
+import json
+
+
+def first(a):
+    value = 1
+    return os.path.join(a, "x")
+
+
+class Holder:
+    def __init__(self, data):
+        self.data = data
+
+    def dump(self):
+        return json.dumps(self.data)
+
+
+def second(b):
+    return first(b) + Holder(b).data + missing
+
+
+def third(c):
+    return c * 2
+'''
+
+# Holder's attribute is assigned only inside if/else, and count's result is only known from its body
+CALLERS = '''class Holder:
+    def __init__(self, flag):
+        if flag:
+            self.data = []
+        else:
+            self.data = {}
+
+
+def count():
+    return 1
+
+
+def use():
+    return len(Holder(True).data)
+'''
+
+class TestIncrementalAnalyzer(unittest.TestCase):
+    @classmethod
+    def tearDownClass(cls):
+        shutdown_worker_pool()
+
+    async def assert_matches_full_run(self, analyzer, code):
+        result = await analyzer.analyze(code, compact=True)
+        full = await analyze_code(code, use_cache=False, compact=True)
+        self.assertEqual(sorted(result), sorted(full))
+        return result
+
+    @async_test
+    async def test_only_changed_definitions_are_rechecked(self):
+        analyzer = IncrementalAnalyzer(use_cache=False)
+        await self.assert_matches_full_run(analyzer, MODULE)
+        self.assertEqual(analyzer.last_rechecked, 4)
+
+        edited = MODULE.replace("c * 2", "c * 3")
+        await self.assert_matches_full_run(analyzer, edited)
+        self.assertEqual(analyzer.last_rechecked, 1)
+
+        # second() is re-checked against the real first() and Holder it calls
+        await self.assert_matches_full_run(analyzer, edited.replace("+ missing", "+ absent"))
+        self.assertEqual(analyzer.last_rechecked, 3)
+
+    @async_test
+    async def test_unchanged_issues_follow_moved_lines(self):
+        analyzer = IncrementalAnalyzer(use_cache=False)
+        await analyzer.analyze(MODULE)
+        shifted = MODULE.replace("class Holder:", "def added():\n    pass\n\n\nclass Holder:")
+        result = await self.assert_matches_full_run(analyzer, shifted)
+        self.assertEqual(analyzer.last_rechecked, 1)
+        missing = [issue for issue in result if issue.message == "Undefined variable 'missing'"]
+        self.assertEqual([issue.line for issue in missing], [23])
+
+    @async_test
+    async def test_dependents_of_changed_definitions_are_rechecked(self):
+        analyzer = IncrementalAnalyzer(use_cache=False)
+        await analyzer.analyze(MODULE)
+        # second() now passes too few arguments, which only a re-check of second() can see
+        result = await self.assert_matches_full_run(analyzer, MODULE.replace("def first(a):", "def first(a, c):"))
+        self.assertEqual(analyzer.last_rechecked, 3)
+        self.assertIn("No value for argument 'c' in function call", [issue.message for issue in result])
+
+    @async_test
+    async def test_attributes_assigned_in_nested_blocks_are_kept(self):
+        analyzer = IncrementalAnalyzer(use_cache=False)
+        await analyzer.analyze(CALLERS)
+        result = await self.assert_matches_full_run(analyzer, CALLERS.replace("len(Holder(True).data)", "Holder(False).data"))
+        self.assertNotIn("Instance of 'Holder' has no 'data' member", [issue.message for issue in result])
+
+    @async_test
+    async def test_return_values_of_unchanged_callees_are_inferred(self):
+        analyzer = IncrementalAnalyzer(use_cache=False)
+        await analyzer.analyze(CALLERS)
+        result = await self.assert_matches_full_run(analyzer, CALLERS.replace("len(Holder(True).data)", "count().lower()"))
+        self.assertIn("Instance of 'int' has no 'lower' member", [issue.message for issue in result])
+
+    @async_test
+    async def test_syntax_error_falls_back_to_full_analysis(self):
+        analyzer = IncrementalAnalyzer(use_cache=False)
+        await analyzer.analyze(MODULE)
+        result = await analyzer.analyze(MODULE + "def broken(:\n")
+        self.assertTrue(result[0]['message'].startswith('Syntax Error'))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,16 +1,28 @@
 import unittest
 import asyncio
 import os
+import tempfile
 from unittest.mock import AsyncMock, patch
 
 from code_generator import generate_code
-from code_analyzer import analyze_code
+from code_analyzer import analyze_code, get_analysis_cache
 from code_refactor import refactor_code
 from code_optimizer import optimize_code
+from config import config
+from llm_client import get_response_cache
 
 class TestIntegration(unittest.TestCase):
     def setUp(self):
         self.api_key = os.environ.get('OPENAI_API_KEY', 'fake_api_key')
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.cache_patch = patch.object(config, 'CACHE_DIR', self.tmp_dir.name)
+        self.cache_patch.start()
+
+    def tearDown(self):
+        get_analysis_cache().close()
+        get_response_cache().close()
+        self.cache_patch.stop()
+        self.tmp_dir.cleanup()
 
     def async_test(f):
         def wrapper(*args, **kwargs):
@@ -18,13 +30,13 @@ class TestIntegration(unittest.TestCase):
         return wrapper
 
     @async_test
-    @patch('openai.ChatCompletion.create', new_callable=AsyncMock)
+    @patch('openai.resources.chat.AsyncCompletions.create', new_callable=AsyncMock)
     async def test_full_workflow(self, mock_create):
         # Step 1: Generate Code
         mock_response = AsyncMock()
         mock_response.choices = [AsyncMock()]
-        mock_response.choices[0].function_call = AsyncMock()
-        mock_response.choices[0].function_call.arguments = '{"code": "def factorial(n):\\n    if n == 0:\\n        return 1\\n    else:\\n        return n * factorial(n-1)", "explanation": "This is a recursive factorial function."}'
+        mock_response.choices[0].message.tool_calls = [AsyncMock()]
+        mock_response.choices[0].message.tool_calls[0].function.arguments = '{"code": "def factorial(n):\\n    if n == 0:\\n        return 1\\n    else:\\n        return n * factorial(n-1)", "explanation": "This is a recursive factorial function."}'
         mock_create.return_value = mock_response
 
         prompt = "Write a function to calculate the factorial of a number"
@@ -73,14 +85,14 @@ class TestIntegration(unittest.TestCase):
             await refactor_code(valid_code, "non_existent_refactor_type")
 
     @async_test
-    @patch('openai.ChatCompletion.create', new_callable=AsyncMock)
+    @patch('openai.resources.chat.AsyncCompletions.create', new_callable=AsyncMock)
     async def test_multiple_iterations(self, mock_create):
         prompt = "Write a function to find the n-th Fibonacci number"
         code = ""
         mock_response = AsyncMock()
         mock_response.choices = [AsyncMock()]
-        mock_response.choices[0].function_call = AsyncMock()
-        mock_response.choices[0].function_call.arguments = '{"code": "def fibonacci(n):\\n    if n <= 1:\\n        return n\\n    return fibonacci(n-1) + fibonacci(n-2)", "explanation": "This is a recursive Fibonacci function."}'
+        mock_response.choices[0].message.tool_calls = [AsyncMock()]
+        mock_response.choices[0].message.tool_calls[0].function.arguments = '{"code": "def fibonacci(n):\\n    if n <= 1:\\n        return n\\n    return fibonacci(n-1) + fibonacci(n-2)", "explanation": "This is a recursive Fibonacci function."}'
         mock_create.return_value = mock_response
 
         for _ in range(3):  # Simulate 3 iterations of improvement
@@ -0,0 +1,46 @@
+import json
+import pickle
+import unittest
+
+from issues import NO_ISSUES, Issue, IssueBatch, count_problems, is_partial, timeout_issue
+
+class TestIssues(unittest.TestCase):
+    def setUp(self):
+        self.issues = [
+            Issue.make('warning', 2, 4, "Unused variable 'value'", 'unused-variable'),
+            Issue.make('error', '3', '0', "Undefined variable 'x'", 'undefined-variable'),
+            Issue.make('warning', 7, 4, "Unused variable 'value'", 'unused-variable'),
+        ]
+
+    def test_dict_view_matches_legacy_format(self):
+        issue = self.issues[1]
+        self.assertEqual(issue.to_dict(), {'type': 'error', 'line': '3', 'column': '0', 'message': "Undefined variable 'x'"})
+        self.assertEqual(Issue.from_dict(issue.to_dict()), issue._replace(symbol=''))
+
+    def test_batch_round_trips(self):
+        batch = IssueBatch(self.issues)
+        self.assertEqual(list(batch), self.issues)
+        self.assertEqual(batch[2], self.issues[2])
+        self.assertEqual(IssueBatch.from_json(json.loads(json.dumps(batch.to_json()))), batch)
+        self.assertEqual(pickle.loads(pickle.dumps(batch)), batch)
+        self.assertEqual(batch.to_dicts(), [issue.to_dict() for issue in self.issues])
+
+    def test_batch_stores_repeated_strings_once(self):
+        batch = IssueBatch(self.issues)
+        self.assertEqual(len(batch.to_json()['strings']), 6)
+        restored = pickle.loads(pickle.dumps(batch))
+        restored.append(self.issues[0])
+        self.assertEqual(len(restored.to_json()['strings']), 6)
+
+    def test_count_problems_skips_info(self):
+        self.assertEqual(count_problems(IssueBatch([NO_ISSUES])), 0)
+        self.assertEqual(count_problems(IssueBatch(self.issues)), 3)
+
+    def test_timeout_marker_makes_results_partial(self):
+        self.assertFalse(is_partial(IssueBatch(self.issues)))
+        batch = IssueBatch(self.issues + [timeout_issue("Analysis stopped after 1s")])
+        self.assertTrue(is_partial(batch))
+        self.assertEqual(count_problems(batch), 3)
+
+if __name__ == '__main__':
+    unittest.main()
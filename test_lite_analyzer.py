@@ -0,0 +1,63 @@
+import os
+import subprocess
+import sys
+import unittest
+
+from issues import NO_ISSUES
+from lite_analyzer import analyze_lite
+
+def symbols(code, filename=None):
+    return [(issue.symbol, issue.line) for issue in analyze_lite(code, filename, compact=True)]
+
+class TestLiteAnalyzer(unittest.TestCase):
+    def test_matches_analyze_code_format(self):
+        self.assertEqual(analyze_lite("import os\n"),
+                         [{'type': 'warning', 'line': '1', 'column': '0', 'message': 'Unused import os'}])
+        self.assertEqual(analyze_lite("def f(): pass\n", compact=True)[0], NO_ISSUES)
+        self.assertIn("Syntax Error", analyze_lite("def f(:\n")[0]['message'])
+
+    def test_unused_names(self):
+        code = ("import os, sys\nfrom typing import List as L\n"
+                "def f(a):\n    unused_ok = 1\n    value = 2\n    used = 3\n    return used\n"
+                "print(sys)\n")
+        self.assertEqual(symbols(code), [('unused-import', 1), ('unused-import', 2), ('unused-variable', 5)])
+        # Imports are re-exports in packages and when listed in __all__
+        self.assertEqual(symbols("import os\n", '__init__.py'), [('', 1)])
+        self.assertEqual(symbols("import os\n__all__ = ['os']\n"), [('', 1)])
+
+    def test_name_resolution(self):
+        code = ("def f():\n    return later(), missing\n"
+                "def later():\n    total = 0\n    def inner():\n        nonlocal total\n        total += 1\n"
+                "    inner()\n    return [x for x in range(3) if x]\n"
+                "class C:\n    attr = 1\n    def m(self):\n        return attr\n")
+        self.assertEqual(symbols(code), [('undefined-variable', 2), ('undefined-variable', 13)])
+        self.assertEqual(symbols("from os import *\nprint(anything)\n"), [('', 1)])
+
+    def test_string_annotations_use_imports(self):
+        self.assertEqual(symbols("from typing import List\ndef f() -> 'List[int]':\n    return []\n"), [('', 1)])
+
+    def test_control_flow_and_defaults(self):
+        code = "def f(a=[], b=dict()):\n    return a\n    print(b)\n"
+        self.assertEqual(symbols(code), [('dangerous-default-value', 1), ('dangerous-default-value', 1),
+                                         ('unreachable', 3)])
+
+    def test_performance_patterns(self):
+        code = ("def f(items, d):\n    s = ''\n    for i in range(len(items)):\n        s += 'x'\n"
+                "    for k in d.keys():\n        s += f'{k}'\n"
+                "    return any([i for i in items]), sorted(items)[-1], items[0] in (1, 2, 3), s\n")
+        self.assertEqual(symbols(code), [
+            ('consider-using-enumerate', 3), ('string-concat-in-loop', 4), ('consider-iterating-dictionary', 5),
+            ('string-concat-in-loop', 6), ('use-a-generator', 7), ('sorted-for-min-max', 7),
+            ('use-set-for-membership', 7),
+        ])
+
+    def test_imports_without_newer_ast_nodes(self):
+        # CI runs Python 3.9, whose ast has no pattern matching nodes
+        script = ("import ast\n"
+                  "for name in ('Match', 'MatchAs', 'MatchStar', 'MatchMapping', 'TryStar'):\n"
+                  "    vars(ast).pop(name, None)\n"
+                  "import lite_analyzer\n")
+        subprocess.run([sys.executable, '-c', script], check=True, cwd=os.path.dirname(os.path.abspath(__file__)))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,323 @@
+import asyncio
+import datetime
+import email.utils
+import json
+import tempfile
+import time
+import unittest
+from unittest.mock import patch
+
+import httpx
+import openai
+
+from code_generator import generate_as_completed, generate_code, generate_code_stream, generate_many
+from config import config
+from llm_client import (RateLimiter, close_clients, complete, get_client, get_latency_tracker, get_response_cache,
+                        retry_delay, response_cache_key)
+
+def async_test(f):
+    def wrapper(*args, **kwargs):
+        return asyncio.run(f(*args, **kwargs))
+    return wrapper
+
+def completion(arguments):
+    return {
+        'id': 'chatcmpl-test', 'object': 'chat.completion', 'created': 0, 'model': 'test',
+        'choices': [{'index': 0, 'finish_reason': 'stop', 'message': {
+            'role': 'assistant', 'content': None,
+            'tool_calls': [{'id': 'call_0', 'type': 'function',
+                            'function': {'name': 'generate_code_response', 'arguments': json.dumps(arguments)}}],
+        }}],
+    }
+
+def chunk(fragment):
+    return {
+        'id': 'chatcmpl-test', 'object': 'chat.completion.chunk', 'created': 0, 'model': 'test',
+        'choices': [{'index': 0, 'finish_reason': None, 'delta': {
+            'tool_calls': [{'index': 0, 'function': {'arguments': fragment}}],
+        }}],
+    }
+
+class FakeOpenAIServer:
+    """Answers chat completions over HTTP/1.1 keep-alive and counts the connections it accepts.
+
+    Streamed requests get the arguments in fragments of chunk_size characters, chunk_delay apart.
+    The first requests are answered with the (status, headers) in errors, and after the seconds
+    in delays, one per request in order.
+    """
+
+    def __init__(self, chunk_size=8, chunk_delay=0.0, errors=(), delays=()):
+        self.connections = 0
+        self.requests = []
+        self.chunk_size = chunk_size
+        self.chunk_delay = chunk_delay
+        self.errors = list(errors)
+        self.delays = list(delays)
+
+    async def start(self) -> str:
+        self.server = await asyncio.start_server(self.handle, '127.0.0.1', 0)
+        return f"http://127.0.0.1:{self.server.sockets[0].getsockname()[1]}/v1"
+
+    async def handle(self, reader, writer):
+        self.connections += 1
+        try:
+            while True:
+                head = await reader.readuntil(b'\r\n\r\n')
+                headers = dict(line.split(': ', 1) for line in head.decode().split('\r\n')[1:] if ': ' in line)
+                lengths = [value for name, value in headers.items() if name.lower() == 'content-length']
+                body = json.loads(await reader.readexactly(int(lengths[0])))
+                self.requests.append(body)
+                if self.delays:
+                    await asyncio.sleep(self.delays.pop(0))
+                if self.errors:
+                    status, extra_headers = self.errors.pop(0)
+                    payload = json.dumps({'error': {'message': 'failed', 'type': 'test', 'code': extra_headers.pop('code', None)}}).encode()
+                    writer.write(f'HTTP/1.1 {status} Error\r\nContent-Type: application/json\r\nContent-Length: {len(payload)}\r\n'.encode()
+                                 + b''.join(f'{name}: {value}\r\n'.encode() for name, value in extra_headers.items())
+                                 + b'\r\n' + payload)
+                    await writer.drain()
+                    continue
+                arguments = {'code': 'def f():\n    return "\u00e9"\n', 'explanation': body['messages'][1]['content']}
+                if body.get('stream'):
+                    await self.stream(writer, json.dumps(arguments))
+                    continue
+                payload = json.dumps(completion(arguments)).encode()
+                writer.write(b'HTTP/1.1 200 OK\r\nContent-Type: application/json\r\n'
+                             + f'Content-Length: {len(payload)}\r\n\r\n'.encode() + payload)
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    async def stream(self, writer, arguments):
+        writer.write(b'HTTP/1.1 200 OK\r\nContent-Type: text/event-stream\r\nTransfer-Encoding: chunked\r\n\r\n')
+        events = [f"data: {json.dumps(chunk(arguments[i:i + self.chunk_size]))}\n\n"
+                  for i in range(0, len(arguments), self.chunk_size)] + ["data: [DONE]\n\n"]
+        for event in events:
+            data = event.encode()
+            writer.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+            await writer.drain()
+            await asyncio.sleep(self.chunk_delay)
+        writer.write(b"0\r\n\r\n")
+        await writer.drain()
+
+class TestLLMClient(unittest.TestCase):
+    @async_test
+    async def test_clients_are_shared_per_key(self):
+        client = get_client('key-a')
+        self.assertIs(get_client('key-a'), client)
+        self.assertIsNot(get_client('key-b'), client)
+        await close_clients()
+        self.assertTrue(client.is_closed())
+        self.assertIsNot(get_client('key-a'), client)
+        await close_clients()
+
+    @async_test
+    async def test_generations_reuse_one_connection(self):
+        server = FakeOpenAIServer()
+        with patch.object(config, 'LLM_BASE_URL', await server.start()):
+            try:
+                results = [await generate_code(f"prompt {i}", 'test-key') for i in range(3)]
+            finally:
+                await close_clients()
+        server.server.close()
+        self.assertEqual(results[0]['code'], 'def f():\n    return "\u00e9"\n')
+        self.assertEqual([result['explanation'] for result in results],
+                         [f"Context: \n\nPrompt: prompt {i}" for i in range(3)])
+        self.assertEqual(server.requests[0]['tool_choice']['function']['name'], 'generate_code_response')
+        self.assertEqual(server.connections, 1)
+
+    @async_test
+    async def test_stream_yields_growing_partial_responses(self):
+        server = FakeOpenAIServer(chunk_size=3)
+        with patch.object(config, 'LLM_BASE_URL', await server.start()):
+            try:
+                partials = [partial async for partial in generate_code_stream("prompt", 'test-key')]
+            finally:
+                await close_clients()
+        server.server.close()
+        codes = [partial.get('code', '') for partial in partials]
+        self.assertGreater(len(set(codes)), 5)
+        self.assertTrue(all(later.startswith(earlier) for earlier, later in zip(codes, codes[1:])))
+        self.assertEqual(partials[-1], {'code': 'def f():\n    return "\u00e9"\n', 'explanation': "Context: \n\nPrompt: prompt"})
+        self.assertTrue(server.requests[0]['stream'])
+
+    @async_test
+    async def test_abandoned_streams_are_closed(self):
+        server = FakeOpenAIServer(chunk_size=3)
+        streams = []
+
+        async def recording_complete(*args, **kwargs):
+            stream = await complete(*args, **kwargs)
+            streams.append(stream)
+            return stream
+
+        with patch.object(config, 'LLM_BASE_URL', await server.start()), \
+                patch('code_generator.complete', recording_complete):
+            try:
+                partials = generate_code_stream("prompt", 'test-key', use_cache=False)
+                await partials.__anext__()
+                await partials.aclose()
+            finally:
+                await close_clients()
+        server.server.close()
+        self.assertTrue(streams[0].response.is_closed)
+
+    @async_test
+    async def test_batches_keep_prompt_order_within_the_concurrency_cap(self):
+        server = FakeOpenAIServer()
+        prompts = [f"prompt {i}" for i in range(10)]
+        with patch.object(config, 'LLM_BASE_URL', await server.start()):
+            try:
+                results = await generate_many(iter(prompts), 'test-key', concurrency=2, use_cache=False)
+                with self.assertRaises(ValueError):
+                    await generate_many(["a", ""], 'test-key', use_cache=False)
+                failed = [index async for index, result in generate_as_completed(
+                    ["a", "", "b"], 'test-key', use_cache=False, return_exceptions=True)
+                    if isinstance(result, ValueError)]
+            finally:
+                await close_clients()
+        server.server.close()
+        self.assertEqual([result['explanation'] for result in results], [f"Context: \n\nPrompt: {p}" for p in prompts])
+        self.assertEqual(server.connections, 2)
+        self.assertEqual(failed, [1])
+
+    async def generate_with(self, server, **kwargs):
+        with patch.object(config, 'LLM_BASE_URL', await server.start()), patch.object(config, 'LLM_RETRY_BASE_DELAY', 0.01):
+            try:
+                return await generate_code("prompt", 'test-key', use_cache=False, **kwargs)
+            finally:
+                await close_clients()
+                server.server.close()
+
+    @async_test
+    async def test_transient_errors_are_retried(self):
+        server = FakeOpenAIServer(errors=[(429, {'retry-after-ms': '10'}), (503, {}), (500, {})])
+        result = await self.generate_with(server)
+        self.assertEqual(result['explanation'], "Context: \n\nPrompt: prompt")
+        self.assertEqual(len(server.requests), 4)
+
+        for errors in ([(400, {})], [(429, {'code': 'insufficient_quota'})], [(500, {})] * 10):
+            server = FakeOpenAIServer(errors=errors)
+            with self.assertRaises(Exception):
+                await self.generate_with(server)
+            self.assertEqual(len(server.requests), min(len(errors), config.LLM_MAX_RETRIES + 1))
+
+    @async_test
+    async def test_slow_requests_are_hedged(self):
+        tracker = get_latency_tracker('hedge-test')
+        for _ in range(config.LLM_HEDGE_MIN_SAMPLES):
+            tracker.record(0.05)
+        server = FakeOpenAIServer(delays=[5])
+        start = time.monotonic()
+        with patch.object(config, 'LLM_HEDGE_ENABLED', True):
+            result = await self.generate_with(server, model='hedge-test')
+        self.assertLess(time.monotonic() - start, 2)
+        self.assertEqual(result['explanation'], "Context: \n\nPrompt: prompt")
+        self.assertEqual(len(server.requests), 2)
+
+    def test_retry_delay_honours_retry_after(self):
+        request = httpx.Request('POST', 'http://test')
+        error = lambda headers: openai.RateLimitError('limited', response=httpx.Response(429, headers=headers, request=request), body=None)
+        self.assertEqual(retry_delay(error({'retry-after': '2'}), 0), 2)
+        self.assertEqual(retry_delay(error({'retry-after': '3600'}), 0), config.LLM_RETRY_MAX_DELAY)
+        # An HTTP date without a zone is GMT, whatever the local time zone
+        with patch.dict('os.environ', {'TZ': 'America/New_York'}):
+            time.tzset()
+            try:
+                retry_at = email.utils.format_datetime(datetime.datetime.now(datetime.timezone.utc).replace(tzinfo=None)
+                                                      + datetime.timedelta(seconds=10))
+                self.assertAlmostEqual(retry_delay(error({'retry-after': retry_at}), 0), 10, delta=2)
+            finally:
+                time.tzset()
+        # Unreadable values fall back to backoff instead of hiding the API error
+        for value in ('soon', 'Mon, 99 Foo 2024 25:00:00 GMT'):
+            self.assertLessEqual(retry_delay(error({'retry-after': value}), 0), config.LLM_RETRY_BASE_DELAY)
+        delays = [retry_delay(error({}), 3) for _ in range(100)]
+        self.assertTrue(all(0 <= delay <= config.LLM_RETRY_BASE_DELAY * 8 for delay in delays))
+        self.assertGreater(len(set(delays)), 1)
+
+    @async_test
+    async def test_errors_reading_prompts_end_the_batch(self):
+        def prompts():
+            yield "a"
+            yield "b"
+            raise RuntimeError("prompt source failed")
+
+        server = FakeOpenAIServer()
+        with patch.object(config, 'LLM_BASE_URL', await server.start()):
+            try:
+                for concurrency in (1, 4):
+                    with self.assertRaisesRegex(RuntimeError, "prompt source failed"):
+                        await asyncio.wait_for(generate_many(prompts(), 'test-key', use_cache=False, concurrency=concurrency,
+                                                             return_exceptions=True), 5)
+            finally:
+                await close_clients()
+        server.server.close()
+
+class TestRateLimiter(unittest.TestCase):
+    @async_test
+    async def test_waits_for_the_bucket_to_refill(self):
+        limiter = RateLimiter(requests_per_minute=6000, tokens_per_minute=600)
+        start = time.monotonic()
+        await limiter.acquire(600)
+        self.assertLess(time.monotonic() - start, 0.1)
+        # 10 tokens a second, so 5 more tokens take half a second
+        await limiter.acquire(5)
+        self.assertGreaterEqual(time.monotonic() - start, 0.45)
+
+class TestResponseCache(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.cache_patch = patch.object(config, 'CACHE_DIR', self.tmp_dir.name)
+        self.cache_patch.start()
+
+    def tearDown(self):
+        get_response_cache().close()
+        self.cache_patch.stop()
+        self.tmp_dir.cleanup()
+
+    async def generate(self, server, count, **kwargs):
+        with patch.object(config, 'LLM_BASE_URL', await server.start()):
+            try:
+                return [await generate_code("prompt", 'test-key', **kwargs) for _ in range(count)]
+            finally:
+                await close_clients()
+                server.server.close()
+
+    @async_test
+    async def test_deterministic_requests_are_cached(self):
+        server = FakeOpenAIServer()
+        results = await self.generate(server, 3, temperature=0)
+        self.assertEqual(len(server.requests), 1)
+        self.assertEqual(results[1:], results[:1] * 2)
+        stats = get_response_cache().stats()
+        self.assertEqual((stats['hits'], stats['misses']), (2, 1))
+
+        # Bypassing the cache still calls the API
+        server = FakeOpenAIServer()
+        await self.generate(server, 1, temperature=0, use_cache=False)
+        self.assertEqual(len(server.requests), 1)
+
+    @async_test
+    async def test_sampled_requests_bypass_the_cache_unless_allowed(self):
+        server = FakeOpenAIServer()
+        await self.generate(server, 2, temperature=0.7)
+        self.assertEqual(len(server.requests), 2)
+
+        server = FakeOpenAIServer()
+        with patch.object(config, 'LLM_CACHE_SAMPLED', True):
+            await self.generate(server, 2, temperature=0.7)
+        self.assertEqual(len(server.requests), 1)
+
+    def test_key_covers_every_request_setting(self):
+        request = {'model': 'm', 'messages': [{'role': 'user', 'content': 'x'}], 'temperature': 0, 'max_tokens': 10,
+                   'tools': [{'type': 'function', 'function': {'name': 'f'}}]}
+        keys = {response_cache_key(dict(request, **{field: value})) for field, value in
+                [('model', 'other'), ('messages', []), ('temperature', 0.5), ('max_tokens', 20), ('tools', [])]}
+        self.assertEqual(len(keys | {response_cache_key(request)}), 6)
+        self.assertEqual(response_cache_key(dict(reversed(list(request.items())))), response_cache_key(request))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,88 @@
+import os
+import subprocess
+import sys
+import tempfile
+import unittest
+from unittest.mock import patch
+import asyncio
+
+from config import config
+from metrics_analyzer import collect_metrics, hotspots
+
+SOURCE = '''def simple():
+    return 1
+
+class Parser:
+    def parse(self, items):
+        for item in items:
+            if item:
+                print(item)
+            elif item is None:
+                self.skip(item)
+        return helper.clean(items)
+'''
+
+def async_test(f):
+    def wrapper(*args, **kwargs):
+        return asyncio.run(f(*args, **kwargs))
+    return wrapper
+
+class TestMetricsAnalyzer(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.root = os.path.join(self.tmp_dir.name, 'project')
+        os.makedirs(self.root)
+        self.write('module.py', SOURCE)
+        self.cache_patch = patch.object(config, 'CACHE_DIR', os.path.join(self.tmp_dir.name, 'cache'))
+        self.cache_patch.start()
+
+    def tearDown(self):
+        self.cache_patch.stop()
+        self.tmp_dir.cleanup()
+
+    def write(self, name, code):
+        with open(os.path.join(self.root, name), 'w') as f:
+            f.write(code)
+
+    @async_test
+    async def test_function_metrics(self):
+        report = await collect_metrics(self.root)
+        self.assertEqual([(f.name, f.line, f.complexity, f.length, f.depth, f.fan_out) for f in report.functions],
+                         [('simple', 1, 1, 2, 0, 0), ('Parser.parse', 5, 4, 7, 2, 3)])
+        self.assertEqual(hotspots(report.functions, 'depth', 1)[0].name, 'Parser.parse')
+
+    @async_test
+    async def test_reruns_only_recompute_changed_functions(self):
+        self.assertEqual((await collect_metrics(self.root)).recomputed, 2)
+        self.assertEqual((await collect_metrics(self.root)).recomputed, 0)
+
+        self.write('module.py', SOURCE.replace('return 1', 'return 2'))
+        report = await collect_metrics(self.root)
+        self.assertEqual(report.recomputed, 1)
+        self.assertEqual(report.functions, (await collect_metrics(self.root, use_cache=False)).functions)
+
+    @async_test
+    async def test_identical_files_are_measured_once(self):
+        self.write('copy.py', SOURCE)
+        report = await collect_metrics(self.root)
+        self.assertEqual(report.recomputed, 2)
+        self.assertEqual(report.files, 2)
+        self.assertEqual([f.name for f in report.functions if f.path.endswith('copy.py')], ['simple', 'Parser.parse'])
+
+    @async_test
+    async def test_unparsable_files_are_reported(self):
+        self.write('broken.py', 'def broken(:\n')
+        report = await collect_metrics(self.root)
+        self.assertEqual(report.unparsable, [os.path.join(self.root, 'broken.py')])
+        self.assertEqual(report.files, 1)
+
+    def test_imports_without_newer_ast_nodes(self):
+        # CI runs Python 3.9, whose ast has neither Match nor TryStar
+        script = ("import ast\n"
+                  "for name in ('Match', 'MatchAs', 'MatchStar', 'MatchMapping', 'TryStar'):\n"
+                  "    vars(ast).pop(name, None)\n"
+                  "import metrics_analyzer\n")
+        subprocess.run([sys.executable, '-c', script], check=True, cwd=os.path.dirname(os.path.abspath(__file__)))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,108 @@
+import unittest
+from unittest.mock import patch
+import asyncio
+import os
+import tempfile
+import git
+
+from baseline import Baseline
+from code_analyzer import get_analysis_cache, shutdown_worker_pool
+from config import config
+from git_integration import GitIntegration
+from repo_analyzer import analyze_changed, analyze_path, discover_python_files, load_last_results
+
+def async_test(f):
+    def wrapper(*args, **kwargs):
+        return asyncio.run(f(*args, **kwargs))
+    return wrapper
+
+class TestRepoAnalyzer(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.root = self.tmp_dir.name
+        self.write_file('pkg/good.py', "def test(): pass\n")
+        self.write_file('pkg/bad.py', "import os\n")
+        self.write_file('pkg/notes.txt', "not python\n")
+        self.write_file('ai_coding_assistant_env/Lib/vendored.py', "import sys\n")
+        self.write_file('generated/stub.py', "x = 1\n")
+        self.cache_dir = tempfile.TemporaryDirectory()
+        self.cache_patch = patch.object(config, 'CACHE_DIR', self.cache_dir.name)
+        self.cache_patch.start()
+
+    def tearDown(self):
+        get_analysis_cache().close()
+        self.cache_patch.stop()
+        self.cache_dir.cleanup()
+        self.tmp_dir.cleanup()
+
+    @classmethod
+    def tearDownClass(cls):
+        shutdown_worker_pool()
+
+    def write_file(self, relative_path, content):
+        path = os.path.join(self.root, relative_path)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'w') as f:
+            f.write(content)
+
+    def relative(self, paths):
+        return sorted(os.path.relpath(path, self.root).replace(os.sep, '/') for path in paths)
+
+    def test_discovery_skips_vendored_environment(self):
+        files = self.relative(discover_python_files(self.root))
+        self.assertEqual(files, ['generated/stub.py', 'pkg/bad.py', 'pkg/good.py'])
+
+    def test_discovery_applies_extra_patterns(self):
+        files = self.relative(discover_python_files(self.root, ['ai_coding_assistant_env', 'generated', 'bad.py']))
+        self.assertEqual(files, ['pkg/good.py'])
+
+    @async_test
+    async def test_analyze_path_streams_every_file(self):
+        results = {}
+        async for path, issues in analyze_path(self.root, use_cache=False):
+            results[os.path.relpath(path, self.root).replace(os.sep, '/')] = issues
+        self.assertEqual(sorted(results), ['generated/stub.py', 'pkg/bad.py', 'pkg/good.py'])
+        self.assertEqual(results['pkg/bad.py'][0]['message'], 'Unused import os')
+        self.assertEqual(results['pkg/good.py'][0]['type'], 'info')
+
+    async def collect_changed(self, **kwargs):
+        return {os.path.relpath(path, self.root).replace(os.sep, '/'): issues
+                async for path, issues in analyze_changed(self.root, use_cache=False, **kwargs)}
+
+    @async_test
+    async def test_incremental_analysis_only_reanalyzes_changes(self):
+        repo = git.Repo.init(self.root)
+        GitIntegration(self.root).commit_changes(['pkg/good.py', 'pkg/bad.py', 'generated/stub.py'], 'initial')
+
+        # The first run has nothing to reuse and seeds results for the whole tree
+        first = await self.collect_changed(since='HEAD')
+        self.assertEqual(sorted(first), ['generated/stub.py', 'pkg/bad.py', 'pkg/good.py'])
+
+        self.write_file('pkg/good.py', "import sys\n")
+        second = await self.collect_changed(since='HEAD')
+        self.assertEqual(sorted(second), ['pkg/good.py'])
+
+        results = load_last_results(self.root)
+        self.assertEqual(results['pkg/good.py'][0]['message'], 'Unused import sys')
+        self.assertEqual(results['pkg/bad.py'][0]['message'], 'Unused import os')
+
+        repo.index.add(['pkg/good.py'])
+        self.write_file('pkg/bad.py', "def test(): pass\n")
+        staged = await self.collect_changed(staged=True)
+        self.assertEqual(sorted(staged), ['pkg/good.py'])
+
+    @async_test
+    async def test_baseline_reports_only_new_issues(self):
+        baseline = Baseline(self.root)
+        async for path, issues in analyze_path(self.root, use_cache=False, compact=True):
+            with open(path) as f:
+                baseline.add(path, issues, f.read())
+
+        self.write_file('pkg/bad.py', "import os\nimport json\n")
+        results = {os.path.relpath(path, self.root).replace(os.sep, '/'): issues
+                   async for path, issues in analyze_path(self.root, baseline=baseline)}
+        self.assertEqual([issue['message'] for issue in results['pkg/bad.py']], ['Unused import json'])
+        self.assertEqual(results['generated/stub.py'][0]['type'], 'info')
+
+if __name__ == '__main__':
+    unittest.main()
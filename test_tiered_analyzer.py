@@ -0,0 +1,54 @@
+import unittest
+from unittest.mock import patch
+import asyncio
+import tempfile
+
+from code_analyzer import get_analysis_cache, shutdown_worker_pool
+from config import config
+from tiered_analyzer import FAST_TIER, FULL_TIER, analyze_fast, analyze_tiered
+
+def async_test(f):
+    def wrapper(*args, **kwargs):
+        return asyncio.run(f(*args, **kwargs))
+    return wrapper
+
+class TestTieredAnalyzer(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.cache_patch = patch.object(config, 'CACHE_DIR', self.tmp_dir.name)
+        self.cache_patch.start()
+
+    def tearDown(self):
+        get_analysis_cache().close()
+        self.cache_patch.stop()
+        self.tmp_dir.cleanup()
+
+    @classmethod
+    def tearDownClass(cls):
+        shutdown_worker_pool()
+
+    def test_fast_tier_reports_pyflakes_issues(self):
+        result = analyze_fast("import os\ndef f():\n    return missing\n")
+        self.assertEqual([(issue['type'], issue['line'], issue['tier']) for issue in result],
+                         [('warning', '1', FAST_TIER), ('error', '3', FAST_TIER)])
+
+    def test_fast_tier_style_is_opt_in(self):
+        code = "x=1\n"
+        self.assertEqual(analyze_fast(code)[0]['type'], 'info')
+        self.assertTrue(any(issue['type'] == 'convention' for issue in analyze_fast(code, style=True)))
+
+    @async_test
+    @patch('tiered_analyzer.analyze_many')
+    async def test_syntax_error_never_reaches_pylint(self, mock_analyze_many):
+        result = await analyze_tiered("def invalid_function(:", full=True)
+        mock_analyze_many.assert_not_called()
+        self.assertEqual(result[0]['tier'], FAST_TIER)
+        self.assertIn("syntax error", result[0]['message'].lower())
+
+    @async_test
+    async def test_full_tier_replaces_duplicate_lines(self):
+        result = await analyze_tiered("import os\n", full=True, use_cache=False)
+        self.assertEqual(result, [{'type': 'warning', 'line': '1', 'column': '0', 'message': 'Unused import os', 'tier': FULL_TIER}])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,115 @@
+import ast
+import asyncio
+import os
+from typing import Dict, List, Optional
+import pycodestyle
+from pyflakes.checker import Checker as PyflakesChecker
+from code_analyzer import SNIPPET_FILENAME, Profile, analyze_many, syntax_error_issues
+from config import config
+
+# Tier 1 runs in-process in milliseconds (syntax gate, pyflakes, optionally pycodestyle);
+# tier 2 is the full pylint analysis from code_analyzer
+FAST_TIER = 1
+FULL_TIER = 2
+
+# pyflakes messages that mean the code will fail at runtime rather than merely being untidy
+_PYFLAKES_ERRORS = {
+    'UndefinedName', 'UndefinedExport', 'UndefinedLocal', 'DuplicateArgument',
+    'ReturnOutsideFunction', 'YieldOutsideFunction', 'BreakOutsideLoop', 'ContinueOutsideLoop',
+    'ImportStarNotPermitted', 'TwoStarredExpressions', 'TooManyExpressionsInStarredAssignment',
+    'LateFutureImport', 'FutureFeatureNotDefined', 'DefaultExceptNotLast',
+}
+
+_style_guide: Optional[pycodestyle.StyleGuide] = None
+
+class _StyleReport(pycodestyle.BaseReport):
+    def __init__(self, options):
+        super().__init__(options)
+        self.issues = []
+
+    def error(self, line_number, offset, text, check):
+        code = super().error(line_number, offset, text, check)
+        if code:
+            self.issues.append({
+                'type': 'convention',
+                'line': str(line_number),
+                'column': str(offset),
+                'message': text[5:].capitalize(),
+                'tier': FAST_TIER
+            })
+        return code
+
+def _get_style_guide() -> pycodestyle.StyleGuide:
+    global _style_guide
+    if _style_guide is None:
+        _style_guide = pycodestyle.StyleGuide(parse_argv=False, config_file=False, quiet=True,
+                                              max_line_length=config.STYLE_MAX_LINE_LENGTH)
+    return _style_guide
+
+def _label(issues: List[Dict[str, str]], tier: int) -> List[Dict[str, str]]:
+    return [dict(issue, tier=tier) for issue in issues]
+
+def _pyflakes_issues(tree: ast.Module, filename: str) -> List[Dict[str, str]]:
+    checker = PyflakesChecker(tree, filename=filename)
+    issues = []
+    for message in sorted(checker.messages, key=lambda m: (m.lineno, m.col)):
+        text = message.message % message.message_args
+        issues.append({
+            'type': 'error' if type(message).__name__ in _PYFLAKES_ERRORS else 'warning',
+            'line': str(message.lineno),
+            'column': str(message.col),
+            'message': text[:1].upper() + text[1:],
+            'tier': FAST_TIER
+        })
+    return issues
+
+def _style_issues(code: str, filename: str) -> List[Dict[str, str]]:
+    options = _get_style_guide().options
+    report = _StyleReport(options)
+    pycodestyle.Checker(filename, lines=code.splitlines(True), options=options, report=report).check_all()
+    return report.issues
+
+def analyze_fast(code: str, filename: str = SNIPPET_FILENAME, style: bool = False) -> List[Dict[str, str]]:
+    """Tier 1 analysis: fast enough to run on every keystroke, never touches pylint."""
+    modname = os.path.splitext(os.path.basename(filename))[0]
+    syntax_errors = syntax_error_issues(code, modname)
+    if syntax_errors is not None:
+        return _label(syntax_errors, FAST_TIER)
+
+    issues = _pyflakes_issues(ast.parse(code, filename=modname), filename)
+    if style:
+        issues += _style_issues(code, filename)
+    if not issues:
+        issues = [{'type': 'info', 'line': '1', 'column': '1', 'message': 'No issues found', 'tier': FAST_TIER}]
+    return issues
+
+def merge_tiers(fast_issues: List[Dict[str, str]], full_issues: List[Dict[str, str]]) -> List[Dict[str, str]]:
+    """Combine tier 1 and tier 2 results. Pylint covers what pyflakes checks, so on any line
+    pylint reports, its issues replace the tier 1 ones instead of duplicating them."""
+    full_issues = [issue for issue in _label(full_issues, FULL_TIER) if issue['type'] != 'info']
+    full_lines = {issue['line'] for issue in full_issues}
+    merged = [issue for issue in fast_issues if issue['type'] != 'info' and issue['line'] not in full_lines] + full_issues
+    if not merged:
+        return [{'type': 'info', 'line': '1', 'column': '1', 'message': 'No issues found', 'tier': FULL_TIER}]
+    return sorted(merged, key=lambda issue: (int(issue['line']), int(issue['column'])))
+
+async def analyze_tiered(code: str, full: bool = False, style: bool = False, use_cache: bool = True,
+                         profile: Optional[Profile] = None) -> List[Dict[str, str]]:
+    """Return tier 1 issues, adding pylint's tier 2 issues when full=True.
+
+    Code that does not parse stops at tier 1: pylint could only report the same syntax error.
+    """
+    fast_issues = analyze_fast(code, style=style)
+    if not full or any(issue['message'].startswith('Syntax Error') for issue in fast_issues):
+        return fast_issues
+
+    full_issues = (await analyze_many([code], use_cache=use_cache, profile=profile))[0]
+    return merge_tiers(fast_issues, full_issues)
+
+def analyze_in_background(code: str, style: bool = False, use_cache: bool = True,
+                          profile: Optional[Profile] = None) -> asyncio.Task:
+    """Start the full tiered analysis on the worker pool and return immediately.
+
+    Callers typically show analyze_fast results right away and replace them once the task is done.
+    """
+    return asyncio.ensure_future(analyze_tiered(code, full=True, style=style, use_cache=use_cache, profile=profile))